@@ -0,0 +1,178 @@
+"""
+Backtest module:
+- builds every historical lookback window as a zero-copy sliding_window_view
+- scores the windows of all symbols together in a few large batched predictions
+- reports MAE, MAPE and directional accuracy of one-day-ahead forecasts against
+  naive (last close) and random-walk-with-drift baselines
+"""
+
+import argparse
+import time
+import logging
+from datetime import datetime, timedelta
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOOKBACK = 60
+DEFAULT_EVAL_DAYS = 252
+
+
+def build_windows(closes, lookback_period=DEFAULT_LOOKBACK, eval_days=DEFAULT_EVAL_DAYS, scaling='expanding'):
+    """
+    Model inputs and targets for the last eval_days one-day-ahead forecasts of a close series.
+
+    scaling='expanding' scales each window with the min/max of the history up to that window,
+    so no future prices leak into the inputs. scaling='global' fits one min/max over the whole
+    series, like prepare_data() does in production.
+    Returns (windows (n, lookback) float32, last_close (n,), target (n,), lo (n,), span (n,)).
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    # windows[i] covers closes[i:i+lookback] and predicts closes[i+lookback]; this is a view
+    raw_windows = sliding_window_view(closes, lookback_period)[:-1]
+    targets = closes[lookback_period:]
+
+    n = min(eval_days, len(targets)) if eval_days else len(targets)
+    raw_windows = raw_windows[-n:]
+    targets = targets[-n:]
+
+    if scaling == 'global':
+        lo = np.full(n, closes.min())
+        hi = np.full(n, closes.max())
+    elif scaling == 'expanding':
+        end_index = np.arange(len(closes) - n, len(closes))  # exclusive end of each window's history
+        lo = np.minimum.accumulate(closes)[end_index - 1]
+        hi = np.maximum.accumulate(closes)[end_index - 1]
+    else:
+        raise ValueError(f"Unknown scaling '{scaling}'")
+
+    span = np.where(hi > lo, hi - lo, 1.0)
+    windows = ((raw_windows - lo[:, None]) / span[:, None]).astype(np.float32)
+    return windows, raw_windows[:, -1], targets, lo, span
+
+
+def score_forecasts(predicted, last_close, actual):
+    """MAE, MAPE (%) and directional accuracy (%) for one set of forecasts"""
+    error = predicted - actual
+    predicted_move = np.sign(predicted - last_close)
+    actual_move = np.sign(actual - last_close)
+    moved = predicted_move != 0
+    return {
+        'mae': float(np.mean(np.abs(error))),
+        'mape': float(np.mean(np.abs(error) / np.abs(actual)) * 100),
+        'directional_accuracy': float(np.mean(predicted_move[moved] == actual_move[moved]) * 100) if moved.any() else None,
+    }
+
+
+def baseline_forecasts(closes, last_close, n, lookback_period=DEFAULT_LOOKBACK):
+    """Naive (tomorrow = today) and random walk with drift (mean log return over the window)"""
+    log_returns = np.diff(np.log(np.asarray(closes, dtype=np.float64)))
+    # drift for window i is the mean of its lookback-1 log returns
+    drift = sliding_window_view(log_returns, lookback_period - 1).mean(axis=1)[:-1][-n:]
+    return {
+        'naive': last_close,
+        'random_walk': last_close * np.exp(drift),
+    }
+
+
+def backtest_symbols(model, histories, lookback_period=DEFAULT_LOOKBACK, eval_days=DEFAULT_EVAL_DAYS,
+                     scaling='expanding', batch_size=4096):
+    """
+    Backtest many symbols at once. histories maps symbol -> close price array.
+    All windows are concatenated and scored in batch_size predictions.
+    """
+    prepared = {}
+    for symbol, closes in histories.items():
+        if len(closes) <= lookback_period + 1:
+            logger.warning(f"Skipping {symbol}: only {len(closes)} bars")
+            continue
+        prepared[symbol] = (closes,) + build_windows(closes, lookback_period, eval_days, scaling)
+
+    if not prepared:
+        return {'symbols': {}, 'aggregate': {}}
+
+    all_windows = np.concatenate([p[1] for p in prepared.values()])
+    scaled_predictions = np.asarray(model.predict(all_windows[..., np.newaxis], batch_size=batch_size)).reshape(-1)
+
+    results = {}
+    offset = 0
+    for symbol, (closes, windows, last_close, targets, lo, span) in prepared.items():
+        n = len(windows)
+        predicted = scaled_predictions[offset:offset + n] * span + lo
+        offset += n
+
+        scores = {'model': score_forecasts(predicted, last_close, targets)}
+        for name, baseline in baseline_forecasts(closes, last_close, n, lookback_period).items():
+            scores[name] = score_forecasts(baseline, last_close, targets)
+        scores['windows'] = n
+        results[symbol] = scores
+
+    aggregate = {}
+    for method in ('model', 'naive', 'random_walk'):
+        aggregate[method] = {}
+        for metric in ('mae', 'mape', 'directional_accuracy'):
+            values = [r[method][metric] for r in results.values() if r[method][metric] is not None]
+            aggregate[method][metric] = float(np.mean(values)) if values else None
+
+    return {'symbols': results, 'aggregate': aggregate}
+
+
+def load_histories(store, symbols, start_date, end_date):
+    """Close series per symbol from a MarketDataStore; symbols that fail are skipped"""
+    histories = {}
+    for symbol in symbols:
+        try:
+            data = store.get_history(symbol, start_date, end_date)
+        except Exception as e:
+            logger.warning(f"Skipping {symbol}: {e}")
+            continue
+        if not data.empty:
+            histories[symbol] = data['Close'].values
+    return histories
+
+
+if __name__ == "__main__":
+    import os
+    from market_data import MarketDataStore, CSVProvider, DEFAULT_STORE_DIR
+    from numpy_lstm import load_stock_model
+
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the share prediction model")
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument('--csv-dir', help="Read histories from <SYMBOL>.csv fixtures instead of yfinance")
+    parser.add_argument('--years', type=float, default=3.3, help="Years of history to load")
+    parser.add_argument('--eval-days', type=int, default=DEFAULT_EVAL_DAYS)
+    parser.add_argument('--scaling', choices=['expanding', 'global'], default='expanding')
+    args = parser.parse_args()
+
+    model_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Share_Prediction.h5')
+    model = load_stock_model(model_path)
+
+    if args.csv_dir:
+        store = MarketDataStore(os.path.join(args.csv_dir, '.store'), CSVProvider(args.csv_dir))
+    else:
+        store = MarketDataStore(DEFAULT_STORE_DIR)
+
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=int(args.years * 365))
+    histories = load_histories(store, [s.upper() for s in args.symbols],
+                               start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d"))
+
+    started = time.perf_counter()
+    report = backtest_symbols(model, histories, eval_days=args.eval_days, scaling=args.scaling)
+    elapsed = time.perf_counter() - started
+
+    print(f"{'Symbol':<8} {'Method':<12} {'MAE':>10} {'MAPE %':>8} {'Dir. acc %':>11}")
+    print("-" * 52)
+    for symbol, scores in report['symbols'].items():
+        for method in ('model', 'naive', 'random_walk'):
+            s = scores[method]
+            direction = f"{s['directional_accuracy']:.1f}" if s['directional_accuracy'] is not None else "n/a"
+            print(f"{symbol:<8} {method:<12} {s['mae']:>10.3f} {s['mape']:>8.2f} {direction:>11}")
+    print("-" * 52)
+    for method, s in report['aggregate'].items():
+        direction = f"{s['directional_accuracy']:.1f}" if s['directional_accuracy'] is not None else "n/a"
+        print(f"{'ALL':<8} {method:<12} {s['mae']:>10.3f} {s['mape']:>8.2f} {direction:>11}")
+    print(f"\nScored {sum(s['windows'] for s in report['symbols'].values())} windows "
+          f"across {len(report['symbols'])} symbols in {elapsed:.2f}s")
@@ -0,0 +1,152 @@
+"""
+Chart downsampling module:
+- Largest-Triangle-Three-Buckets (LTTB) point selection that keeps the visual shape of a series
+- weekly/monthly OHLC aggregation of daily series, one reduceat pass per field
+- downsample_payload() applies either (or both) to a forecast payload, keeping the
+  uncertainty bands and percentile bands aligned with the selected dates
+"""
+
+import numpy as np
+
+RESOLUTIONS = ('daily', 'weekly', 'monthly')
+DEFAULT_CHART_POINTS = 300
+
+# Payload series that share the dates of each section; bands follow the selected rows
+SECTIONS = (
+    ('historical', 'historical_dates', 'historical_prices', ()),
+    ('future', 'future_dates', 'future_predictions', ('uncertainty_upper', 'uncertainty_lower')),
+)
+
+
+def _days(dates):
+    if getattr(dates, 'tz', None) is not None:
+        dates = dates.tz_localize(None)
+    return np.asarray(dates, dtype='datetime64[ns]').astype('datetime64[D]')
+
+
+def lttb_indices(y, max_points, x=None):
+    """
+    Indices of at most max_points rows chosen by LTTB; the first and last rows are always kept.
+    x defaults to the row position (one step per trading day). Each bucket's triangle areas
+    are computed in one vectorized expression; only the walk from bucket to bucket is a loop,
+    since every choice depends on the previous one.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if not max_points or n <= max_points:
+        return np.arange(n)
+    if max_points < 3:
+        return np.array([0, n - 1])[:max_points]
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+
+    # max_points - 2 buckets over rows 1..n-2; n > max_points so no bucket is empty
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.intp)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[:-1], edges[:-1]) / counts
+    mean_y = np.add.reduceat(y[:-1], edges[:-1]) / counts
+    # Third triangle vertex for bucket i: the mean of bucket i+1, or the last row for the final bucket
+    anchor_x = np.append(mean_x[1:], x[-1])
+    anchor_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(max_points, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[a] - anchor_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (anchor_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def period_ends(dates, resolution):
+    """(starts, ends): first and last row of each calendar week (Mon-Sun) or month"""
+    days = _days(dates)
+    if resolution == 'weekly':
+        keys = (days - np.datetime64('1970-01-05', 'D')).astype(np.int64) // 7  # 1970-01-05 was a Monday
+    elif resolution == 'monthly':
+        keys = days.astype('datetime64[M]').astype(np.int64)
+    else:
+        raise ValueError(f"Unknown resolution '{resolution}', expected one of {', '.join(RESOLUTIONS)}")
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+    ends = np.append(starts[1:], len(days)) - 1
+    return starts, ends
+
+
+def resample_ohlc(values, starts, ends):
+    """Open/high/low/close per period; the close is the last value, so the series end is preserved"""
+    values = np.asarray(values, dtype=np.float64)
+    return {
+        'open': values[starts],
+        'high': np.maximum.reduceat(values, starts),
+        'low': np.minimum.reduceat(values, starts),
+        'close': values[ends],
+    }
+
+
+def _take(payload, fields, rows):
+    for field in fields:
+        if field in payload:
+            payload[field] = payload[field][rows]
+
+
+def downsample_payload(payload, max_points=0, resolution=None):
+    """
+    Downsampled copy of a forecast payload (see main.format_forecast_payload).
+
+    resolution='weekly'|'monthly' aggregates each section to one row per period: prices become
+    the period close and <section>_open/_high/_low are added. max_points then thins each
+    section with LTTB on its price series. Summary stats are left as computed on daily data.
+    """
+    if payload.get('error') or (not max_points and resolution in (None, 'daily')):
+        return payload
+    downsampled = dict(payload)
+    if 'percentile_bands' in downsampled:
+        downsampled['percentile_bands'] = dict(downsampled['percentile_bands'])
+
+    for section, dates_field, prices_field, aligned in SECTIONS:
+        if dates_field not in downsampled:
+            continue
+        ohlc_fields = ()
+        if resolution not in (None, 'daily'):
+            starts, ends = period_ends(downsampled[dates_field], resolution)
+            ohlc = resample_ohlc(downsampled[prices_field], starts, ends)
+            _take(downsampled, (dates_field,) + aligned, ends)
+            downsampled[prices_field] = ohlc['close']
+            ohlc_fields = tuple(f'{section}_{name}' for name in ('open', 'high', 'low'))
+            for name in ('open', 'high', 'low'):
+                downsampled[f'{section}_{name}'] = ohlc[name]
+            if section == 'future' and 'percentile_bands' in downsampled:
+                _take(downsampled['percentile_bands'], list(downsampled['percentile_bands']), ends)
+
+        if max_points:
+            rows = lttb_indices(downsampled[prices_field], max_points)
+            _take(downsampled, (dates_field, prices_field) + aligned + ohlc_fields, rows)
+            if section == 'future' and 'percentile_bands' in downsampled:
+                _take(downsampled['percentile_bands'], list(downsampled['percentile_bands']), rows)
+
+    return downsampled
+
+
+if __name__ == "__main__":
+    import time
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    n = 2520  # ten years of trading days
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    dates = pd.bdate_range('2025-01-01', periods=n)
+
+    started = time.perf_counter()
+    rows = lttb_indices(prices, DEFAULT_CHART_POINTS)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"LTTB {n} -> {len(rows)} points in {elapsed:.2f} ms "
+          f"(max kept {prices[rows].max():.2f} vs {prices.max():.2f}, min {prices[rows].min():.2f} vs {prices.min():.2f})")
+
+    for resolution in ('weekly', 'monthly'):
+        started = time.perf_counter()
+        starts, ends = period_ends(dates, resolution)
+        ohlc = resample_ohlc(prices, starts, ends)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"{resolution:>8}: {n} -> {len(ends)} bars in {elapsed:.2f} ms, "
+              f"high/low preserved: {ohlc['high'].max() == prices.max() and ohlc['low'].min() == prices.min()}")
@@ -0,0 +1,87 @@
+"""
+Forecast cache module:
+- bounded LRU cache with a per-entry TTL for full /predict-stock payloads
+- keys combine symbol, horizon, last market date, model version and seed,
+  so a forecast is computed once per symbol per trading day
+- precomputed forecasts that were advanced bar by bar are approximate and get their own key
+- hit/miss/eviction counters for sizing
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+def forecast_cache_key(symbol, years, last_bar_date, model_version, seed=None, **options):
+    """Cache key for one forecast; extra request options (n_paths, stateful, ...) are folded in sorted"""
+    return (symbol, years, str(last_bar_date)[:10], model_version, seed) + tuple(sorted(options.items()))
+
+
+def precomputed_forecast_key(symbol, years, last_bar_date, model_version, incremental=False):
+    """
+    Key of a forecast_job.py forecast: the key of the default /predict-stock request after a full
+    rollout, and a separate incremental=True key once the forecast has been advanced bar by bar,
+    so approximate paths are never served as an exact computation.
+    """
+    options = {'incremental': True} if incremental else {}
+    return forecast_cache_key(symbol, years, last_bar_date, model_version, None, n_paths=0, stateful=False, **options)
+
+
+class ForecastCache:
+    """Thread-safe LRU cache with TTL expiry"""
+
+    def __init__(self, max_entries=256, ttl_seconds=12 * 3600, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if self.clock() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
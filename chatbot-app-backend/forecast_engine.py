@@ -0,0 +1,320 @@
+"""
+Forecast engine module:
+- wraps the share prediction model in a lightweight per-step predict function
+- runs the autoregressive rollout for one or many sequences at once
+- keeps the rolling input window in a preallocated buffer instead of np.append
+- optional stateful mode that carries LSTM state and feeds one point per day
+- Monte Carlo ensembles of many paths per symbol with percentile bands
+- multi-symbol rollouts that batch every symbol through the model together
+- chunked iteration so callers can stream results while the rollout runs
+"""
+
+import sys
+import logging
+
+import numpy as np
+
+from forecast_postprocess import TRADING_DAYS_PER_YEAR, clip_daily_returns
+
+logger = logging.getLogger(__name__)
+
+FORECAST_PERCENTILES = (5, 25, 50, 75, 95)
+
+_predict_fn_cache = {}
+
+
+def make_predict_fn(model):
+    """
+    Return a callable mapping a (batch, lookback, 1) array to a (batch,) array of scaled predictions.
+    Keras models are traced once into a tf.function so each step skips model.predict's
+    per-call dispatch overhead (data adapters, callbacks, progress bars).
+    """
+    key = id(model)
+    cached = _predict_fn_cache.get(key)
+    if cached is not None and cached[0] is model:
+        return cached[1]
+
+    predict_fn = None
+    # Only look at TensorFlow if it is already loaded; NumPy-backed models must not pull it in
+    tf = sys.modules.get('tensorflow')
+    if tf is not None and isinstance(model, tf.keras.Model):
+        graph_fn = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[tf.TensorSpec(shape=[None, None, 1], dtype=tf.float32)],
+        )
+
+        def predict_fn(x):
+            return graph_fn(tf.convert_to_tensor(x, dtype=tf.float32)).numpy().reshape(-1)
+
+    if predict_fn is None:
+        def predict_fn(x):
+            return np.asarray(model.predict(x, verbose=0)).reshape(-1)
+
+    _predict_fn_cache[key] = (model, predict_fn)
+    return predict_fn
+
+
+def daily_noise(daily_volatility, total_days, batch=1, rng=None):
+    """
+    Draw the per-day random returns used by the rollout, shape (batch, total_days).
+    Day 0 is noise-free. With batch=1 and the global RNG the draws match the
+    sequence of scalar np.random.normal calls made by the original step loop.
+    """
+    rng = np.random if rng is None else rng
+    noise = np.zeros((batch, total_days))
+    if total_days > 1:
+        noise[:, 1:] = rng.normal(0, daily_volatility, size=(batch, total_days - 1))
+    return noise
+
+
+class _WindowStepper:
+    """Re-runs the model over the latest lookback window each day (matches the original loop)"""
+
+    def __init__(self, model, windows_scaled, total_days):
+        self.predict_fn = make_predict_fn(model)
+        batch, self.lookback = windows_scaled.shape
+        self.buffer = np.empty((batch, self.lookback + total_days, 1), dtype=np.float32)
+        self.buffer[:, :self.lookback, 0] = windows_scaled
+        self.position = 0
+
+    def predict(self):
+        return self.predict_fn(self.buffer[:, self.position:self.position + self.lookback])
+
+    def push(self, scaled):
+        self.buffer[:, self.lookback + self.position, 0] = scaled
+        self.position += 1
+
+
+class _StatefulStepper:
+    """
+    Warms the LSTM up on the lookback window once, then feeds only the newest point each day.
+    Each step is O(1) in the lookback length. The first day matches the windowed mode; later
+    days see the whole generated history through the carried state instead of a fresh
+    60-point window, so paths differ slightly from the windowed rollout.
+    """
+
+    def __init__(self, model, windows_scaled, total_days):
+        if not hasattr(model, 'step'):
+            raise ValueError("Stateful rollout needs a model with initial_state()/step() (NumPy backend)")
+        self.model = model
+        self.output, self.states = model.initial_state(windows_scaled[..., np.newaxis])
+
+    def predict(self):
+        return self.output.reshape(-1)
+
+    def push(self, scaled):
+        self.output, self.states = self.model.step(scaled, self.states)
+
+
+def make_stepper(model, windows_scaled, total_days, stateful=False):
+    """Stepper that feeds the rollout: predict() the next scaled value, push() the chosen one"""
+    stepper_cls = _StatefulStepper if stateful else _WindowStepper
+    return stepper_cls(model, np.atleast_2d(windows_scaled), total_days)
+
+
+def apply_daily_noise(next_pred, prev_price, noise):
+    """Perturb a predicted price by its daily return, within the daily move and drawdown limits"""
+    return clip_daily_returns(next_pred + next_pred * noise, prev_price)
+
+
+def iter_rollout(model, windows_scaled, scale, min_, last_prices, noise, stateful=False,
+                 chunk_size=TRADING_DAYS_PER_YEAR, stepper=None):
+    """
+    Autoregressive rollout over all sequences in the batch, yielding (start_index, prices) chunks.
+
+    windows_scaled: (batch, lookback) last observed window in scaled units
+    scale, min_:    MinMaxScaler parameters, scalar or (batch,)
+    last_prices:    (batch,) last observed close
+    noise:          (batch, total_days) daily random returns from daily_noise()
+    stateful:       carry LSTM state forward instead of re-running the full window each day
+    stepper:        optional make_stepper() result, for callers that keep the LSTM state afterwards
+    """
+    windows_scaled = np.atleast_2d(windows_scaled)
+    batch = windows_scaled.shape[0]
+    total_days = noise.shape[1]
+    scale = np.broadcast_to(np.asarray(scale, dtype=np.float64).reshape(-1), (batch,))
+    min_ = np.broadcast_to(np.asarray(min_, dtype=np.float64).reshape(-1), (batch,))
+
+    stepper = stepper or make_stepper(model, windows_scaled, total_days, stateful)
+
+    prev_price = np.asarray(last_prices, dtype=np.float64).reshape(-1)
+    chunk = []
+    chunk_start = 0
+    for i in range(total_days):
+        next_pred = (stepper.predict() - min_) / scale
+
+        if i > 0:
+            next_pred = apply_daily_noise(next_pred, prev_price, noise[:, i])
+
+        chunk.append(next_pred)
+        prev_price = next_pred
+
+        if len(chunk) == chunk_size or i == total_days - 1:
+            yield chunk_start, np.stack(chunk, axis=1)
+            chunk_start = i + 1
+            chunk = []
+
+        if i < total_days - 1:
+            stepper.push(next_pred * scale + min_)
+
+
+def rollout(model, windows_scaled, scale, min_, last_prices, noise, stateful=False):
+    """Run the full rollout and return the (batch, total_days) price paths"""
+    total_days = noise.shape[1]
+    batch = np.atleast_2d(windows_scaled).shape[0]
+    paths = np.empty((batch, total_days))
+    for start, prices in iter_rollout(model, windows_scaled, scale, min_, last_prices, noise, stateful=stateful):
+        paths[:, start:start + prices.shape[1]] = prices
+    return paths
+
+
+def _rollout_inputs(closes, scaler, lookback_period):
+    """Scaled (1, lookback) window and daily log-return volatility over the last trading year"""
+    window_scaled = scaler.transform(closes[-lookback_period:].reshape(-1, 1)).reshape(1, -1)
+    daily_volatility = np.std(np.diff(np.log(closes[-TRADING_DAYS_PER_YEAR:])))
+    return window_scaled, daily_volatility
+
+
+def iter_forecast_paths(model, closes, scaler, total_days, n_paths=1, rng=None, stateful=False,
+                        lookback_period=60, chunk_size=TRADING_DAYS_PER_YEAR):
+    """
+    Simulate n_paths future price paths for one symbol in a single batched rollout.
+    The (n_paths, lookback, 1) batch goes through the model once per day.
+    Yields (start_index, (n_paths, chunk) prices) as each chunk of days completes.
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    window_scaled, daily_volatility = _rollout_inputs(closes, scaler, lookback_period)
+
+    noise = daily_noise(daily_volatility, total_days, batch=n_paths, rng=rng)
+    windows = np.repeat(window_scaled, n_paths, axis=0)
+    last_prices = np.full(n_paths, closes[-1])
+    yield from iter_rollout(model, windows, scaler.scale_, scaler.min_, last_prices, noise,
+                            stateful=stateful, chunk_size=chunk_size)
+
+
+def forecast_paths(model, closes, scaler, total_days, n_paths=1, rng=None, stateful=False, lookback_period=60):
+    """Collect iter_forecast_paths() into an (n_paths, total_days) array"""
+    paths = np.empty((n_paths, total_days))
+    for start, prices in iter_forecast_paths(model, closes, scaler, total_days, n_paths, rng, stateful, lookback_period):
+        paths[:, start:start + prices.shape[1]] = prices
+    return paths
+
+
+def forecast_paths_multi(model, closes_list, scalers, horizons, rngs=None, stateful=False, lookback_period=60):
+    """
+    One path per symbol, with every symbol rolled out together as a (num_symbols, lookback, 1)
+    batch so the model runs once per day for all of them. Each symbol draws its noise from
+    its own rng, so a symbol's path is the same as a single-symbol forecast_paths() call
+    with that rng. Returns a list of 1-D arrays, one per symbol, cut to its own horizon.
+    """
+    num_symbols = len(closes_list)
+    rngs = rngs or [None] * num_symbols
+    max_days = max(horizons)
+
+    windows = np.empty((num_symbols, lookback_period))
+    noise = np.zeros((num_symbols, max_days))
+    last_prices = np.empty(num_symbols)
+    for k, (closes, scaler, total_days, rng) in enumerate(zip(closes_list, scalers, horizons, rngs)):
+        closes = np.asarray(closes, dtype=np.float64)
+        window_scaled, daily_volatility = _rollout_inputs(closes, scaler, lookback_period)
+        windows[k] = window_scaled[0]
+        noise[k, :total_days] = daily_noise(daily_volatility, total_days, rng=rng)[0]
+        last_prices[k] = closes[-1]
+
+    scale = np.array([scaler.scale_[0] for scaler in scalers])
+    min_ = np.array([scaler.min_[0] for scaler in scalers])
+    paths = rollout(model, windows, scale, min_, last_prices, noise, stateful=stateful)
+    return [paths[k, :total_days] for k, total_days in enumerate(horizons)]
+
+
+def percentile_bands(paths, percentiles=FORECAST_PERCENTILES):
+    """
+    Per-day percentiles across paths, e.g. {'p5': array, ..., 'p95': array}.
+    One sort along the paths axis serves every percentile; the interpolation is np.percentile's
+    'linear' method step for step (same results), which re-partitions the array per call.
+    """
+    ordered = np.sort(paths, axis=0)
+    last = len(ordered) - 1
+    bands = {}
+    for p in percentiles:
+        index = last * (p / 100)
+        below = int(np.floor(index))
+        fraction = index - below
+        low = ordered[below].astype(np.float64)
+        high = ordered[min(below + 1, last)].astype(np.float64)
+        diff = high - low
+        bands[f"p{p}"] = high - diff * (1 - fraction) if fraction >= 0.5 else low + diff * fraction
+    return bands
+
+
+def summarize_paths(paths, current_price, years):
+    """
+    Summary stats for (n_paths, days) price paths, taken as the median across paths.
+    For a single path these are the plain per-path numbers.
+    """
+    paths = np.atleast_2d(paths)
+    summary = PathSummary(len(paths))
+    summary.update(paths)
+    return summary.result(current_price, years)
+
+
+class PathSummary:
+    """
+    summarize_paths() accumulated chunk by chunk, for callers that never hold the whole
+    (n_paths, days) array: per path it keeps the last price, the running peak and deepest
+    drawdown, and the count / mean / sum of squared deviations of the daily returns
+    (merged across chunks with the pairwise variance update), so memory is O(n_paths).
+    """
+
+    def __init__(self, n_paths):
+        self.last_price = None
+        self.peak = np.full(n_paths, -np.inf)
+        self.max_drawdown = np.zeros(n_paths)
+        self.count = 0
+        self.mean = np.zeros(n_paths)
+        self.m2 = np.zeros(n_paths)
+
+    def update(self, chunk):
+        """Add the next (n_paths, days) block of prices"""
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if self.last_price is None:
+            # Returns (and drawdowns, as with the cumulative return) start from the second day
+            prices, previous = chunk[:, 1:], chunk[:, :-1]
+        else:
+            prices, previous = chunk, np.hstack([self.last_price[:, np.newaxis], chunk[:, :-1]])
+        self.last_price = chunk[:, -1]
+        if prices.shape[1] == 0:
+            return
+
+        # One scratch array per quantity, updated in place: chunks can be a whole forecast
+        returns = np.subtract(prices, previous)
+        returns /= previous
+        n = returns.shape[1]
+        chunk_mean = returns.mean(axis=1)
+        delta = chunk_mean - self.mean
+        total = self.count + n
+        returns -= chunk_mean[:, np.newaxis]
+        np.square(returns, out=returns)
+        self.m2 += returns.sum(axis=1) + delta ** 2 * self.count * n / total
+        self.mean += delta * n / total
+        self.count = total
+
+        peaks = np.maximum.accumulate(prices, axis=1)
+        np.maximum(peaks, self.peak[:, np.newaxis], out=peaks)
+        self.peak = peaks[:, -1].copy()
+        np.divide(prices, peaks, out=peaks)
+        self.max_drawdown = np.minimum(self.max_drawdown, peaks.min(axis=1) - 1)
+
+    def result(self, current_price, years):
+        final_prices = self.last_price
+        total_return = (final_prices - current_price) / current_price * 100
+        annualized_return = ((final_prices / current_price) ** (1 / years) - 1) * 100
+        volatility = np.sqrt(self.m2 / max(self.count, 1)) * np.sqrt(TRADING_DAYS_PER_YEAR) * 100
+        return {
+            "current_price": float(current_price),
+            "final_price": float(np.median(final_prices)),
+            "total_return": float(np.median(total_return)),
+            "annualized_return": float(np.median(annualized_return)),
+            "volatility": float(np.median(volatility)),
+            "max_drawdown": float(np.median(self.max_drawdown * 100))
+        }
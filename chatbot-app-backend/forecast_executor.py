@@ -0,0 +1,98 @@
+"""
+Forecast executor module:
+- bounded worker pool that keeps CPU-bound forecasts off the asyncio event loop
+- rejects work once the queue is full instead of letting latency grow without bound
+- queue-depth, wait-time and outcome counters for monitoring
+"""
+
+import asyncio
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class ForecastQueueFull(Exception):
+    """Raised when the executor already holds max_workers + max_queue forecasts"""
+
+
+class ForecastExecutor:
+    """
+    Thread pool with a concurrency limit and a bounded queue. NumPy releases the GIL inside
+    the matrix ops that dominate a rollout, and the threads share the process-wide model,
+    forecast cache and single-flight state.
+    """
+
+    def __init__(self, max_workers=2, max_queue=32):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='forecast')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _execute(self, submitted_at, fn, args, kwargs):
+        wait = time.monotonic() - submitted_at
+        with self._lock:
+            self._running += 1
+            self._total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        else:
+            with self._lock:
+                self.completed += 1
+            return result
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on the pool and await its result without blocking the loop"""
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise ForecastQueueFull(f"Forecast queue is full ({self._pending} in progress or queued)")
+            self._pending += 1
+        try:
+            future = self._pool.submit(self._execute, time.monotonic(), fn, args, kwargs)
+        except BaseException:
+            self._release(None)
+            raise
+        # Released when the job finishes (or is cancelled before it starts), not when the caller
+        # stops waiting: a cancelled await leaves the job running on the pool
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def shutdown(self, wait=False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            started = self.completed + self.failed + self._running
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'running': self._running,
+                'queued': self._pending - self._running,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'avg_queue_wait_ms': self._total_wait / started * 1000 if started else 0.0,
+                'max_queue_wait_ms': self.max_wait * 1000,
+            }
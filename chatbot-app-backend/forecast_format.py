@@ -0,0 +1,150 @@
+"""
+Forecast response formats:
+- forecast payloads are built and cached with NumPy arrays and DatetimeIndex values
+- encoding happens once at the edge, chosen from the request's Accept header:
+    application/json                      plain JSON (default, what the frontend reads)
+    application/vnd.mufg.forecast+json    compact JSON: dates as start + business-day offsets,
+                                          float32 arrays as base64 little-endian buffers
+    application/x-msgpack                 same compact layout with raw bytes instead of base64
+- orjson and msgpack are optional; JSON falls back to the standard library encoder, and without
+  msgpack a request that accepts only application/x-msgpack is answered 406
+"""
+
+import base64
+import json
+
+import numpy as np
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_MEDIA_TYPE = 'application/json'
+COMPACT_MEDIA_TYPE = 'application/vnd.mufg.forecast+json'
+MSGPACK_MEDIA_TYPE = 'application/x-msgpack'
+
+DATE_FIELDS = ('historical_dates', 'future_dates')
+ARRAY_FIELDS = (
+    'historical_prices', 'future_predictions', 'uncertainty_upper', 'uncertainty_lower',
+    'historical_open', 'historical_high', 'historical_low', 'future_open', 'future_high', 'future_low',
+)
+
+
+def negotiate(accept):
+    """
+    Pick the response media type from an Accept header; JSON unless a compact type is asked for.
+    Without the msgpack package, a header that lists other types alongside msgpack gets one of
+    those, and a header that lists only msgpack raises a 406 HTTPException.
+    """
+    media_types = [part.split(';')[0].strip() for part in (accept or '').lower().split(',')]
+    if MSGPACK_MEDIA_TYPE in media_types:
+        if msgpack is not None:
+            return MSGPACK_MEDIA_TYPE
+        if not any(media_type and media_type != MSGPACK_MEDIA_TYPE for media_type in media_types):
+            raise HTTPException(status_code=406, detail=f"{MSGPACK_MEDIA_TYPE} responses need the msgpack package")
+    if COMPACT_MEDIA_TYPE in media_types:
+        return COMPACT_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
+
+
+def _day_array(dates):
+    if getattr(dates, 'tz', None) is not None:
+        dates = dates.tz_localize(None)  # keep the exchange-local calendar date
+    return np.asarray(dates, dtype='datetime64[ns]').astype('datetime64[D]')
+
+
+def format_dates(dates):
+    """'%Y-%m-%d' strings for a DatetimeIndex, without a per-element strftime"""
+    return np.datetime_as_string(_day_array(dates), unit='D').tolist()
+
+
+def to_json_payload(payload):
+    """Plain JSON-ready dict: dates as strings, arrays as float lists"""
+    if payload.get('error'):
+        return payload
+    converted = dict(payload)
+    for field in DATE_FIELDS:
+        if field in converted:
+            converted[field] = format_dates(converted[field])
+    for field in ARRAY_FIELDS:
+        if field in converted:
+            converted[field] = np.asarray(converted[field], dtype=np.float64).tolist()
+    if 'percentile_bands' in converted:
+        converted['percentile_bands'] = {
+            name: np.asarray(band, dtype=np.float64).tolist() for name, band in converted['percentile_bands'].items()
+        }
+    return converted
+
+
+def _encode_array(values, dtype, binary):
+    data = np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder('<')).tobytes()
+    return {'dtype': dtype, 'length': len(values), 'data': data if binary else base64.b64encode(data).decode('ascii')}
+
+
+def _encode_dates(dates, binary):
+    days = _day_array(dates)
+    if len(days) == 0:
+        return {'start': None, 'periods': 0}
+    start = days[0]
+    offsets = np.busday_count(start, days)
+    encoded = {'start': str(start)}
+    if np.array_equal(offsets, np.arange(len(days))):
+        encoded['periods'] = len(days)  # consecutive business days, e.g. the forecast horizon
+    else:
+        encoded['offsets'] = _encode_array(offsets, 'int32', binary)
+    return encoded
+
+
+def to_compact_payload(payload, binary=False):
+    """
+    Compact layout: each date field becomes {'start', 'periods'} or {'start', 'offsets'}
+    (business days from start); each price array becomes {'dtype': 'float32', 'length', 'data'}.
+    """
+    if payload.get('error'):
+        return payload
+    converted = dict(payload)
+    for field in DATE_FIELDS:
+        if field in converted:
+            converted[field] = _encode_dates(converted[field], binary)
+    for field in ARRAY_FIELDS:
+        if field in converted:
+            converted[field] = _encode_array(converted[field], 'float32', binary)
+    if 'percentile_bands' in converted:
+        converted['percentile_bands'] = {
+            name: _encode_array(band, 'float32', binary) for name, band in converted['percentile_bands'].items()
+        }
+    converted['format'] = 'compact-v1'
+    return converted
+
+
+def convert_payload(payload, media_type):
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return to_compact_payload(payload, binary=True)
+    if media_type == COMPACT_MEDIA_TYPE:
+        return to_compact_payload(payload)
+    return to_json_payload(payload)
+
+
+def _dumps_json(content):
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, separators=(',', ':')).encode('utf-8')
+
+
+def render(content, media_type):
+    """Serialize already-converted content into a Response of the given media type"""
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return Response(msgpack.packb(content, use_bin_type=True), media_type=MSGPACK_MEDIA_TYPE)
+    return Response(_dumps_json(content), media_type=media_type)
+
+
+def render_forecast(payload, media_type):
+    return render(convert_payload(payload, media_type), media_type)
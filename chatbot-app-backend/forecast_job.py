@@ -0,0 +1,148 @@
+"""
+Nightly forecast precompute job:
+- refreshes the market data store for every watchlist symbol
+- runs one rollout per symbol across a process pool (one model copy per worker process)
+- keeps a ForecastState per symbol so each night only advances the forecast by the new bars,
+  with a full rollout only when the state cannot be advanced
+- writes a payload per configured horizon into the ForecastStore that /predict-stock reads,
+  under the same cache key the API computes, so common requests become a lookup; forecasts
+  advanced bar by bar are approximate and go under a separate incremental key instead
+
+Run after the close, e.g. from cron:  30 22 * * 1-5  python forecast_job.py
+"""
+
+import argparse
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from forecast_cache import precomputed_forecast_key
+from forecast_engine import TRADING_DAYS_PER_YEAR
+from forecast_payload import forecast_history_range, get_future_dates, format_forecast_payload
+from forecast_state import update_forecast_state
+from forecast_store import ForecastStore, DEFAULT_FORECAST_STORE_DIR
+from market_data import MarketDataStore, CSVProvider, DEFAULT_STORE_DIR
+from model_registry import ModelRegistry
+from numpy_lstm import load_stock_model, model_file_version, stock_model_artifact
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WATCHLIST = os.getenv(
+    'FORECAST_WATCHLIST', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'watchlist.txt')
+)
+DEFAULT_HORIZONS = tuple(int(y) for y in os.getenv('FORECAST_JOB_YEARS', '1,2,5,10').split(','))
+MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Share_Prediction.h5')
+
+# Per-process state, set up once by _init_worker
+_worker = {}
+
+
+def load_watchlist(path=DEFAULT_WATCHLIST):
+    """Symbols from a text file, one or more per line; '#' starts a comment"""
+    symbols = []
+    with open(path) as f:
+        for line in f:
+            for symbol in line.split('#', 1)[0].replace(',', ' ').split():
+                symbol = symbol.upper()
+                if symbol not in symbols:
+                    symbols.append(symbol)
+    return symbols
+
+
+def _init_worker(market_dir, csv_dir, forecast_dir):
+    provider = CSVProvider(csv_dir) if csv_dir else None
+    # Same model resolution as the API, so stored forecasts land under the keys it computes
+    _worker['registry'] = ModelRegistry(load_stock_model(MODEL_PATH), model_file_version(stock_model_artifact(MODEL_PATH)))
+    _worker['market_store'] = MarketDataStore(market_dir, provider)
+    _worker['forecast_store'] = ForecastStore(forecast_dir)
+    _worker['state_dir'] = os.path.join(forecast_dir, 'state')
+
+
+def precompute_symbol(symbol, horizons, force=False):
+    """
+    Refresh one symbol and store a forecast per horizon.
+    A single forecast state covers the longest horizon; each shorter horizon is its prefix, which
+    is exactly the rollout that horizon alone would run with the same noise draws.
+    """
+    started = time.perf_counter()
+    result = {'symbol': symbol, 'computed': [], 'skipped': [], 'mode': None, 'error': None}
+    try:
+        stock_data = _worker['market_store'].get_history(symbol, *forecast_history_range())
+        if stock_data.empty:
+            raise ValueError("no data")
+
+        store = _worker['forecast_store']
+        model, model_version = _worker['registry'].get(symbol)
+        keys = {(years, incremental): precomputed_forecast_key(symbol, years, stock_data.index[-1],
+                                                               model_version, incremental)
+                for years in horizons for incremental in (False, True)}
+        todo = [years for years in horizons
+                if force or not (store.contains(keys[years, False]) or store.contains(keys[years, True]))]
+        result['skipped'] = [years for years in horizons if years not in todo]
+
+        if todo:
+            state, result['mode'] = update_forecast_state(model, stock_data, symbol, max(horizons),
+                                                          model_version, _worker['state_dir'])
+            # Any bar applied since the last full rollout makes the path an approximation
+            incremental = state.advances > 0
+            for years in todo:
+                payload = format_forecast_payload(stock_data, get_future_dates(stock_data, years),
+                                                  state.path[:years * TRADING_DAYS_PER_YEAR], years)
+                if incremental:
+                    payload['incremental'] = {'days_advanced': state.advances, 'method': 'rescaled'}
+                store.put(keys[years, incremental], payload)
+                result['computed'].append(years)
+    except Exception as e:
+        result['error'] = str(e)
+    result['seconds'] = time.perf_counter() - started
+    return result
+
+
+def run_job(symbols, horizons=DEFAULT_HORIZONS, workers=None, market_dir=DEFAULT_STORE_DIR, csv_dir=None,
+            forecast_dir=DEFAULT_FORECAST_STORE_DIR, force=False, keep_days=7):
+    """Precompute every symbol on a process pool; returns the per-symbol results"""
+    workers = workers or os.cpu_count() or 1
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(market_dir, csv_dir, forecast_dir)) as pool:
+        futures = [pool.submit(precompute_symbol, symbol, tuple(horizons), force) for symbol in symbols]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result['error']:
+                logger.warning(f"{result['symbol']}: {result['error']}")
+    pruned = ForecastStore(forecast_dir).prune(keep_days)
+    if pruned:
+        logger.info(f"Pruned {pruned} forecasts older than {keep_days} days")
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    parser = argparse.ArgumentParser(description="Precompute forecasts for the watchlist")
+    parser.add_argument('symbols', nargs='*', help="Defaults to the watchlist file")
+    parser.add_argument('--watchlist', default=DEFAULT_WATCHLIST)
+    parser.add_argument('--years', type=int, nargs='+', default=list(DEFAULT_HORIZONS))
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument('--csv-dir', help="Read histories from <SYMBOL>.csv fixtures instead of yfinance")
+    parser.add_argument('--market-dir', default=DEFAULT_STORE_DIR)
+    parser.add_argument('--forecast-dir', default=DEFAULT_FORECAST_STORE_DIR)
+    parser.add_argument('--force', action='store_true', help="Recompute forecasts that are already stored")
+    parser.add_argument('--keep-days', type=int, default=7)
+    args = parser.parse_args()
+
+    symbols = [s.upper() for s in args.symbols] or load_watchlist(args.watchlist)
+    started = time.perf_counter()
+    results = run_job(symbols, args.years, args.workers, args.market_dir, args.csv_dir,
+                      args.forecast_dir, args.force, args.keep_days)
+    elapsed = time.perf_counter() - started
+
+    computed = sum(len(r['computed']) for r in results)
+    skipped = sum(len(r['skipped']) for r in results)
+    failed = [r['symbol'] for r in results if r['error']]
+    modes = {mode: sum(r['mode'] == mode for r in results) for mode in ('advanced', 'rerolled', 'unchanged')}
+    print(f"{len(symbols)} symbols in {elapsed:.1f}s: {computed} forecasts computed "
+          f"({modes['advanced']} symbols advanced incrementally, {modes['rerolled']} full rollouts), "
+          f"{skipped} already stored, {len(failed)} failed{': ' + ', '.join(failed) if failed else ''}")
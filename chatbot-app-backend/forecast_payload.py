@@ -0,0 +1,110 @@
+"""
+Forecast payload module:
+- builds the /predict-stock payload from a price history and a model, with no web framework imports
+- shared by the API (main.py) and the nightly precompute job (forecast_job.py) so both
+  produce identical payloads under identical cache keys
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+
+from forecast_engine import TRADING_DAYS_PER_YEAR, forecast_paths, percentile_bands, summarize_paths
+
+HISTORY_LOOKBACK_DAYS = 3 * 365 + 120   # history fetched for a forecast
+CHART_HISTORY_DAYS = 730                # history returned alongside it
+
+
+def forecast_history_range(now=None):
+    """(start_date, end_date) strings of the history a forecast is built from"""
+    now = now or datetime.now()
+    return (now - timedelta(days=HISTORY_LOOKBACK_DAYS)).strftime("%Y-%m-%d"), now.strftime("%Y-%m-%d")
+
+
+def prepare_data(stock_data, lookback_period=60):
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    scaler.fit(stock_data['Close'].values.reshape(-1, 1))
+    return scaler
+
+
+def get_future_dates(stock_data, years):
+    """
+    The pd.bdate_range(start=last_date + 1 day, periods=...) index, built with np.busday_offset:
+    bdate_range steps its offset once per day in Python, about 60 ms for ten years
+    """
+    start = (stock_data.index[-1] + timedelta(days=1)).normalize()
+    days = np.busday_offset(np.datetime64(start.tz_localize(None).date()),
+                            np.arange(years * TRADING_DAYS_PER_YEAR), roll='forward')
+    future_dates = pd.DatetimeIndex(days, freq='B').as_unit(start.unit)
+    if start.tz is not None:
+        future_dates = pd.DatetimeIndex(future_dates.tz_localize(start.tz), freq='B')
+    return future_dates
+
+
+def predict_future_years_realistic(model, stock_data, scaler, years=2, lookback_period=60, stateful=False,
+                                   n_paths=1, rng=None):
+    total_days = years * TRADING_DAYS_PER_YEAR
+    future_dates = get_future_dates(stock_data, years)
+
+    paths = forecast_paths(
+        model, stock_data['Close'].values, scaler, total_days,
+        n_paths=n_paths, rng=rng, stateful=stateful, lookback_period=lookback_period
+    )
+
+    return future_dates, paths[0] if n_paths == 1 else paths
+
+
+def get_historical_series(stock_data):
+    historical_cutoff = datetime.now() - timedelta(days=CHART_HISTORY_DAYS)
+    if stock_data.index.tz is not None:
+        historical_cutoff = historical_cutoff.replace(tzinfo=stock_data.index.tz)
+
+    historical_mask = stock_data.index >= historical_cutoff
+    return stock_data.index[historical_mask], stock_data['Close'].values[historical_mask]
+
+
+def format_forecast_payload(stock_data, future_dates, future_paths, years, n_paths=0, seed=None):
+    current_price = stock_data['Close'].iloc[-1]
+    if n_paths > 0:
+        future_paths = np.atleast_2d(future_paths)
+        return format_ensemble_payload(stock_data, future_dates, percentile_bands(future_paths),
+                                       summarize_paths(future_paths, current_price, years), n_paths, seed)
+
+    future_predictions = future_paths
+    prediction_std = np.std(np.diff(future_predictions)) * np.sqrt(np.arange(len(future_predictions)))
+    return _payload(stock_data, future_dates, future_predictions, future_predictions + prediction_std,
+                    future_predictions - prediction_std, summarize_paths(future_predictions, current_price, years))
+
+
+def format_ensemble_payload(stock_data, future_dates, bands, stats, n_paths, seed=None):
+    """Ensemble payload from per-day percentile bands and summary stats already computed (e.g. per chunk)"""
+    return _payload(stock_data, future_dates, bands["p50"], bands["p95"], bands["p5"], stats,
+                    percentile_bands=bands, ensemble={"n_paths": n_paths, "seed": seed})
+
+
+def _payload(stock_data, future_dates, future_predictions, uncertainty_upper, uncertainty_lower, stats, **extras):
+    historical_dates, historical_prices = get_historical_series(stock_data)
+    # Arrays stay as NumPy/DatetimeIndex values; forecast_format encodes them per response
+    return {
+        "historical_dates": historical_dates,
+        "historical_prices": historical_prices,
+        "future_dates": future_dates,
+        "future_predictions": future_predictions,
+        "uncertainty_upper": uncertainty_upper,
+        "uncertainty_lower": uncertainty_lower,
+        "stats": stats,
+        **extras,
+        "error": False
+    }
+
+
+def build_forecast_payload(model, stock_data, years, n_paths=0, seed=None, stateful=False):
+    scaler = prepare_data(stock_data)
+
+    rng = np.random.default_rng(seed) if seed is not None else None
+    future_dates, future_paths = predict_future_years_realistic(
+        model, stock_data, scaler, years, stateful=stateful, n_paths=max(1, n_paths), rng=rng
+    )
+    return format_forecast_payload(stock_data, future_dates, future_paths, years, n_paths, seed)
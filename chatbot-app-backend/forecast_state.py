@@ -0,0 +1,199 @@
+"""
+Incremental forecast module:
+- ForecastState keeps what a single-path forecast needs to move forward one observed day:
+  scaler range, the simulated path, the RNG state and, in stateful mode, the LSTM state
+- advance() rebases the remaining path onto the new close and simulates one more day at the
+  end, so a daily refresh costs one model step per new bar instead of a full rollout. This is
+  an approximation: the suffix is rescaled, not re-rolled from the observed bar, so it matches
+  a full re-roll exactly only when the close lands on the forecast, and drifts from it by less
+  than the close's relative surprise otherwise (REBASE_TOLERANCE bounds that surprise)
+- anything that invalidates the path (new scaler range, a large surprise, too many
+  incremental days, a different model) falls back to a full re-roll
+- states persist per symbol as <SYMBOL>.npz + <SYMBOL>.json
+"""
+
+import json
+import os
+import logging
+
+import numpy as np
+import pandas as pd
+
+from forecast_engine import (
+    TRADING_DAYS_PER_YEAR, apply_daily_noise, daily_noise, iter_rollout, make_predict_fn, make_stepper
+)
+from forecast_payload import prepare_data
+
+logger = logging.getLogger(__name__)
+
+MAX_INCREMENTAL_DAYS = int(os.getenv('FORECAST_MAX_INCREMENTAL_DAYS', '21'))
+REBASE_TOLERANCE = float(os.getenv('FORECAST_REBASE_TOLERANCE', '0.1'))
+
+
+class ForecastState:
+    """
+    One symbol's forecast and everything needed to extend it.
+    path[i] is the forecast close for the i-th trading day after last_bar_date.
+    """
+
+    def __init__(self, symbol, years, model_version, last_bar_date, data_min, data_max, path, rng_state,
+                 daily_volatility, stateful=False, lstm_states=None, advances=0, lookback_period=60):
+        self.symbol = symbol
+        self.years = years
+        self.model_version = model_version
+        self.last_bar_date = str(last_bar_date)[:10]
+        self.data_min = float(data_min)
+        self.data_max = float(data_max)
+        self.path = np.asarray(path, dtype=np.float64)
+        self.rng_state = rng_state
+        self.daily_volatility = float(daily_volatility)
+        self.stateful = stateful
+        self.lstm_states = lstm_states
+        self.advances = advances
+        self.lookback_period = lookback_period
+
+    @property
+    def scale(self):
+        return 1.0 / (self.data_max - self.data_min) if self.data_max > self.data_min else 1.0
+
+    @property
+    def min_(self):
+        return -self.data_min * self.scale
+
+    @classmethod
+    def roll(cls, model, stock_data, symbol, years, model_version, stateful=False, rng=None, lookback_period=60):
+        """Full rollout from the end of stock_data, like forecast_paths() with one path"""
+        closes = stock_data['Close'].values.astype(np.float64)
+        scaler = prepare_data(stock_data)
+        rng = rng or np.random.default_rng()
+        total_days = years * TRADING_DAYS_PER_YEAR
+
+        window = scaler.transform(closes[-lookback_period:].reshape(-1, 1)).reshape(1, -1)
+        daily_volatility = np.std(np.diff(np.log(closes[-TRADING_DAYS_PER_YEAR:])))
+        noise = daily_noise(daily_volatility, total_days, rng=rng)
+
+        stepper = make_stepper(model, window, total_days, stateful)
+        path = np.empty(total_days)
+        for start, prices in iter_rollout(model, window, scaler.scale_, scaler.min_, closes[-1:], noise,
+                                          stateful=stateful, stepper=stepper):
+            path[start:start + prices.shape[1]] = prices[0]
+
+        # The stepper has consumed every day but the last; keep its state for extending the path
+        lstm_states = [(h.copy(), c.copy()) for h, c in stepper.states] if stateful else None
+        return cls(symbol, years, model_version, stock_data.index[-1], scaler.data_min_[0], scaler.data_max_[0],
+                   path, rng.bit_generator.state, daily_volatility, stateful, lstm_states, 0, lookback_period)
+
+    def new_bars(self, stock_data):
+        return stock_data.loc[stock_data.index > pd.Timestamp(self.last_bar_date), 'Close'].values
+
+    def can_advance(self, stock_data, model_version):
+        """Why the state cannot follow stock_data incrementally, or None if it can"""
+        if model_version != self.model_version:
+            return "model version changed"
+        new_closes = self.new_bars(stock_data)
+        if self.advances + len(new_closes) > MAX_INCREMENTAL_DAYS:
+            return f"more than {MAX_INCREMENTAL_DAYS} incremental days since the last full rollout"
+        scaler = prepare_data(stock_data)
+        if (scaler.data_min_[0], scaler.data_max_[0]) != (self.data_min, self.data_max):
+            return "scaler range changed"
+        for offset, close in enumerate(new_closes):
+            if abs(close / self.path[offset] - 1) > REBASE_TOLERANCE:
+                return f"close {close:.2f} is more than {REBASE_TOLERANCE:.0%} away from the forecast"
+        return None
+
+    def advance(self, model, stock_data):
+        """
+        Move the forecast onto the bars of stock_data after last_bar_date, one O(1) step per bar:
+        drop the day that is now observed, rescale the rest by observed / forecast close, and
+        simulate one new day at the end from the rebased tail. Returns the number of bars applied.
+        The observed bar is not fed to the model and the suffix is not re-rolled, so the result
+        is a rescaled approximation of a full rollout (see the module docstring); in stateful mode
+        the carried LSTM state also saw the un-rebased path. The periodic full rollout resets both.
+        """
+        new_closes = self.new_bars(stock_data)
+        if len(new_closes) == 0:
+            return 0
+
+        rng = np.random.default_rng()
+        rng.bit_generator.state = self.rng_state
+        closes = stock_data['Close'].values.astype(np.float64)
+        self.daily_volatility = np.std(np.diff(np.log(closes[-TRADING_DAYS_PER_YEAR:])))
+
+        for close in new_closes:
+            self.path = self.path[1:] * (close / self.path[0])
+            next_pred = (self._predict_next(model) - self.min_) / self.scale
+            noise = rng.normal(0, self.daily_volatility)
+            self.path = np.append(self.path, apply_daily_noise(next_pred, self.path[-1], noise))
+
+        self.rng_state = rng.bit_generator.state
+        self.last_bar_date = str(stock_data.index[-1])[:10]
+        self.advances += len(new_closes)
+        return len(new_closes)
+
+    def _predict_next(self, model):
+        """Scaled model output for the day after the end of path"""
+        last_scaled = self.path[-self.lookback_period:] * self.scale + self.min_
+        if self.stateful:
+            output, self.lstm_states = model.step(np.array([last_scaled[-1]]), self.lstm_states)
+            return float(np.asarray(output).reshape(-1)[0])
+        window = last_scaled.reshape(1, -1, 1).astype(np.float32)
+        return float(make_predict_fn(model)(window)[0])
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.symbol)
+        arrays = {'path': self.path}
+        for k, (h, c) in enumerate(self.lstm_states or []):
+            arrays[f'h{k}'], arrays[f'c{k}'] = h, c
+        np.savez(base + '.tmp.npz', **arrays)
+        os.replace(base + '.tmp.npz', base + '.npz')
+
+        meta = {
+            'symbol': self.symbol, 'years': self.years, 'model_version': self.model_version,
+            'last_bar_date': self.last_bar_date, 'data_min': self.data_min, 'data_max': self.data_max,
+            'rng_state': self.rng_state, 'daily_volatility': self.daily_volatility,
+            'stateful': self.stateful, 'lstm_layers': len(self.lstm_states or []),
+            'advances': self.advances, 'lookback_period': self.lookback_period,
+        }
+        with open(base + '.json.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(base + '.json.tmp', base + '.json')
+
+    @classmethod
+    def load(cls, directory, symbol):
+        """Saved state for symbol, or None"""
+        base = os.path.join(directory, symbol)
+        try:
+            with open(base + '.json') as f:
+                meta = json.load(f)
+            with np.load(base + '.npz') as arrays:
+                path = arrays['path']
+                lstm_states = [(arrays[f'h{k}'], arrays[f'c{k}']) for k in range(meta.pop('lstm_layers'))]
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(path=path, lstm_states=lstm_states or None, **meta)
+
+
+def update_forecast_state(model, stock_data, symbol, years, model_version, directory, stateful=False):
+    """
+    Bring the saved state for symbol up to date with stock_data and save it.
+    Returns (state, mode) with mode 'unchanged', 'advanced' or 'rerolled'.
+    """
+    state = ForecastState.load(directory, symbol)
+    reason = "no saved state"
+    if state is not None:
+        if (state.years, state.stateful) != (years, stateful):
+            reason = "horizon or mode changed"
+        else:
+            reason = state.can_advance(stock_data, model_version)
+
+    if reason is None:
+        mode = 'advanced' if state.advance(model, stock_data) else 'unchanged'
+    else:
+        logger.info(f"Full rollout for {symbol}: {reason}")
+        state = ForecastState.roll(model, stock_data, symbol, years, model_version, stateful=stateful)
+        mode = 'rerolled'
+
+    if mode != 'unchanged':
+        state.save(directory)
+    return state, mode
@@ -0,0 +1,145 @@
+"""
+Forecast store module:
+- persistent, on-disk counterpart of ForecastCache for precomputed /predict-stock payloads
+- one .npz (arrays, dates) plus one .json (key, stats, extras) per forecast, written atomically
+  so the API can read while the nightly job writes
+- entries are addressed by the same keys as ForecastCache; a new trading day or model
+  version simply produces a new key, and prune() drops old files
+- the entry count is kept up to date by put() and prune(), with a full directory scan at most
+  every FORECAST_STORE_RECOUNT_SECONDS to pick up forecasts other processes (the nightly job) wrote
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FORECAST_STORE_DIR = os.getenv(
+    'FORECAST_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'forecasts')
+)
+
+DATE_FIELDS = ('historical_dates', 'future_dates')
+ARRAY_FIELDS = ('historical_prices', 'future_predictions', 'uncertainty_upper', 'uncertainty_lower')
+BAND_PREFIX = 'band_'
+RECOUNT_SECONDS = float(os.getenv('FORECAST_STORE_RECOUNT_SECONDS', '600'))
+
+
+class ForecastStore:
+    """
+    <directory>/<SYMBOL>/<key digest>.npz    dates as datetime64[D], float64 series, percentile bands
+    <directory>/<SYMBOL>/<key digest>.json   key, stats and the remaining payload fields
+    """
+
+    def __init__(self, directory=DEFAULT_FORECAST_STORE_DIR, recount_seconds=RECOUNT_SECONDS, clock=time.monotonic):
+        self.directory = directory
+        self.recount_seconds = recount_seconds
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._entries = None        # counted on the first stats() call
+        self._counted_at = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key, suffix):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:20]
+        return os.path.join(self.directory, key[0], f"{digest}.{suffix}")
+
+    def get(self, key):
+        """Stored payload for key, or None"""
+        try:
+            with open(self._path(key, 'json')) as f:
+                meta = json.load(f)
+            with np.load(self._path(key, 'npz')) as arrays:
+                payload = {field: pd.DatetimeIndex(arrays[field]) for field in DATE_FIELDS}
+                payload.update({field: arrays[field] for field in ARRAY_FIELDS})
+                bands = {name[len(BAND_PREFIX):]: arrays[name] for name in arrays.files if name.startswith(BAND_PREFIX)}
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # A digest collision or a stale file from an older key layout must never be served
+        if meta.get('key') != json.loads(json.dumps(list(key), default=str)):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        payload.update(meta['payload'])
+        if bands:
+            payload['percentile_bands'] = bands
+        with self._lock:
+            self.hits += 1
+        return payload
+
+    def put(self, key, payload):
+        os.makedirs(os.path.join(self.directory, key[0]), exist_ok=True)
+        arrays = {field: np.asarray(payload[field], dtype='datetime64[ns]').astype('datetime64[D]')
+                  for field in DATE_FIELDS}
+        arrays.update({field: np.asarray(payload[field], dtype=np.float64) for field in ARRAY_FIELDS})
+        for name, band in payload.get('percentile_bands', {}).items():
+            arrays[BAND_PREFIX + name] = np.asarray(band, dtype=np.float64)
+        rest = {field: value for field, value in payload.items()
+                if field not in DATE_FIELDS + ARRAY_FIELDS and field != 'percentile_bands'}
+
+        # The .npz goes first: get() only succeeds once the matching .json is in place
+        npz_path = self._path(key, 'npz')
+        tmp_path = npz_path + '.tmp.npz'
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, npz_path)
+
+        json_path = self._path(key, 'json')
+        is_new = not os.path.exists(json_path)
+        tmp_path = json_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'key': list(key), 'created_at': time.time(), 'payload': rest}, f, default=str)
+        os.replace(tmp_path, json_path)
+        if is_new:
+            with self._lock:
+                if self._entries is not None:
+                    self._entries += 1
+
+    def contains(self, key):
+        return os.path.exists(self._path(key, 'json'))
+
+    def prune(self, max_age_days=7):
+        """Delete forecasts written more than max_age_days ago; returns the number removed"""
+        cutoff = time.time() - max_age_days * 86400
+        removed = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.endswith(('.json', '.npz')) and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += name.endswith('.json')
+        with self._lock:
+            if self._entries is not None:
+                self._entries = max(0, self._entries - removed)
+        return removed
+
+    def _count_entries(self):
+        return sum(name.endswith('.json') for _, _, files in os.walk(self.directory) for name in files)
+
+    def stats(self):
+        now = self.clock()
+        with self._lock:
+            stale = self._counted_at is None or now - self._counted_at >= self.recount_seconds
+        if stale:
+            entries = self._count_entries()
+            with self._lock:
+                self._entries, self._counted_at = entries, now
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': self._entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
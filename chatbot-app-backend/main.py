@@ -1,28 +1,44 @@
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from openai import OpenAI
 import json
-from model import SuperannuationPredictor
+from model import ASSET_CORRELATIONS, SuperannuationPredictor
 import logging
 
 import requests  # or the DeepSeek client
 from LLM.LLM1 import callLLM1
 from LLM.LLM2 import callLLM2
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 import pandas as pd
 import numpy as np
-import yfinance as yf
-from sklearn.preprocessing import MinMaxScaler
-from tensorflow.keras.models import load_model
-from datetime import datetime, timedelta
 import os
 import mysql.connector
 from fastapi import Depends
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, Header
 from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
+from numpy_lstm import load_stock_model, model_file_version, stock_model_artifact
+from model_registry import ModelRegistry
+from market_data import MarketDataStore
+from single_flight import SingleFlight
+from forecast_executor import ForecastExecutor, ForecastQueueFull
+from forecast_format import (
+    negotiate, render, render_forecast, convert_payload, to_json_payload, format_dates
+)
+from downsample import RESOLUTIONS, downsample_payload
+from forecast_cache import ForecastCache, forecast_cache_key, precomputed_forecast_key
+from forecast_store import ForecastStore
+from forecast_payload import (
+    forecast_history_range, prepare_data, get_future_dates, get_historical_series,
+    format_forecast_payload, format_ensemble_payload, build_forecast_payload
+)
+from portfolio_forecast import VAR_CONFIDENCE, portfolio_forecast
+from forecast_engine import (
+    TRADING_DAYS_PER_YEAR, PathSummary, forecast_paths_multi, iter_forecast_paths, percentile_bands
+)
 env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env'))
 load_dotenv(dotenv_path=env_path)
 API_KEY = os.getenv("Quotes_API")
@@ -106,6 +122,7 @@ def init_db():
     conn.close()
 
 from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import FastAPI
 
 @asynccontextmanager
@@ -115,6 +132,7 @@ async def lifespan(app: FastAPI):
 
     yield  
 
+    forecast_executor.shutdown()
     print("App shutting down...")
 
 # --- Models ---
@@ -165,19 +183,74 @@ app.add_middleware(
 
 try:
     model_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'Share_Prediction.h5')
-    stock_model = load_model(model_path)
-    print(f"Stock prediction model loaded successfully from {model_path}")
+    stock_model = load_stock_model(model_path)
+    stock_model_version = model_file_version(stock_model_artifact(model_path))
+    print(f"Stock prediction model loaded successfully from {stock_model_artifact(model_path)}")
 except Exception as e:
     print(f"Error loading model: {e}")
     stock_model = None
+    stock_model_version = None
+
+market_store = MarketDataStore()
+forecast_flight = SingleFlight()
+forecast_executor = ForecastExecutor(
+    max_workers=int(os.getenv("FORECAST_WORKERS", "2")),
+    max_queue=int(os.getenv("FORECAST_MAX_QUEUE", "32"))
+)
+forecast_cache = ForecastCache(
+    max_entries=int(os.getenv("FORECAST_CACHE_SIZE", "256")),
+    ttl_seconds=int(os.getenv("FORECAST_CACHE_TTL_SECONDS", str(12 * 3600)))
+)
+forecast_store = ForecastStore()
+# Per-symbol / per-sector fine-tuned variants, falling back to stock_model
+model_registry = ModelRegistry(stock_model, stock_model_version)
 
 class ChatMessage(BaseModel):
     message: str
     userData: dict = {}
 
+MAX_FORECAST_PATHS = int(os.getenv("MAX_FORECAST_PATHS", "2000"))
+
 class PredictionRequest(BaseModel):
     symbol: str
     years: int = 2
+    stateful: bool = False
+    n_paths: int = 0
+    seed: Optional[int] = None
+    max_points: int = 0                 # LTTB-thin each series to this many points (0 = every day)
+    resolution: Optional[str] = None    # "daily", "weekly" or "monthly" OHLC bars
+    # Accept a nightly forecast advanced bar by bar. Such a forecast is a rescaled approximation:
+    # the remaining path is scaled onto each new close rather than re-rolled from it (see
+    # forecast_state.py). The payload says so in its "incremental" field.
+    incremental: bool = False
+
+FORECAST_STREAM_CHUNK_DAYS = 63  # one simulated quarter per streamed chunk
+MAX_BATCH_SYMBOLS = int(os.getenv("MAX_BATCH_SYMBOLS", "50"))
+
+class StockHorizon(BaseModel):
+    symbol: str
+    years: int = 2
+
+class BatchPredictionRequest(BaseModel):
+    stocks: List[StockHorizon]
+    stateful: bool = False
+    seed: Optional[int] = None
+
+MAX_PORTFOLIO_ASSETS = int(os.getenv("MAX_PORTFOLIO_ASSETS", "50"))
+
+class PortfolioHolding(BaseModel):
+    symbol: str
+    weight: float = 1.0                 # relative; weights are normalised to sum to 1
+
+class PortfolioRequest(BaseModel):
+    holdings: List[PortfolioHolding]
+    years: int = 2
+    n_paths: int = 1000
+    seed: Optional[int] = None
+    initial_value: float = 10000.0
+    confidence: float = VAR_CONFIDENCE
+    max_points: int = 0
+    resolution: Optional[str] = None
 
 @app.post("/chat")
 def chat(request: ChatMessage):
@@ -215,62 +288,30 @@ def llm3_endpoint(request: ChatMessage):
 # Stock prediction functions
 def get_stock_data(symbol, start_date, end_date):
     try:
-        ticker = yf.Ticker(symbol)
-        data = ticker.history(start=start_date, end=end_date)
+        data = forecast_flight.do(("history", symbol, start_date, end_date),
+                                  market_store.get_history, symbol, start_date, end_date)
         
         if data.empty:
             raise HTTPException(status_code=404, detail=f"No data found for symbol '{symbol}'. Symbol may be invalid or delisted.")
             
         return data
+    except HTTPException:
+        raise
     except Exception as e:
         if "possibly delisted" in str(e) or "no price data found" in str(e):
             raise HTTPException(status_code=404, detail=f"Symbol '{symbol}' not found or possibly delisted")
         raise HTTPException(status_code=400, detail=f"Error fetching data for '{symbol}': {str(e)}")
 
-def prepare_data(stock_data, lookback_period=60):
-    scaler = MinMaxScaler(feature_range=(0, 1))
-    scaled_data = scaler.fit_transform(stock_data['Close'].values.reshape(-1, 1))
-    return scaler
+def get_forecast_history(symbol):
+    start_date, end_date = forecast_history_range()
+    return get_stock_data(symbol, start_date, end_date)
 
-def predict_future_years_realistic(model, stock_data, scaler, years=2, lookback_period=60):
-    last_sequence = stock_data['Close'].values[-lookback_period:]
-    last_sequence_scaled = scaler.transform(last_sequence.reshape(-1, 1))
-    
-    trading_days_per_year = 252
-    total_days = years * trading_days_per_year
-    
-    last_date = stock_data.index[-1]
-    future_dates = pd.bdate_range(start=last_date + timedelta(days=1), periods=total_days)
-    
-    predictions = []
-    current_sequence = last_sequence_scaled.flatten()
-    
-    historical_returns = np.diff(np.log(stock_data['Close'].values[-252:]))
-    daily_volatility = np.std(historical_returns)
-    
-    for i in range(total_days):
-        input_sequence = current_sequence[-lookback_period:].reshape(1, lookback_period, 1)
-        next_pred_scaled = model.predict(input_sequence, verbose=0)
-        next_pred = scaler.inverse_transform(next_pred_scaled)[0][0]
-        
-        if i > 0:
-            random_return = np.random.normal(0, daily_volatility)
-            volatility_adjustment = next_pred * random_return
-            next_pred = next_pred + volatility_adjustment
-            
-            prev_price = predictions[-1] if predictions else stock_data['Close'].iloc[-1]
-            max_change = prev_price * 0.2
-            next_pred = np.clip(next_pred, prev_price - max_change, prev_price + max_change)
-            next_pred = max(next_pred, prev_price * 0.5)
-        
-        predictions.append(next_pred)
-        next_pred_scaled = scaler.transform([[next_pred]])[0][0]
-        current_sequence = np.append(current_sequence, next_pred_scaled)
-    
-    return future_dates, np.array(predictions)
+def build_request_payload(model, stock_data, request: PredictionRequest):
+    return build_forecast_payload(model, stock_data, request.years, n_paths=request.n_paths,
+                                  seed=request.seed, stateful=request.stateful)
 
-@app.post("/predict-stock")
-async def predict_stock(request: PredictionRequest):
+def validate_prediction_request(request: PredictionRequest):
+    """Returns an error payload, or None if the request can be served"""
     if stock_model is None:
         return {"error": True, "message": "Stock prediction model not loaded"}
 
@@ -278,68 +319,384 @@ async def predict_stock(request: PredictionRequest):
     if not symbol or len(symbol) < 2 or len(symbol) > 5 or not symbol.isalpha():
         return {"error": True, "message": f"Invalid stock symbol: {request.symbol}"}
 
-    try:
-        current_date = datetime.now()
-        start_date = (current_date - timedelta(days=3*365 + 120)).strftime("%Y-%m-%d")
-        end_date = current_date.strftime("%Y-%m-%d")
+    if request.stateful and not hasattr(model_registry.get(symbol)[0], "step"):
+        return {"error": True, "message": "Stateful forecasts are not supported by the configured model backend"}
+
+    if request.n_paths < 0 or request.n_paths > MAX_FORECAST_PATHS:
+        return {"error": True, "message": f"n_paths must be between 0 and {MAX_FORECAST_PATHS}"}
+
+    if request.max_points < 0:
+        return {"error": True, "message": "max_points must be 0 or positive"}
+    if request.resolution is not None and request.resolution not in RESOLUTIONS:
+        return {"error": True, "message": f"resolution must be one of {', '.join(RESOLUTIONS)}"}
+    return None
+
+def get_cached_forecast(cache_key):
+    """In-memory cache first, then forecasts precomputed by forecast_job.py"""
+    cached = forecast_cache.get(cache_key)
+    if cached is None:
+        cached = forecast_store.get(cache_key)
+        if cached is not None:
+            forecast_cache.put(cache_key, cached)
+    return cached
+
+def compute_and_cache_forecast(cache_key, model, stock_data, request: PredictionRequest):
+    # A request that just finished the same forecast may have filled the cache while we queued
+    cached = get_cached_forecast(cache_key)
+    if cached is not None:
+        return cached
+    payload = build_request_payload(model, stock_data, request)
+    forecast_cache.put(cache_key, payload)
+    return payload
+
+def run_stock_prediction(request: PredictionRequest):
+    validation_error = validate_prediction_request(request)
+    if validation_error:
+        return validation_error
 
-        stock_data = get_stock_data(symbol, start_date, end_date)
+    symbol = request.symbol.upper().strip()
+    try:
+        stock_data = get_forecast_history(symbol)
 
         if stock_data.empty:
             return {"error": True, "message": "No data found for the given symbol"}
 
-        scaler = prepare_data(stock_data)
-
-        future_dates, future_predictions = predict_future_years_realistic(
-            stock_model, stock_data, scaler, request.years
+        model, model_version = model_registry.get(symbol)
+        cache_key = forecast_cache_key(
+            symbol, request.years, stock_data.index[-1], model_version, request.seed,
+            n_paths=request.n_paths, stateful=request.stateful
         )
+        payload = None
+        if request.incremental and request.seed is None and request.n_paths == 0 and not request.stateful:
+            payload = get_cached_forecast(precomputed_forecast_key(
+                symbol, request.years, stock_data.index[-1], model_version, incremental=True
+            ))
+        if payload is None:
+            payload = get_cached_forecast(cache_key)
+        if payload is None:
+            payload = forecast_flight.do(("forecast",) + cache_key, compute_and_cache_forecast,
+                                         cache_key, model, stock_data, request)
+        # The cache holds daily series; chart downsampling is applied per request
+        return downsample_payload(payload, request.max_points, request.resolution)
 
-        historical_cutoff = datetime.now() - timedelta(days=730)
-        if stock_data.index.tz is not None:
-            historical_cutoff = historical_cutoff.replace(tzinfo=stock_data.index.tz)
-
-        historical_mask = stock_data.index >= historical_cutoff
-        historical_dates = stock_data.index[historical_mask]
-        historical_prices = stock_data['Close'].values[historical_mask]
+    except HTTPException as he:
+        return {"error": True, "message": str(he.detail)}
+    except Exception as e:
+        return {"error": True, "message": f"Prediction failed: {str(e)}"}
 
-        prediction_std = np.std(np.diff(future_predictions)) * np.sqrt(np.arange(len(future_predictions)))
-        uncertainty_upper = future_predictions + prediction_std
-        uncertainty_lower = future_predictions - prediction_std
+def fetch_forecast_history(symbol):
+    """History for one symbol of a batch; returns (data, error_message)"""
+    try:
+        stock_data = get_forecast_history(symbol)
+    except HTTPException as he:
+        return None, str(he.detail)
+    except Exception as e:
+        return None, f"Prediction failed: {str(e)}"
+    if stock_data.empty:
+        return None, "No data found for the given symbol"
+    return stock_data, None
 
-        current_price = stock_data['Close'].iloc[-1]
-        final_price = future_predictions[-1]
-        total_return = ((final_price - current_price) / current_price) * 100
-        annualized_return = (((final_price / current_price) ** (1/request.years)) - 1) * 100
+# Forecasts run on forecast_executor so the event loop stays free for other requests;
+# concurrent identical requests still meet in forecast_flight inside the workers
+@app.post("/predict-stock")
+async def predict_stock(request: PredictionRequest, accept: Optional[str] = Header(None)):
+    media_type = negotiate(accept)  # before the forecast runs, so an unservable Accept costs nothing
+    try:
+        payload = await forecast_executor.run(run_stock_prediction, request)
+    except ForecastQueueFull:
+        return {"error": True, "message": "Forecast service is busy, please try again shortly"}
+    return render_forecast(payload, media_type)
 
-        daily_returns = np.diff(future_predictions) / future_predictions[:-1]
-        predicted_volatility = np.std(daily_returns) * np.sqrt(252) * 100
+def iter_stock_prediction_stream(request: PredictionRequest):
+    """
+    Yields the forecast as a sequence of messages: the historical series first, then one
+    forecast chunk per simulated quarter as the rollout produces it, then the summary stats.
+    Single-path uncertainty bands use the spread of the days generated so far, since the
+    full-path spread used by /predict-stock is not known until the end.
+    """
+    validation_error = validate_prediction_request(request)
+    if validation_error:
+        yield {"type": "error", **validation_error}
+        return
 
-        cumulative_returns = np.cumprod(1 + daily_returns)
-        max_drawdown = np.min(np.minimum.accumulate(cumulative_returns / np.maximum.accumulate(cumulative_returns)) - 1) * 100
+    symbol = request.symbol.upper().strip()
+    try:
+        stock_data = get_forecast_history(symbol)
+        if stock_data.empty:
+            yield {"type": "error", "error": True, "message": "No data found for the given symbol"}
+            return
 
-        return {
-            "historical_dates": [date.strftime("%Y-%m-%d") for date in historical_dates],
-            "historical_prices": historical_prices.tolist(),
-            "future_dates": [date.strftime("%Y-%m-%d") for date in future_dates],
-            "future_predictions": future_predictions.tolist(),
-            "uncertainty_upper": uncertainty_upper.tolist(),
-            "uncertainty_lower": uncertainty_lower.tolist(),
-            "stats": {
-                "current_price": float(current_price),
-                "final_price": float(final_price),
-                "total_return": float(total_return),
-                "annualized_return": float(annualized_return),
-                "volatility": float(predicted_volatility),
-                "max_drawdown": float(max_drawdown)
-            },
-            "error": False
+        historical_dates, historical_prices = get_historical_series(stock_data)
+        current_price = stock_data['Close'].iloc[-1]
+        yield {
+            "type": "history",
+            "symbol": symbol,
+            "historical_dates": format_dates(historical_dates),
+            "historical_prices": historical_prices.tolist()
         }
 
+        model, model_version = model_registry.get(symbol)
+        cache_key = forecast_cache_key(
+            symbol, request.years, stock_data.index[-1], model_version, request.seed,
+            n_paths=request.n_paths, stateful=request.stateful
+        )
+        cached = get_cached_forecast(cache_key)
+        if cached is not None:
+            cached = to_json_payload(cached)
+            for start in range(0, len(cached["future_dates"]), FORECAST_STREAM_CHUNK_DAYS):
+                end = start + FORECAST_STREAM_CHUNK_DAYS
+                yield {
+                    "type": "forecast",
+                    "start": start,
+                    **{field: cached[field][start:end] for field in
+                       ("future_dates", "future_predictions", "uncertainty_upper", "uncertainty_lower")}
+                }
+            yield {"type": "summary", "stats": cached["stats"], "cached": True}
+            return
+
+        scaler = prepare_data(stock_data)
+        rng = np.random.default_rng(request.seed) if request.seed is not None else None
+        n_paths = max(1, request.n_paths)
+        total_days = request.years * TRADING_DAYS_PER_YEAR
+        future_dates = get_future_dates(stock_data, request.years)
+        # Only O(days) series are kept: the ensemble's per-day bands, or the one path itself;
+        # summary stats are accumulated per chunk
+        summary = PathSummary(n_paths)
+        band_chunks = []
+        path = np.empty(total_days) if request.n_paths == 0 else None
+
+        for start, chunk in iter_forecast_paths(
+            model, stock_data['Close'].values, scaler, total_days,
+            n_paths=n_paths, rng=rng, stateful=request.stateful, chunk_size=FORECAST_STREAM_CHUNK_DAYS
+        ):
+            end = start + chunk.shape[1]
+            summary.update(chunk)
+            message = {"type": "forecast", "start": start, "future_dates": format_dates(future_dates[start:end])}
+            if request.n_paths > 0:
+                bands = percentile_bands(chunk)
+                band_chunks.append(bands)
+                message["future_predictions"] = bands["p50"].tolist()
+                message["uncertainty_upper"] = bands["p95"].tolist()
+                message["uncertainty_lower"] = bands["p5"].tolist()
+                message["percentile_bands"] = {name: band.tolist() for name, band in bands.items()}
+            else:
+                path[start:end] = chunk[0]
+                spread = np.std(np.diff(path[:end])) if end > 1 else 0.0
+                prediction_std = spread * np.sqrt(np.arange(start, end))
+                message["future_predictions"] = chunk[0].tolist()
+                message["uncertainty_upper"] = (chunk[0] + prediction_std).tolist()
+                message["uncertainty_lower"] = (chunk[0] - prediction_std).tolist()
+            yield message
+
+        stats = summary.result(current_price, request.years)
+        if request.n_paths > 0:
+            bands = {name: np.concatenate([chunk_bands[name] for chunk_bands in band_chunks]) for name in band_chunks[0]}
+            payload = format_ensemble_payload(stock_data, future_dates, bands, stats, request.n_paths, request.seed)
+        else:
+            payload = format_forecast_payload(stock_data, future_dates, path, request.years)
+        # Same payload /predict-stock would build, so repeat requests (streamed or not) hit the cache
+        forecast_cache.put(cache_key, payload)
+        yield {"type": "summary", "stats": stats, "cached": False}
+
     except HTTPException as he:
-        return {"error": True, "message": str(he.detail)}
+        yield {"type": "error", "error": True, "message": str(he.detail)}
     except Exception as e:
-        return {"error": True, "message": f"Prediction failed: {str(e)}"}
+        yield {"type": "error", "error": True, "message": f"Prediction failed: {str(e)}"}
+
+def encode_stream_message(message, stream_format):
+    if stream_format == "sse":
+        return f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+    return json.dumps(message) + "\n"
+
+@app.post("/predict-stock/stream")
+async def predict_stock_stream(request: PredictionRequest, format: str = Query("ndjson")):
+    stream_format = "sse" if format.lower() == "sse" else "ndjson"
+    messages = iter_stock_prediction_stream(request)
+
+    async def body():
+        # Each chunk is computed on forecast_executor, so streaming obeys the same concurrency limit
+        while True:
+            try:
+                message = await forecast_executor.run(next, messages, None)
+            except ForecastQueueFull:
+                message = {"type": "error", "error": True,
+                           "message": "Forecast service is busy, please try again shortly"}
+                yield encode_stream_message(message, stream_format)
+                break
+            if message is None:
+                break
+            yield encode_stream_message(message, stream_format)
+
+    media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type)
+
+def run_batch_prediction(request: BatchPredictionRequest):
+    if not request.stocks or len(request.stocks) > MAX_BATCH_SYMBOLS:
+        return {"error": True, "message": f"Provide between 1 and {MAX_BATCH_SYMBOLS} symbols"}
+
+    item_requests = [
+        PredictionRequest(symbol=item.symbol.upper().strip(), years=item.years,
+                          stateful=request.stateful, seed=request.seed)
+        for item in request.stocks
+    ]
+    results = [None] * len(item_requests)
+
+    valid = []
+    for index, item_request in enumerate(item_requests):
+        validation_error = validate_prediction_request(item_request)
+        if validation_error is None and item_request.years < 1:
+            validation_error = {"error": True, "message": "years must be at least 1"}
+        if validation_error:
+            results[index] = validation_error
+        else:
+            valid.append(index)
+
+    symbols = sorted({item_requests[index].symbol for index in valid})
+    with ThreadPoolExecutor(max_workers=max(1, min(8, len(symbols)))) as pool:
+        histories = dict(zip(symbols, pool.map(fetch_forecast_history, symbols)))
+
+    pending = {}
+    for index in valid:
+        item_request = item_requests[index]
+        stock_data, error_message = histories[item_request.symbol]
+        if error_message:
+            results[index] = {"error": True, "message": error_message}
+            continue
+        model, model_version = model_registry.get(item_request.symbol)
+        cache_key = forecast_cache_key(
+            item_request.symbol, item_request.years, stock_data.index[-1], model_version,
+            item_request.seed, n_paths=0, stateful=item_request.stateful
+        )
+        cached = get_cached_forecast(cache_key)
+        if cached is not None:
+            results[index] = cached
+        else:
+            pending.setdefault(cache_key, (model, item_request, stock_data, []))[3].append(index)
+
+    # One batched rollout per model: symbols without a variant all share the global model
+    groups = {}
+    for cache_key, entry in pending.items():
+        groups.setdefault(id(entry[0]), []).append((cache_key, entry))
+
+    for batch in groups.values():
+        model = batch[0][1][0]
+        try:
+            scalers = [prepare_data(stock_data) for _, (_, _, stock_data, _) in batch]
+            future_paths = forecast_paths_multi(
+                model,
+                [stock_data['Close'].values for _, (_, _, stock_data, _) in batch],
+                scalers,
+                [item_request.years * TRADING_DAYS_PER_YEAR for _, (_, item_request, _, _) in batch],
+                rngs=[np.random.default_rng(request.seed) if request.seed is not None else None for _ in batch],
+                stateful=request.stateful
+            )
+            for (cache_key, (_, item_request, stock_data, indices)), paths in zip(batch, future_paths):
+                payload = format_forecast_payload(
+                    stock_data, get_future_dates(stock_data, item_request.years), paths, item_request.years,
+                    seed=item_request.seed
+                )
+                forecast_cache.put(cache_key, payload)
+                for index in indices:
+                    results[index] = payload
+        except Exception as e:
+            for _, (_, _, _, indices) in batch:
+                for index in indices:
+                    results[index] = {"error": True, "message": f"Prediction failed: {str(e)}"}
 
+    return {
+        "results": [
+            {"symbol": item_request.symbol, "years": item_request.years, **result}
+            for item_request, result in zip(item_requests, results)
+        ],
+        "error": False
+    }
+
+@app.post("/predict-stocks")
+async def predict_stocks(request: BatchPredictionRequest, accept: Optional[str] = Header(None)):
+    media_type = negotiate(accept)
+    try:
+        response = await forecast_executor.run(run_batch_prediction, request)
+    except ForecastQueueFull:
+        return {"error": True, "message": "Forecast service is busy, please try again shortly"}
+    response["results"] = [convert_payload(result, media_type) for result in response["results"]]
+    return render(response, media_type)
+
+def validate_portfolio_request(request: PortfolioRequest):
+    """Returns an error payload, or None if the request can be served"""
+    if not request.holdings or len(request.holdings) > MAX_PORTFOLIO_ASSETS:
+        return {"error": True, "message": f"Provide between 1 and {MAX_PORTFOLIO_ASSETS} holdings"}
+    symbols = [holding.symbol.upper().strip() for holding in request.holdings]
+    for symbol, holding in zip(symbols, request.holdings):
+        if not symbol or len(symbol) < 2 or len(symbol) > 5 or not symbol.isalpha():
+            return {"error": True, "message": f"Invalid stock symbol: {holding.symbol}"}
+    if len(set(symbols)) != len(symbols):
+        return {"error": True, "message": "Each symbol may appear only once"}
+    if any(holding.weight < 0 for holding in request.holdings) or sum(h.weight for h in request.holdings) <= 0:
+        return {"error": True, "message": "Weights must be non-negative and not all zero"}
+    if request.years < 1:
+        return {"error": True, "message": "years must be at least 1"}
+    if request.n_paths < 1 or request.n_paths > MAX_FORECAST_PATHS:
+        return {"error": True, "message": f"n_paths must be between 1 and {MAX_FORECAST_PATHS}"}
+    if request.initial_value <= 0:
+        return {"error": True, "message": "initial_value must be positive"}
+    if not 0.5 <= request.confidence < 1:
+        return {"error": True, "message": "confidence must be between 0.5 and 1"}
+    if request.max_points < 0:
+        return {"error": True, "message": "max_points must be 0 or positive"}
+    if request.resolution is not None and request.resolution not in RESOLUTIONS:
+        return {"error": True, "message": f"resolution must be one of {', '.join(RESOLUTIONS)}"}
+    return None
+
+def run_portfolio_prediction(request: PortfolioRequest):
+    validation_error = validate_portfolio_request(request)
+    if validation_error:
+        return validation_error
+
+    weights = {holding.symbol.upper().strip(): holding.weight for holding in request.holdings}
+    symbols = list(weights)
+    with ThreadPoolExecutor(max_workers=max(1, min(8, len(symbols)))) as pool:
+        histories = dict(zip(symbols, pool.map(fetch_forecast_history, symbols)))
+    for symbol, (_, error_message) in histories.items():
+        if error_message:
+            return {"error": True, "message": f"{symbol}: {error_message}"}
+    histories = {symbol: stock_data for symbol, (stock_data, _) in histories.items()}
+
+    cache_key = forecast_cache_key(
+        "PORTFOLIO", request.years, max(data.index[-1] for data in histories.values()), None, request.seed,
+        holdings=tuple(sorted(weights.items())), n_paths=request.n_paths,
+        initial_value=request.initial_value, confidence=request.confidence
+    )
+    try:
+        payload = forecast_cache.get(cache_key)
+        if payload is None:
+            payload = forecast_flight.do(("forecast",) + cache_key, portfolio_forecast, histories, weights,
+                                         request.years, request.n_paths, request.initial_value, request.seed,
+                                         request.confidence)
+            forecast_cache.put(cache_key, payload)
+    except Exception as e:
+        return {"error": True, "message": f"Portfolio forecast failed: {str(e)}"}
+    return downsample_payload(payload, request.max_points, request.resolution)
+
+@app.post("/predict-portfolio")
+async def predict_portfolio(request: PortfolioRequest, accept: Optional[str] = Header(None)):
+    media_type = negotiate(accept)
+    try:
+        payload = await forecast_executor.run(run_portfolio_prediction, request)
+    except ForecastQueueFull:
+        return {"error": True, "message": "Forecast service is busy, please try again shortly"}
+    return render_forecast(payload, media_type)
+
+@app.get("/forecast-pool/stats")
+def get_forecast_pool_stats():
+    return forecast_executor.stats()
+
+@app.get("/model-registry/stats")
+def get_model_registry_stats():
+    return model_registry.stats()
+
+@app.get("/forecast-cache/stats")
+def get_forecast_cache_stats():
+    return {**forecast_cache.stats(), "single_flight": forecast_flight.stats(), "store": forecast_store.stats()}
 
 
 # --- Signup ---
@@ -546,62 +903,68 @@ class InvestmentAllocation(BaseModel):
     property_reits: float = 0.05
     cash: float = 0.0
 
+def allocation_to_dict(profile: SuperannuationProfile, allocation: Optional[InvestmentAllocation]) -> Dict[str, float]:
+    """The requested allocation, or a default one for the profile's risk tolerance"""
+    if allocation is None:
+        if profile.risk_tolerance.lower() == "high":
+            return {
+                "Australian Shares": 0.5,
+                "International Shares": 0.3,
+                "Property/REITs": 0.1,
+                "Australian Bonds": 0.05,
+                "International Bonds": 0.05,
+                "Cash": 0.0
+            }
+        elif profile.risk_tolerance.lower() == "low":
+            return {
+                "Australian Shares": 0.2,
+                "International Shares": 0.1,
+                "Australian Bonds": 0.35,
+                "International Bonds": 0.25,
+                "Property/REITs": 0.05,
+                "Cash": 0.05
+            }
+        else:  # Medium
+            return {
+                "Australian Shares": 0.35,
+                "International Shares": 0.25,
+                "Australian Bonds": 0.2,
+                "International Bonds": 0.1,
+                "Property/REITs": 0.08,
+                "Cash": 0.02
+            }
+    return {
+        "Australian Shares": allocation.australian_shares,
+        "International Shares": allocation.international_shares,
+        "Australian Bonds": allocation.australian_bonds,
+        "International Bonds": allocation.international_bonds,
+        "Property/REITs": allocation.property_reits,
+        "Cash": allocation.cash
+    }
+
+def profile_to_dict(profile: SuperannuationProfile) -> Dict[str, Any]:
+    return {
+        "age": profile.age,
+        "annual_income": profile.annual_income,
+        "current_savings": profile.current_savings,
+        "retirement_age_goal": profile.retirement_age_goal,
+        "risk_tolerance": profile.risk_tolerance,
+        "gender": profile.gender,
+        "country": profile.country,
+        "employment_status": profile.employment_status,
+        "marital_status": profile.marital_status,
+        "dependents": profile.dependents
+    }
+
+# Plain def: the prediction and its Monte Carlo simulation run on the thread pool, not the event loop
 @app.post("/api/superannuation-predictions")
-async def get_superannuation_predictions(
+def get_superannuation_predictions(
     profile: SuperannuationProfile,
     allocation: InvestmentAllocation = None
 ):
     try:
-        if allocation is None:
-            if profile.risk_tolerance.lower() == "high":
-                allocation_dict = {
-                    "Australian Shares": 0.5,
-                    "International Shares": 0.3,
-                    "Property/REITs": 0.1,
-                    "Australian Bonds": 0.05,
-                    "International Bonds": 0.05,
-                    "Cash": 0.0
-                }
-            elif profile.risk_tolerance.lower() == "low":
-                allocation_dict = {
-                    "Australian Shares": 0.2,
-                    "International Shares": 0.1,
-                    "Australian Bonds": 0.35,
-                    "International Bonds": 0.25,
-                    "Property/REITs": 0.05,
-                    "Cash": 0.05
-                }
-            else:  # Medium
-                allocation_dict = {
-                    "Australian Shares": 0.35,
-                    "International Shares": 0.25,
-                    "Australian Bonds": 0.2,
-                    "International Bonds": 0.1,
-                    "Property/REITs": 0.08,
-                    "Cash": 0.02
-                }
-        else:
-            allocation_dict = {
-                "Australian Shares": allocation.australian_shares,
-                "International Shares": allocation.international_shares,
-                "Australian Bonds": allocation.australian_bonds,
-                "International Bonds": allocation.international_bonds,
-                "Property/REITs": allocation.property_reits,
-                "Cash": allocation.cash
-            }
-        
-        user_profile = {
-            "age": profile.age,
-            "annual_income": profile.annual_income,
-            "current_savings": profile.current_savings,
-            "retirement_age_goal": profile.retirement_age_goal,
-            "risk_tolerance": profile.risk_tolerance,
-            "gender": profile.gender,
-            "country": profile.country,
-            "employment_status": profile.employment_status,
-            "marital_status": profile.marital_status,
-            "dependents": profile.dependents
-        }
+        allocation_dict = allocation_to_dict(profile, allocation)
+        user_profile = profile_to_dict(profile)
         
         predictions = superannuation_predictor.predict_future_value(
             user_profile, allocation_dict
@@ -611,12 +974,15 @@ async def get_superannuation_predictions(
             user_profile, allocation_dict
         )
         
+        simulation = superannuation_predictor.simulate_retirement(user_profile, allocation_dict)
+        
         feature_importance = superannuation_predictor.get_feature_importance()
         
         return {
             "success": True,
             "predictions": predictions,
             "portfolio_evaluation": portfolio_evaluation,
+            "simulation": simulation,
             "feature_importance": feature_importance,
             "allocation_used": allocation_dict
         }
@@ -629,6 +995,96 @@ async def get_superannuation_predictions(
             "message": "Failed to generate predictions. Please try again."
         }
 
+MAX_SUPERANNUATION_BATCH = int(os.getenv("MAX_SUPERANNUATION_BATCH", "10000"))
+
+class SuperannuationMember(BaseModel):
+    profile: SuperannuationProfile
+    allocation: Optional[InvestmentAllocation] = None
+
+class SuperannuationBatchRequest(BaseModel):
+    members: List[SuperannuationMember]
+    include_projection: bool = False    # year-by-year balances per member and scenario
+
+# Plain def: FastAPI runs it on its thread pool, so large batches do not block the event loop
+@app.post("/api/superannuation-predictions/batch")
+def get_superannuation_predictions_batch(request: SuperannuationBatchRequest):
+    if not request.members or len(request.members) > MAX_SUPERANNUATION_BATCH:
+        return {
+            "success": False,
+            "error": f"Provide between 1 and {MAX_SUPERANNUATION_BATCH} members",
+            "message": "Failed to generate predictions. Please try again."
+        }
+    try:
+        user_profiles = [profile_to_dict(member.profile) for member in request.members]
+        allocations = [allocation_to_dict(member.profile, member.allocation) for member in request.members]
+        
+        predictions = superannuation_predictor.predict_many(user_profiles, allocations, request.include_projection)
+        evaluations = superannuation_predictor.evaluate_portfolios(user_profiles, allocations)
+        
+        return {
+            "success": True,
+            "results": [
+                {
+                    "predictions": member_predictions,
+                    "portfolio_evaluation": evaluation,
+                    "allocation_used": allocation_dict
+                }
+                for allocation_dict, member_predictions, evaluation in zip(allocations, predictions, evaluations)
+            ],
+            "feature_importance": superannuation_predictor.get_feature_importance()
+        }
+        
+    except Exception as e:
+        logging.error(f"Error generating batch superannuation predictions: {str(e)}")
+        return {
+            "success": False,
+            "error": str(e),
+            "message": "Failed to generate predictions. Please try again."
+        }
+
+MAX_OPTIMIZER_CANDIDATES = int(os.getenv("MAX_OPTIMIZER_CANDIDATES", "50000"))
+
+class AllocationOptimizerRequest(BaseModel):
+    profile: SuperannuationProfile
+    allocation: Optional[InvestmentAllocation] = None   # current allocation, compared with the optimum
+    n_candidates: int = 5000
+    frontier_points: int = 25
+    correlated: bool = False    # use asset-class correlations instead of evaluate_portfolio's uncorrelated risk
+    seed: Optional[int] = None
+
+# Plain def, like the batch endpoint: large candidate sets run on the thread pool
+@app.post("/api/superannuation-allocation/optimize")
+def optimize_superannuation_allocation(request: AllocationOptimizerRequest):
+    if not 1 <= request.n_candidates <= MAX_OPTIMIZER_CANDIDATES or request.frontier_points < 1:
+        return {
+            "success": False,
+            "error": f"n_candidates must be between 1 and {MAX_OPTIMIZER_CANDIDATES} and frontier_points at least 1",
+            "message": "Failed to optimize the allocation. Please try again."
+        }
+    try:
+        user_profile = profile_to_dict(request.profile)
+        current_allocation = allocation_to_dict(request.profile, request.allocation)
+        correlation = ASSET_CORRELATIONS if request.correlated else None
+        
+        optimized = superannuation_predictor.optimize_allocation(
+            user_profile, request.n_candidates, request.frontier_points, correlation,
+            include=[current_allocation], seed=request.seed
+        )
+        
+        return {
+            "success": True,
+            **optimized,
+            "current_allocation": superannuation_predictor.evaluate_portfolio(user_profile, current_allocation, correlation)
+        }
+        
+    except Exception as e:
+        logging.error(f"Error optimizing superannuation allocation: {str(e)}")
+        return {
+            "success": False,
+            "error": str(e),
+            "message": "Failed to optimize the allocation. Please try again."
+        }
+
 @app.get("/api/profile-with-predictions/{username}")
 async def get_profile_with_predictions(username: str):
     try:
@@ -655,7 +1111,7 @@ async def get_profile_with_predictions(username: str):
         )
         
         # Get predictions
-        prediction_response = await get_superannuation_predictions(superannuation_profile)
+        prediction_response = await run_in_threadpool(get_superannuation_predictions, superannuation_profile)
         
         return {
             "profile": profile,
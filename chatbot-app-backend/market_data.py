@@ -0,0 +1,213 @@
+"""
+Market data module:
+- provider interface for daily OHLCV history (yfinance, local CSV fixtures)
+- persistent per-symbol store backed by one memory-mapped .npy file of bars per symbol
+- incremental refresh that only fetches bars after the last stored date
+"""
+
+import json
+import os
+import threading
+import logging
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+# One record per stored bar, so dates and prices are always written and read together
+BAR_DTYPE = np.dtype([('date', 'datetime64[D]'), ('ohlcv', np.float64, (len(OHLCV_COLUMNS),))])
+DEFAULT_STORE_DIR = os.getenv(
+    'MARKET_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'market')
+)
+DEFAULT_REFRESH_INTERVAL = timedelta(minutes=int(os.getenv('MARKET_DATA_REFRESH_MINUTES', '60')))
+
+
+def _normalize_frame(data):
+    """OHLCV columns only, float64, tz-naive daily DatetimeIndex sorted ascending"""
+    if data is None or data.empty:
+        return pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], name='Date'), dtype=np.float64)
+    frame = data[OHLCV_COLUMNS].astype(np.float64)
+    index = pd.DatetimeIndex(frame.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    frame.index = index.normalize().rename('Date')
+    frame = frame[~frame.index.duplicated(keep='last')]
+    return frame.sort_index()
+
+
+class MarketDataProvider:
+    """Source of daily OHLCV bars. end_date is exclusive, like yfinance."""
+
+    name = 'base'
+
+    def fetch(self, symbol, start_date, end_date):
+        raise NotImplementedError
+
+
+class YFinanceProvider(MarketDataProvider):
+    name = 'yfinance'
+
+    def fetch(self, symbol, start_date, end_date):
+        import yfinance as yf
+        data = yf.Ticker(symbol).history(start=start_date, end=end_date)
+        return _normalize_frame(data)
+
+
+class CSVProvider(MarketDataProvider):
+    """
+    Reads <directory>/<SYMBOL>.csv fixtures with a Date column plus OHLCV columns.
+    Stands in for yfinance in tests and benchmarks.
+    """
+
+    name = 'csv'
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._frames = {}
+
+    def _load(self, symbol):
+        if symbol not in self._frames:
+            path = os.path.join(self.directory, f"{symbol}.csv")
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"No CSV fixture for symbol '{symbol}' at {path}")
+            data = pd.read_csv(path, parse_dates=['Date'], index_col='Date')
+            self._frames[symbol] = _normalize_frame(data)
+        return self._frames[symbol]
+
+    def fetch(self, symbol, start_date, end_date):
+        data = self._load(symbol)
+        mask = (data.index >= pd.Timestamp(start_date)) & (data.index < pd.Timestamp(end_date))
+        return data[mask]
+
+
+class MarketDataStore:
+    """
+    Per-symbol OHLCV history on disk:
+        <directory>/<SYMBOL>.bars.npy    BAR_DTYPE records: date and the five OHLCV values
+        <directory>/<SYMBOL>.meta.json   refresh bookkeeping
+    Bars are opened memory-mapped; refreshes fetch only the missing date ranges.
+    A save replaces the bars with a single os.replace, so a crash leaves either the old bars or
+    the new ones. meta.json is replaced after them: a stale one only causes an extra fetch.
+    """
+
+    def __init__(self, directory=DEFAULT_STORE_DIR, provider=None, refresh_interval=DEFAULT_REFRESH_INTERVAL):
+        self.directory = directory
+        self.provider = provider or YFinanceProvider()
+        self.refresh_interval = refresh_interval
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _lock(self, symbol):
+        with self._locks_guard:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def _path(self, symbol, suffix):
+        return os.path.join(self.directory, f"{symbol}.{suffix}")
+
+    def _read_meta(self, symbol):
+        try:
+            with open(self._path(symbol, 'meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _atomic_save(self, path, array):
+        tmp_path = f"{path}.tmp.npy"
+        np.save(tmp_path, array)
+        os.replace(tmp_path, path)
+
+    def load(self, symbol):
+        """Stored history as a DataFrame, or None if the symbol has not been fetched yet"""
+        try:
+            bars = np.load(self._path(symbol, 'bars.npy'), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        if bars.dtype != BAR_DTYPE or len(bars) == 0:
+            return None
+        return pd.DataFrame(bars['ohlcv'], index=pd.DatetimeIndex(bars['date'], name='Date'), columns=OHLCV_COLUMNS)
+
+    def save(self, symbol, data, meta):
+        data = _normalize_frame(data)
+        bars = np.empty(len(data), dtype=BAR_DTYPE)
+        bars['date'] = data.index.values.astype('datetime64[D]')
+        bars['ohlcv'] = data.values
+        self._atomic_save(self._path(symbol, 'bars.npy'), bars)
+        tmp_path = self._path(symbol, 'meta.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._path(symbol, 'meta.json'))
+
+    def last_date(self, symbol):
+        stored = self.load(symbol)
+        return None if stored is None else stored.index[-1]
+
+    def refresh(self, symbol, start_date, end_date, force=False):
+        """
+        Fetch bars missing from [start_date, end_date) and merge them into the store.
+        Only the head (backfill) and tail (new days) ranges are requested from the provider.
+        """
+        start = pd.Timestamp(start_date).normalize()
+        end = pd.Timestamp(end_date).normalize()
+
+        with self._lock(symbol):
+            stored = self.load(symbol)
+            meta = self._read_meta(symbol)
+            now = datetime.now()
+
+            last_refresh = meta.get('last_refresh')
+            if (not force and stored is not None and last_refresh
+                    and now - datetime.fromisoformat(last_refresh) < self.refresh_interval
+                    and pd.Timestamp(meta.get('covered_from', stored.index[0])) <= start):
+                return stored
+
+            ranges = []
+            if stored is None:
+                ranges.append((start, end))
+            else:
+                covered_from = pd.Timestamp(meta.get('covered_from', stored.index[0]))
+                if start < covered_from:
+                    ranges.append((start, covered_from))
+                next_day = stored.index[-1] + timedelta(days=1)
+                if next_day < end:
+                    ranges.append((next_day, end))
+
+            frames = [] if stored is None else [stored]
+            for range_start, range_end in ranges:
+                fetched = self.provider.fetch(symbol, range_start.strftime("%Y-%m-%d"), range_end.strftime("%Y-%m-%d"))
+                logger.info(f"Fetched {len(fetched)} bars for {symbol} from {self.provider.name} "
+                            f"({range_start.date()} to {range_end.date()})")
+                frames.append(fetched)
+
+            merged = _normalize_frame(pd.concat(frames)) if frames else None
+            if merged is None or merged.empty:
+                return stored
+
+            covered_from = min(start, pd.Timestamp(meta.get('covered_from', merged.index[0])))
+            self.save(symbol, merged, {
+                'last_refresh': now.isoformat(),
+                'covered_from': covered_from.strftime("%Y-%m-%d"),
+                'provider': self.provider.name,
+            })
+            return self.load(symbol)
+
+    def get_history(self, symbol, start_date, end_date):
+        """
+        History for [start_date, end_date), refreshing the store first.
+        If the provider fails (rate limits, network) stored bars are served as-is.
+        """
+        try:
+            data = self.refresh(symbol, start_date, end_date)
+        except Exception as e:
+            data = self.load(symbol)
+            if data is None:
+                raise
+            logger.warning(f"Refresh failed for {symbol}, serving stored history: {e}")
+
+        if data is None:
+            return _normalize_frame(None)
+        mask = (data.index >= pd.Timestamp(start_date)) & (data.index < pd.Timestamp(end_date))
+        return data[mask]
@@ -10,8 +10,38 @@ from typing import Dict, List, Tuple, Any
 import os
 from datetime import datetime
 
+from allocation_optimizer import (
+    FRONTIER_POINTS, OPTIMIZER_CANDIDATES, best_for_horizon, candidate_allocations, covariance_matrix,
+    efficient_frontier, score_allocations, target_volatility
+)
+from tree_compiler import compile_ensemble
+from super_projection import (
+    SCENARIO_MULTIPLIERS, REPLACEMENT_TARGETS, EMPLOYER_CONTRIBUTION_RATE, WITHDRAWAL_RATE,
+    SIMULATION_PATHS, contribution_gaps, future_value, portfolio_moments, scenario_rates,
+    simulate_retirement, trajectories
+)
+
 logger = logging.getLogger(__name__)
 
+# Up to this many rows the compiled tree evaluator beats sklearn's predict(); above it sklearn's
+# Cython loop is faster than numpy gathers
+COMPILED_TREE_MAX_ROWS = int(os.getenv('COMPILED_TREE_MAX_ROWS', '256'))
+
+# Capital market assumptions per asset class: expected annual return and volatility
+ASSET_CLASSES = ['Australian Shares', 'International Shares', 'Australian Bonds',
+                 'International Bonds', 'Property/REITs', 'Cash']
+ASSET_EXPECTED_RETURNS = np.array([0.085, 0.082, 0.042, 0.038, 0.076, 0.025])
+ASSET_VOLATILITIES = np.array([0.16, 0.17, 0.06, 0.07, 0.14, 0.01])
+# Correlation of annual returns between asset classes, in ASSET_CLASSES order
+ASSET_CORRELATIONS = np.array([
+    [1.00, 0.65, 0.05, 0.00, 0.60, 0.00],
+    [0.65, 1.00, 0.00, 0.05, 0.55, 0.00],
+    [0.05, 0.00, 1.00, 0.80, 0.20, 0.10],
+    [0.00, 0.05, 0.80, 1.00, 0.15, 0.10],
+    [0.60, 0.55, 0.20, 0.15, 1.00, 0.00],
+    [0.00, 0.00, 0.10, 0.10, 0.00, 1.00],
+])
+
 class SuperannuationPredictor:
     """Machine Learning model for predicting superannuation outcomes"""
     
@@ -23,6 +53,7 @@ class SuperannuationPredictor:
         self.feature_columns = []
         self.is_trained = False
         self.model_metrics = {}
+        self.compiled_models = {}
         
     def train(self, data: pd.DataFrame) -> Dict[str, Any]:
         """Train the ML models on superannuation data"""
@@ -81,6 +112,7 @@ class SuperannuationPredictor:
             }
             
             self.is_trained = True
+            self._compile_models()
             logger.info("Model training completed successfully")
             
      
@@ -146,228 +178,298 @@ class SuperannuationPredictor:
         
         return X, y_pension, y_return
     
-    def predict_future_value(self, user_profile: Dict, investment_allocation: Dict) -> Dict[str, Any]:
+    def predict_future_value(self, user_profile: Dict, investment_allocation: Dict,
+                             include_projection: bool = True) -> Dict[str, Any]:
         """Predict future superannuation value based on user profile and investment choices"""
+        return self.predict_many([user_profile], [investment_allocation], include_projection)[0]
+    
+    def predict_many(self, user_profiles: List[Dict], investment_allocations: List[Dict],
+                     include_projection: bool = True) -> List[Dict[str, Any]]:
+        """
+        Predict for many members at once: one feature matrix, one scaler.transform and one
+        predict() per model, with scenarios and contribution analysis computed on arrays.
+        include_projection adds each member's year-by-year balance per scenario.
+        Results match predict_future_value row for row.
+        """
+        if not user_profiles:
+            return []
+        
+        members = self._member_arrays(user_profiles)
+        if not self.is_trained:
+            logger.warning("Model not trained, using fallback predictions")
+            return self._fallback_many(members, include_projection)
+        
         try:
-            if not self.is_trained:
-                logger.warning("Model not trained, using fallback predictions")
-                return self._fallback_predictions(user_profile, investment_allocation)
-            
-            features = self._profile_to_features(user_profile, investment_allocation)
-            
-            if features is None:
-                return self._fallback_predictions(user_profile, investment_allocation)
+            features = self._features_matrix(user_profiles, investment_allocations)
+            features_scaled = self.scaler.transform(features)
             
-            features_scaled = self.scaler.transform([features])
+            predicted_pension = self._predict_with('pension_model', features_scaled)
+            predicted_return = self._predict_with('return_model', features_scaled)
             
-            predicted_pension = self.pension_model.predict(features_scaled)[0]
-            predicted_return = self.return_model.predict(features_scaled)[0]
-            
-            current_age = user_profile.get('age', 35)
-            retirement_age = user_profile.get('retirement_age_goal', 65)
-            years_to_retirement = max(1, retirement_age - current_age)
-            current_balance = user_profile.get('current_savings', 50000)
-            annual_income = user_profile.get('annual_income', 70000)
-            
-            scenarios = self._calculate_scenarios(
-                current_balance, annual_income, predicted_return, years_to_retirement
+            scenarios = self._calculate_scenarios_many(
+                members['current_balance'], members['annual_income'], predicted_return, members['years_to_retirement']
             )
             
-            contribution_analysis = self._analyze_contributions(
-                current_balance, annual_income, predicted_return, years_to_retirement
+            contribution_analysis = self._analyze_contributions_many(
+                members['current_balance'], members['annual_income'], predicted_return, members['years_to_retirement']
             )
             
-            return {
-                'predictions': {
-                    'projected_final_balance': max(0, predicted_pension),
-                    'expected_annual_return': max(0, min(0.15, predicted_return)),
-                    'years_to_retirement': years_to_retirement
-                },
-                'scenarios': scenarios,
-                'contribution_analysis': contribution_analysis,
-                'model_confidence': self._calculate_confidence(features),
-                'generated_at': datetime.now().isoformat()
-            }
+            confidence = self._calculate_confidence(features)
+            generated_at = datetime.now().isoformat()
+            
+            results = [
+                {
+                    'predictions': {
+                        'projected_final_balance': pension,
+                        'expected_annual_return': expected_return,
+                        'years_to_retirement': years
+                    },
+                    'scenarios': member_scenarios,
+                    'contribution_analysis': member_contributions,
+                    'model_confidence': dict(confidence),
+                    'generated_at': generated_at
+                }
+                for pension, expected_return, years, member_scenarios, member_contributions in zip(
+                    np.maximum(0, predicted_pension).tolist(),
+                    np.clip(predicted_return, 0, 0.15).tolist(),
+                    members['years_to_retirement'].tolist(),
+                    scenarios,
+                    contribution_analysis
+                )
+            ]
+            if include_projection:
+                projections = self._projections_many(
+                    members['age'], members['current_balance'], members['annual_income'],
+                    scenario_rates(predicted_return), members['years_to_retirement'], list(SCENARIO_MULTIPLIERS)
+                )
+                for result, projection in zip(results, projections):
+                    result['projection'] = projection
+            return results
             
         except Exception as e:
             logger.error(f"Error making predictions: {str(e)}")
-            return self._fallback_predictions(user_profile, investment_allocation)
+            if len(user_profiles) == 1:
+                return self._fallback_many(members, include_projection)
+            # Retry row by row so one bad profile only falls back on its own
+            return [
+                self.predict_many([profile], [allocation], include_projection)[0]
+                for profile, allocation in zip(user_profiles, investment_allocations)
+            ]
+    
+    def _compile_models(self):
+        """Flatten the tree ensembles for low-latency prediction; a model that cannot be compiled keeps using sklearn"""
+        self.compiled_models = {}
+        for name in ('pension_model', 'return_model'):
+            try:
+                self.compiled_models[name] = compile_ensemble(getattr(self, name))
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Using sklearn predict() for {name}: {e}")
+    
+    def _predict_with(self, name: str, features_scaled: np.ndarray) -> np.ndarray:
+        """Predictions of one model: the compiled evaluator for small inputs, sklearn for large batches"""
+        compiled = self.compiled_models.get(name)
+        if compiled is not None and len(features_scaled) <= COMPILED_TREE_MAX_ROWS:
+            return compiled.predict(features_scaled)
+        return getattr(self, name).predict(features_scaled)
+    
+    def _member_arrays(self, user_profiles: List[Dict]) -> Dict[str, np.ndarray]:
+        """Per-member inputs shared by the model and fallback paths, one array each"""
+        age = np.array([profile.get('age', 35) for profile in user_profiles])
+        retirement_age = np.array([profile.get('retirement_age_goal', 65) for profile in user_profiles])
+        return {
+            'age': age,
+            'years_to_retirement': np.maximum(1, retirement_age - age),
+            'current_balance': np.array([profile.get('current_savings', 50000) for profile in user_profiles], dtype=float),
+            'annual_income': np.array([profile.get('annual_income', 70000) for profile in user_profiles], dtype=float),
+        }
     
     def _profile_to_features(self, user_profile: Dict, investment_allocation: Dict) -> List[float]:
         """Convert user profile to feature vector"""
         try:
-            features = []
-            
-            feature_mapping = {
-                'Age': user_profile.get('age', 35),
-                'Annual_Income': user_profile.get('annual_income', 70000),
-                'Current_Savings': user_profile.get('current_savings', 50000),
-                'Retirement_Age_Goal': user_profile.get('retirement_age_goal', 65),
-                'Contribution_Amount': user_profile.get('annual_income', 70000) * 0.11,  # Default employer contribution
-                'Years_Contributed': max(1, user_profile.get('age', 35) - 22),  # Assume started at 22
-                'Annual_Return_Rate': self._estimate_return_from_allocation(investment_allocation),
-                'Volatility': self._estimate_volatility_from_allocation(investment_allocation),
-                'Fees_Percentage': 0.75,  # Default fee
-                'Number_of_Dependents': user_profile.get('dependents', 0),
-                'Life_Expectancy_Estimate': 85,  # Default
-                'Debt_Level': user_profile.get('annual_income', 70000) * 0.3,  # Estimate
-                'Monthly_Expenses': user_profile.get('annual_income', 70000) * 0.6 / 12,  # Estimate
-                'Savings_Rate': 0.15,  # Default
-                'Portfolio_Diversity_Score': 0.8  # Default
-            }
-            
-            # Categorical mappings
-            categorical_mapping = {
-                'Gender': {'Male': 0, 'Female': 1, 'Other': 2}.get(user_profile.get('gender', 'Male'), 0),
-                'Country': {'Australia': 0, 'UK': 1, 'USA': 2, 'Canada': 3, 'Germany': 4}.get(user_profile.get('country', 'Australia'), 0),
-                'Employment_Status': {'Full-time': 0, 'Part-time': 1, 'Self-employed': 2, 'Unemployed': 3, 'Retired': 4}.get(user_profile.get('employment_status', 'Full-time'), 0),
-                'Risk_Tolerance': {'Low': 0, 'Medium': 1, 'High': 2}.get(user_profile.get('risk_tolerance', 'Medium'), 1),
-                'Contribution_Frequency': 0,  
-                'Investment_Type': 0, 
-                'Marital_Status': {'Single': 0, 'Married': 1, 'Divorced': 2, 'Widowed': 3}.get(user_profile.get('marital_status', 'Single'), 0),
-                'Education_Level': 1,  
-                'Health_Status': 1,  
-                'Home_Ownership_Status': 1, 
-                'Investment_Experience_Level': 1,  
-                'Pension_Type': 1 
-            }
-            
-            feature_vector = []
-            for col in self.feature_columns:
-                if col in feature_mapping:
-                    feature_vector.append(feature_mapping[col])
-                elif col in categorical_mapping:
-                    feature_vector.append(categorical_mapping[col])
-                elif col == 'Years_To_Retirement':
-                    feature_vector.append(max(1, user_profile.get('retirement_age_goal', 65) - user_profile.get('age', 35)))
-                elif col == 'Income_To_Savings_Ratio':
-                    savings = user_profile.get('current_savings', 50000) + 1
-                    income = user_profile.get('annual_income', 70000)
-                    feature_vector.append(income / savings)
-                elif col == 'Contribution_Rate':
-                    income = user_profile.get('annual_income', 70000) + 1
-                    contribution = income * 0.11  # Default employer contribution
-                    feature_vector.append(contribution / income)
-                else:
-                    feature_vector.append(0)  # Default for unknown features
-            
-            return feature_vector
-            
+            return self._features_matrix([user_profile], [investment_allocation])[0].tolist()
         except Exception as e:
             logger.error(f"Error converting profile to features: {str(e)}")
             return None
     
-    def _estimate_return_from_allocation(self, allocation: Dict) -> float:
-        """Estimate expected return based on asset allocation"""
-        expected_returns = {
-            'Australian Shares': 0.085,
-            'International Shares': 0.082,
-            'Australian Bonds': 0.042,
-            'International Bonds': 0.038,
-            'Property/REITs': 0.076,
-            'Cash': 0.025
+    def _features_matrix(self, user_profiles: List[Dict], investment_allocations: List[Dict]) -> np.ndarray:
+        """Convert user profiles to a (members, features) matrix in feature_columns order"""
+        def column(key, default):
+            return np.array([profile.get(key, default) for profile in user_profiles], dtype=float)
+        
+        def codes(key, mapping, default, unknown):
+            return np.array([mapping.get(profile.get(key, default), unknown) for profile in user_profiles], dtype=float)
+        
+        age = column('age', 35)
+        annual_income = column('annual_income', 70000)
+        current_savings = column('current_savings', 50000)
+        retirement_age = column('retirement_age_goal', 65)
+        
+        feature_mapping = {
+            'Age': age,
+            'Annual_Income': annual_income,
+            'Current_Savings': current_savings,
+            'Retirement_Age_Goal': retirement_age,
+            'Contribution_Amount': annual_income * 0.11,  # Default employer contribution
+            'Years_Contributed': np.maximum(1, age - 22),  # Assume started at 22
+            'Annual_Return_Rate': self._estimate_returns_from_allocations(investment_allocations),
+            'Volatility': self._estimate_volatilities_from_allocations(investment_allocations),
+            'Fees_Percentage': 0.75,  # Default fee
+            'Number_of_Dependents': column('dependents', 0),
+            'Life_Expectancy_Estimate': 85,  # Default
+            'Debt_Level': annual_income * 0.3,  # Estimate
+            'Monthly_Expenses': annual_income * 0.6 / 12,  # Estimate
+            'Savings_Rate': 0.15,  # Default
+            'Portfolio_Diversity_Score': 0.8,  # Default
+            
+            # Categorical mappings
+            'Gender': codes('gender', {'Male': 0, 'Female': 1, 'Other': 2}, 'Male', 0),
+            'Country': codes('country', {'Australia': 0, 'UK': 1, 'USA': 2, 'Canada': 3, 'Germany': 4}, 'Australia', 0),
+            'Employment_Status': codes('employment_status', {'Full-time': 0, 'Part-time': 1, 'Self-employed': 2, 'Unemployed': 3, 'Retired': 4}, 'Full-time', 0),
+            'Risk_Tolerance': codes('risk_tolerance', {'Low': 0, 'Medium': 1, 'High': 2}, 'Medium', 1),
+            'Contribution_Frequency': 0,
+            'Investment_Type': 0,
+            'Marital_Status': codes('marital_status', {'Single': 0, 'Married': 1, 'Divorced': 2, 'Widowed': 3}, 'Single', 0),
+            'Education_Level': 1,
+            'Health_Status': 1,
+            'Home_Ownership_Status': 1,
+            'Investment_Experience_Level': 1,
+            'Pension_Type': 1,
+            
+            'Years_To_Retirement': np.maximum(1, retirement_age - age),
+            'Income_To_Savings_Ratio': annual_income / (current_savings + 1),
+            'Contribution_Rate': (annual_income + 1) * 0.11 / (annual_income + 1),  # Default employer contribution
         }
         
-        total_return = 0
-        total_allocation = 0
-        
-        for asset, weight in allocation.items():
-            if asset in expected_returns:
-                total_return += weight * expected_returns[asset]
-                total_allocation += weight
-        
-        return total_return / max(total_allocation, 1)
+        # Unknown features default to 0
+        n_members = len(user_profiles)
+        return np.column_stack([
+            np.broadcast_to(np.asarray(feature_mapping.get(col, 0), dtype=float), n_members)
+            for col in self.feature_columns
+        ])
+    
+    def _allocation_weights(self, allocations: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """(members, assets) weights of the known asset classes, and each member's known total"""
+        weights = np.array([[allocation.get(asset, 0) for asset in ASSET_CLASSES] for allocation in allocations], dtype=float)
+        return weights, weights.sum(axis=1)
+    
+    def _estimate_return_from_allocation(self, allocation: Dict) -> float:
+        """Estimate expected return based on asset allocation"""
+        return float(self._estimate_returns_from_allocations([allocation])[0])
+    
+    def _estimate_returns_from_allocations(self, allocations: List[Dict]) -> np.ndarray:
+        """Expected return of each allocation"""
+        weights, total_allocation = self._allocation_weights(allocations)
+        return weights @ ASSET_EXPECTED_RETURNS / np.maximum(total_allocation, 1)
     
     def _estimate_volatility_from_allocation(self, allocation: Dict) -> float:
         """Estimate portfolio volatility based on asset allocation"""
-        volatilities = {
-            'Australian Shares': 0.16,
-            'International Shares': 0.17,
-            'Australian Bonds': 0.06,
-            'International Bonds': 0.07,
-            'Property/REITs': 0.14,
-            'Cash': 0.01
-        }
-        
-        total_vol = 0
-        total_allocation = 0
-        
-        for asset, weight in allocation.items():
-            if asset in volatilities:
-                total_vol += (weight ** 2) * (volatilities[asset] ** 2)
-                total_allocation += weight
-        
-        return (total_vol / max(total_allocation, 1)) ** 0.5
+        return float(self._estimate_volatilities_from_allocations([allocation])[0])
+    
+    def _estimate_volatilities_from_allocations(self, allocations: List[Dict]) -> np.ndarray:
+        """Volatility of each allocation, treating asset classes as uncorrelated"""
+        weights, total_allocation = self._allocation_weights(allocations)
+        return np.sqrt((weights ** 2) @ (ASSET_VOLATILITIES ** 2) / np.maximum(total_allocation, 1))
+    
+    def simulate_retirement(self, user_profile: Dict, allocation: Dict, n_paths: int = SIMULATION_PATHS,
+                            seed: int = None) -> Dict:
+        """Monte Carlo distribution of the retirement balance, with correlated asset-class returns"""
+        members = self._member_arrays([user_profile])
+        weights, total_allocation = self._allocation_weights([allocation])
+        mean_return, volatility = portfolio_moments(weights / np.maximum(total_allocation, 1)[:, np.newaxis],
+                                                    ASSET_EXPECTED_RETURNS, ASSET_VOLATILITIES, ASSET_CORRELATIONS)
+        annual_income = members['annual_income'][0]
+        return simulate_retirement(members['current_balance'][0], annual_income * EMPLOYER_CONTRIBUTION_RATE,
+                                   annual_income, mean_return[0], volatility[0],
+                                   members['years_to_retirement'][0], n_paths, np.random.default_rng(seed))
     
     def _calculate_scenarios(self, current_balance: float, annual_income: float, 
                            expected_return: float, years: int) -> Dict:
         """Calculate different projection scenarios"""
-        
-        annual_contribution = annual_income * 0.11 
-        
-        scenarios = {}
-        
-        for scenario, return_multiplier in [('pessimistic', 0.6), ('expected', 1.0), ('optimistic', 1.4)]:
-            scenario_return = expected_return * return_multiplier
-            
-            # Calculate future value
-            fv = self._future_value_with_payments(
-                current_balance, annual_contribution, scenario_return, years
-            )
-            
-            scenarios[scenario] = {
-                'final_balance': fv,
-                'annual_retirement_income': fv * 0.04,  
-                'return_assumption': scenario_return
+        return self._calculate_scenarios_many(
+            np.array([current_balance]), np.array([annual_income]), np.array([expected_return]), np.array([years])
+        )[0]
+    
+    def _calculate_scenarios_many(self, current_balance: np.ndarray, annual_income: np.ndarray,
+                                  expected_return: np.ndarray, years: np.ndarray) -> List[Dict]:
+        """Projection scenarios for every member from one (members, scenarios) evaluation"""
+        rates = scenario_rates(expected_return)
+        final_balance = future_value(current_balance[:, np.newaxis], (annual_income * EMPLOYER_CONTRIBUTION_RATE)[:, np.newaxis],
+                                     rates, years[:, np.newaxis])
+        
+        columns = [
+            (scenario, final_balance[:, k].tolist(), (final_balance[:, k] * WITHDRAWAL_RATE).tolist(), rates[:, k].tolist())
+            for k, scenario in enumerate(SCENARIO_MULTIPLIERS)
+        ]
+        return [
+            {
+                scenario: {
+                    'final_balance': fv[i],
+                    'annual_retirement_income': income[i],
+                    'return_assumption': scenario_return[i]
+                }
+                for scenario, fv, income, scenario_return in columns
             }
-        
-        return scenarios
+            for i in range(len(current_balance))
+        ]
     
     def _future_value_with_payments(self, pv: float, pmt: float, rate: float, years: int) -> float:
         """Calculate future value with regular payments"""
-        if rate == 0:
-            return pv + (pmt * years)
-        
-        fv_pv = pv * ((1 + rate) ** years)
-        fv_pmt = pmt * (((1 + rate) ** years - 1) / rate)
-        
-        return fv_pv + fv_pmt
+        return float(self._future_value_many(np.array([pv]), np.array([pmt]), np.array([rate]), np.array([years]))[0])
+    
+    def _future_value_many(self, pv: np.ndarray, pmt: np.ndarray, rate: np.ndarray, years: np.ndarray) -> np.ndarray:
+        """Future value with regular payments, element-wise"""
+        return future_value(pv, pmt, rate, years)
     
     def _analyze_contributions(self, current_balance: float, annual_income: float, 
                              expected_return: float, years: int) -> Dict:
         """Analyze required contributions for different retirement goals"""
+        return self._analyze_contributions_many(
+            np.array([current_balance]), np.array([annual_income]), np.array([expected_return]), np.array([years])
+        )[0]
+    
+    def _analyze_contributions_many(self, current_balance: np.ndarray, annual_income: np.ndarray,
+                                    expected_return: np.ndarray, years: np.ndarray) -> List[Dict]:
+        """
+        Required contributions for each retirement goal, for every member at once. The gaps are
+        evaluated for every scenario; the headline figures use the expected return, and each
+        target also lists the extra contribution needed under every scenario.
+        """
+        gaps = contribution_gaps(current_balance, annual_income, scenario_rates(expected_return), years)
+        expected = list(SCENARIO_MULTIPLIERS).index('expected')
+        additional = gaps['additional_annual_contribution_needed']
+        
+        columns = {}
+        for k, target_pct in enumerate(REPLACEMENT_TARGETS):
+            columns[f"{int(target_pct * 100)}%_replacement"] = {
+                'target_retirement_income': gaps['target_retirement_income'][:, k].tolist(),
+                'required_balance': gaps['required_balance'][:, k].tolist(),
+                'projected_balance_current_path': gaps['projected_balance_current_path'][:, expected].tolist(),
+                'shortfall': gaps['shortfall'][:, expected, k].tolist(),
+                'additional_annual_contribution_needed': additional[:, expected, k].tolist(),
+                'additional_monthly_contribution_needed': (additional[:, expected, k] / 12).tolist(),
+                'additional_annual_contribution_by_scenario': {
+                    scenario: additional[:, s, k].tolist() for s, scenario in enumerate(SCENARIO_MULTIPLIERS)
+                }
+            }
         
+        def row(values, i):
+            return {name: row(value, i) for name, value in values.items()} if isinstance(values, dict) else values[i]
         
-        income_replacement_targets = [0.6, 0.7, 0.8]  
-        
-        analysis = {}
-        
-        for target_pct in income_replacement_targets:
-            target_annual_income = annual_income * target_pct
-            required_balance = target_annual_income / 0.04  
-            
-            employer_contribution = annual_income * 0.11
-            
-            fv_current = current_balance * ((1 + expected_return) ** years)
-            fv_employer = employer_contribution * (((1 + expected_return) ** years - 1) / expected_return) if expected_return > 0 else employer_contribution * years
-            
-            shortfall = required_balance - fv_current - fv_employer
-            
-            if shortfall > 0 and expected_return > 0:
-                additional_annual_contribution = shortfall * expected_return / ((1 + expected_return) ** years - 1)
-            else:
-                additional_annual_contribution = 0
-            
-            analysis[f"{int(target_pct * 100)}%_replacement"] = {
-                'target_retirement_income': target_annual_income,
-                'required_balance': required_balance,
-                'projected_balance_current_path': fv_current + fv_employer,
-                'shortfall': max(0, shortfall),
-                'additional_annual_contribution_needed': max(0, additional_annual_contribution),
-                'additional_monthly_contribution_needed': max(0, additional_annual_contribution / 12)
+        return [row(columns, i) for i in range(len(current_balance))]
+    
+    def _projections_many(self, ages: np.ndarray, current_balance: np.ndarray, annual_income: np.ndarray,
+                          rates: np.ndarray, years: np.ndarray, scenarios: List[str]) -> List[Dict]:
+        """Year-by-year balance trajectory per member and scenario, up to retirement"""
+        paths = trajectories(current_balance, annual_income * EMPLOYER_CONTRIBUTION_RATE, rates, years).tolist()
+        # Ages and horizons may be fractional: the last point is the retirement age itself
+        n_points = np.ceil(years).astype(int) + 1
+        return [
+            {
+                'ages': (age + np.minimum(np.arange(n), n_years)).tolist(),
+                'balances': {scenario: member_paths[k][:n] for k, scenario in enumerate(scenarios)}
             }
-        
-        return analysis
+            for member_paths, age, n_years, n in zip(paths, ages, years, n_points.tolist())
+        ]
     
     def _calculate_confidence(self, features: List[float]) -> Dict:
         """Calculate model confidence based on feature similarity to training data"""
@@ -393,55 +495,80 @@ class SuperannuationPredictor:
     
     def _fallback_predictions(self, user_profile: Dict, investment_allocation: Dict) -> Dict:
         """Provide fallback predictions when ML model is unavailable"""
+        return self._fallback_many(self._member_arrays([user_profile]))[0]
+    
+    def _fallback_many(self, members: Dict[str, np.ndarray], include_projection: bool = False) -> List[Dict]:
+        """Fallback predictions for the members from _member_arrays, at a fixed 7% return"""
         
-        current_age = user_profile.get('age', 35)
-        retirement_age = user_profile.get('retirement_age_goal', 65)
-        years_to_retirement = max(1, retirement_age - current_age)
-        current_balance = user_profile.get('current_savings', 50000)
-        annual_income = user_profile.get('annual_income', 70000)
+        years_to_retirement = members['years_to_retirement']
+        current_balance = members['current_balance']
+        annual_income = members['annual_income']
         
        
         annual_contribution = annual_income * 0.11
-        expected_return = 0.07  
+        expected_return = np.full(len(current_balance), 0.07)
         
       
-        final_balance = self._future_value_with_payments(
+        final_balance = self._future_value_many(
             current_balance, annual_contribution, expected_return, years_to_retirement
         )
         
-        return {
-            'predictions': {
-                'projected_final_balance': final_balance,
-                'expected_annual_return': expected_return,
-                'years_to_retirement': years_to_retirement
-            },
-            'scenarios': {
-                'pessimistic': {
-                    'final_balance': final_balance * 0.7,
-                    'annual_retirement_income': final_balance * 0.7 * 0.04,
-                    'return_assumption': expected_return * 0.7
+        contribution_analysis = self._analyze_contributions_many(
+            current_balance, annual_income, expected_return, years_to_retirement
+        )
+        generated_at = datetime.now().isoformat()
+        
+        results = [
+            {
+                'predictions': {
+                    'projected_final_balance': balance,
+                    'expected_annual_return': 0.07,
+                    'years_to_retirement': years
                 },
-                'expected': {
-                    'final_balance': final_balance,
-                    'annual_retirement_income': final_balance * 0.04,
-                    'return_assumption': expected_return
+                'scenarios': {
+                    'pessimistic': {
+                        'final_balance': balance * 0.7,
+                        'annual_retirement_income': balance * 0.7 * 0.04,
+                        'return_assumption': 0.07 * 0.7
+                    },
+                    'expected': {
+                        'final_balance': balance,
+                        'annual_retirement_income': balance * 0.04,
+                        'return_assumption': 0.07
+                    },
+                    'optimistic': {
+                        'final_balance': balance * 1.3,
+                        'annual_retirement_income': balance * 1.3 * 0.04,
+                        'return_assumption': 0.07 * 1.3
+                    }
                 },
-                'optimistic': {
-                    'final_balance': final_balance * 1.3,
-                    'annual_retirement_income': final_balance * 1.3 * 0.04,
-                    'return_assumption': expected_return * 1.3
-                }
-            },
-            'contribution_analysis': self._analyze_contributions(
-                current_balance, annual_income, expected_return, years_to_retirement
-            ),
-            'model_confidence': {
-                'overall_confidence': 0.6,
-                'confidence_level': 'Medium (Fallback)',
-                'note': 'Using simplified calculations - complete profile for better accuracy'
-            },
-            'generated_at': datetime.now().isoformat()
-        }
+                'contribution_analysis': member_contributions,
+                'model_confidence': {
+                    'overall_confidence': 0.6,
+                    'confidence_level': 'Medium (Fallback)',
+                    'note': 'Using simplified calculations - complete profile for better accuracy'
+                },
+                'generated_at': generated_at
+            }
+            for balance, years, member_contributions in zip(
+                final_balance.tolist(), years_to_retirement.tolist(), contribution_analysis
+            )
+        ]
+        if include_projection:
+            # The fallback scenarios scale the final balance rather than the return, so only the
+            # expected path has a trajectory. The fallback must not fail, so a projection error
+            # only drops the projection.
+            try:
+                projections = self._projections_many(
+                    members['age'], current_balance, annual_income, expected_return[:, np.newaxis],
+                    years_to_retirement, ['expected']
+                )
+            except Exception as e:
+                logger.error(f"Error projecting fallback balances: {str(e)}")
+                projections = []
+            for result, projection in zip(results, projections):
+                result['projection'] = projection
+        return results
     
     def get_feature_importance(self) -> Dict:
         """Get feature importance from trained models"""
@@ -515,6 +642,7 @@ class SuperannuationPredictor:
                 metadata = joblib.load('models/model_metadata.joblib')
                 self.model_metrics = metadata.get('model_metrics', {})
                 self.is_trained = metadata.get('is_trained', False)
+                self._compile_models()
                 
                 logger.info("Models loaded successfully")
                 return True
@@ -524,38 +652,64 @@ class SuperannuationPredictor:
             
         return False
     
-    def evaluate_portfolio(self, user_profile: Dict, allocation: Dict) -> Dict:
+    def evaluate_portfolio(self, user_profile: Dict, allocation: Dict, correlation: np.ndarray = None) -> Dict:
         """Evaluate a specific portfolio allocation for the user"""
-        
-        
-        expected_return = self._estimate_return_from_allocation(allocation)
-        volatility = self._estimate_volatility_from_allocation(allocation)
-        
-        risk_free_rate = 0.025  
-        sharpe_ratio = (expected_return - risk_free_rate) / volatility if volatility > 0 else 0
-        
-      
-        age = user_profile.get('age', 35)
-        years_to_retirement = user_profile.get('retirement_age_goal', 65) - age
-        
-        
-        if years_to_retirement > 20:
-            target_volatility = 0.15  
-        elif years_to_retirement > 10:
-            target_volatility = 0.12
-        else:
-            target_volatility = 0.08
-        
-        risk_appropriateness = max(0, min(100, 100 - abs(volatility - target_volatility) * 500))
-        
+        return self.evaluate_portfolios([user_profile], [allocation], correlation)[0]
+    
+    def evaluate_portfolios(self, user_profiles: List[Dict], allocations: List[Dict],
+                            correlation: np.ndarray = None) -> List[Dict]:
+        """evaluate_portfolio for many members: every allocation scored in one score_allocations call"""
+        weights, total_allocation = self._allocation_weights(allocations)
+        years_to_retirement = np.array([
+            profile.get('retirement_age_goal', 65) - profile.get('age', 35) for profile in user_profiles
+        ])
+        scores = score_allocations(weights / np.maximum(total_allocation, 1)[:, np.newaxis], ASSET_EXPECTED_RETURNS,
+                                   covariance_matrix(ASSET_VOLATILITIES, correlation), years_to_retirement)
+        names = list(scores)
+        return [
+            self._evaluation(allocation, dict(zip(names, row)))
+            for allocation, row in zip(allocations, zip(*(scores[name].tolist() for name in names)))
+        ]
+    
+    def _evaluation(self, allocation: Dict, scores: Dict[str, float]) -> Dict:
+        risk_appropriateness = scores['risk_appropriateness']
         return {
             'allocation': allocation,
-            'expected_annual_return': expected_return,
-            'estimated_volatility': volatility,
-            'sharpe_ratio': sharpe_ratio,
+            'expected_annual_return': scores['expected_return'],
+            'estimated_volatility': scores['volatility'],
+            'sharpe_ratio': scores['sharpe_ratio'],
             'risk_appropriateness_score': risk_appropriateness,
             'suitability_rating': 'High' if risk_appropriateness > 80 else 'Medium' if risk_appropriateness > 60 else 'Low',
-            'recommendation': self._get_portfolio_recommendation(expected_return, volatility, risk_appropriateness)
+            'recommendation': self._get_portfolio_recommendation(scores['expected_return'], scores['volatility'],
+                                                                 risk_appropriateness)
+        }
+    
+    def optimize_allocation(self, user_profile: Dict, n_candidates: int = OPTIMIZER_CANDIDATES,
+                            frontier_points: int = FRONTIER_POINTS, correlation: np.ndarray = None,
+                            include: List[Dict] = (), seed: int = None) -> Dict:
+        """
+        Score candidate allocations as one matrix and return the efficient frontier and the best
+        allocation for the user's horizon. Allocations in include (e.g. the current one) are
+        always among the candidates.
+        """
+        years_to_retirement = user_profile.get('retirement_age_goal', 65) - user_profile.get('age', 35)
+        included = self._allocation_weights(include)[0] if include else np.empty((0, len(ASSET_CLASSES)))
+        weights = candidate_allocations(len(ASSET_CLASSES), n_candidates, np.random.default_rng(seed),
+                                        include=included[included.sum(axis=1) > 0])
+        scores = score_allocations(weights, ASSET_EXPECTED_RETURNS, covariance_matrix(ASSET_VOLATILITIES, correlation),
+                                   years_to_retirement)
+        frontier = efficient_frontier(scores['expected_return'], scores['volatility'], frontier_points)
+        best = best_for_horizon(frontier, scores, years_to_retirement)
+        
+        def evaluation(i):
+            allocation = {asset: float(round(weight, 4)) for asset, weight in zip(ASSET_CLASSES, weights[i])}
+            return self._evaluation(allocation, {name: float(values[i]) for name, values in scores.items()})
+        
+        return {
+            'best_allocation': evaluation(best),
+            'efficient_frontier': [evaluation(i) for i in frontier],
+            'target_volatility': float(target_volatility(years_to_retirement)),
+            'candidates_evaluated': len(weights),
         }
     
     def _get_portfolio_recommendation(self, expected_return: float, volatility: float, 
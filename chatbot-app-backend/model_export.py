@@ -0,0 +1,276 @@
+"""
+Model export module:
+- converts Share_Prediction.h5 to a quantized TFLite flatbuffer (float16, int8 weights, or int8 with calibration)
+- TFLiteModel serves the artifact through the lightweight TFLite interpreter (tflite_runtime,
+  ai_edge_litert or tensorflow.lite, whichever is installed) behind the same predict() interface
+- drift_report() measures how far the artifact moves from the Keras model, per window and over a rollout
+- benchmark() times Keras, NumPy and TFLite predictions on the same inputs
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATIONS = ('none', 'float16', 'dynamic', 'int8')
+DEFAULT_QUANTIZATION = 'dynamic'
+
+
+def _interpreter_class():
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    import tensorflow as tf
+    return tf.lite.Interpreter
+
+
+def calibration_windows(n_windows=512, lookback_period=60, seed=0, histories=None):
+    """
+    Scaled (n, lookback, 1) windows for int8 calibration and drift checks.
+    With histories (symbol -> close array) they are real windows scaled like prepare_data();
+    otherwise min-max normalised random walks.
+    """
+    if histories:
+        from backtest import build_windows
+        windows = np.concatenate([
+            build_windows(closes, lookback_period, eval_days=None, scaling='global')[0]
+            for closes in histories.values() if len(closes) > lookback_period + 1
+        ])
+        rng = np.random.default_rng(seed)
+        if len(windows) > n_windows:
+            windows = windows[np.sort(rng.choice(len(windows), n_windows, replace=False))]
+        return windows[..., np.newaxis].astype(np.float32)
+
+    rng = np.random.default_rng(seed)
+    walk = np.cumsum(rng.normal(0, 0.02, size=(n_windows, lookback_period)), axis=1)
+    walk = (walk - walk.min(axis=1, keepdims=True)) / np.ptp(walk, axis=1, keepdims=True)
+    return walk[..., np.newaxis].astype(np.float32)
+
+
+def export_tflite(h5_path, output_path=None, quantization=DEFAULT_QUANTIZATION, lookback_period=60, calibration=None):
+    """
+    Convert the Keras model to TFLite and write it next to a <output>.json metadata file.
+
+    The LSTMs are rebuilt with unroll=True before conversion: the default while-loop form bakes
+    the batch size into the graph, while the unrolled one keeps it dynamic so ensembles and
+    backtests can run batched. quantization:
+      none     float32 weights
+      float16  float16 weights, float32 compute
+      dynamic  int8 weights, float32 activations (smallest accuracy cost for this model)
+      int8     int8 weights and activations calibrated on `calibration` windows; float I/O
+    """
+    import tensorflow as tf
+    from numpy_lstm import model_file_version
+
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization '{quantization}', expected one of {', '.join(QUANTIZATIONS)}")
+    output_path = output_path or os.path.splitext(h5_path)[0] + '.tflite'
+
+    source = tf.keras.models.load_model(h5_path)
+    config = source.get_config()
+    for layer in config['layers']:
+        if layer['class_name'] == 'LSTM':
+            layer['config']['unroll'] = True
+    model = tf.keras.Sequential.from_config(config)
+    model.set_weights(source.get_weights())
+
+    with tempfile.TemporaryDirectory() as saved_model_dir:
+        model.export(saved_model_dir, format='tf_saved_model', verbose=False,
+                     input_signature=[tf.TensorSpec([None, lookback_period, 1], tf.float32)])
+        converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+        if quantization != 'none':
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if quantization == 'float16':
+            converter.target_spec.supported_types = [tf.float16]
+        if quantization == 'int8':
+            windows = calibration if calibration is not None else calibration_windows(lookback_period=lookback_period)
+            converter.representative_dataset = lambda: ([window[np.newaxis]] for window in windows)
+        flatbuffer = converter.convert()
+
+    with open(output_path, 'wb') as f:
+        f.write(flatbuffer)
+    metadata = {
+        'source': os.path.basename(h5_path),
+        'source_version': model_file_version(h5_path),
+        'quantization': quantization,
+        'lookback_period': lookback_period,
+        'size_bytes': len(flatbuffer),
+        'exported_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    with open(output_path + '.json', 'w') as f:
+        json.dump(metadata, f, indent=2)
+    logger.info(f"Exported {h5_path} -> {output_path} ({quantization}, {len(flatbuffer) / 1024:.0f} KiB)")
+    return metadata
+
+
+class TFLiteModel:
+    """
+    Serves a TFLite artifact with the predict()/__call__ interface of the Keras and NumPy models.
+    Interpreters are not thread-safe, so each forecast worker thread gets its own.
+    """
+
+    def __init__(self, path, num_threads=None):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._content = f.read()
+        self.num_threads = num_threads
+        self._interpreter_class = _interpreter_class()
+        self._local = threading.local()
+        metadata_path = path + '.json'
+        self.metadata = {}
+        if os.path.exists(metadata_path):
+            with open(metadata_path) as f:
+                self.metadata = json.load(f)
+
+    def _interpreter(self):
+        state = getattr(self._local, 'state', None)
+        if state is None:
+            interpreter = self._interpreter_class(model_content=self._content, num_threads=self.num_threads)
+            interpreter.allocate_tensors()
+            state = self._local.state = {
+                'interpreter': interpreter,
+                'input': interpreter.get_input_details()[0]['index'],
+                'output': interpreter.get_output_details()[0]['index'],
+                'batch': None,
+            }
+        return state
+
+    def predict(self, x, verbose=0, batch_size=None):
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == 2:
+            x = x[..., np.newaxis]
+        state = self._interpreter()
+        interpreter = state['interpreter']
+        if state['batch'] != x.shape:
+            interpreter.resize_tensor_input(state['input'], list(x.shape))
+            interpreter.allocate_tensors()
+            state['batch'] = x.shape
+        interpreter.set_tensor(state['input'], x)
+        interpreter.invoke()
+        return interpreter.get_tensor(state['output']).copy()
+
+    def __call__(self, x):
+        return self.predict(x)
+
+    def summary(self):
+        quantization = self.metadata.get('quantization', 'unknown')
+        print(f"TFLite model {os.path.basename(self.path)} ({quantization}, {len(self._content) / 1024:.0f} KiB)")
+
+
+def drift_report(keras_model, candidate, windows, closes=None, horizon_days=252, seed=0):
+    """
+    Accuracy drift of candidate against keras_model.
+    Per window: absolute error in scaled units (fractions of the min-max range).
+    Rollout: both models forecast the same closes with the same noise for horizon_days,
+    reporting the largest and final relative price gap after errors compound.
+    """
+    from sklearn.preprocessing import MinMaxScaler
+    from forecast_engine import forecast_paths
+
+    expected = np.asarray(keras_model.predict(windows, verbose=0)).reshape(-1)
+    actual = np.asarray(candidate.predict(windows)).reshape(-1)
+    error = np.abs(expected - actual)
+    report = {
+        'windows': len(windows),
+        'max_abs_error': float(error.max()),
+        'mean_abs_error': float(error.mean()),
+        'p99_abs_error': float(np.percentile(error, 99)),
+    }
+
+    if closes is None:
+        rng = np.random.default_rng(seed)
+        closes = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, 750)))
+    scaler = MinMaxScaler(feature_range=(0, 1)).fit(np.asarray(closes).reshape(-1, 1))
+    paths = [
+        forecast_paths(model, closes, scaler, horizon_days, rng=np.random.default_rng(seed))[0]
+        for model in (keras_model, candidate)
+    ]
+    gap = np.abs(paths[1] - paths[0]) / paths[0]
+    report['rollout_days'] = horizon_days
+    report['rollout_max_rel_gap'] = float(gap.max())
+    report['rollout_final_rel_gap'] = float(gap[-1])
+    return report
+
+
+def benchmark(models, windows, batch_sizes=(1, 64), repeats=50, rollout_days=252):
+    """Milliseconds per predict() call at each batch size, and seconds for a one-path rollout"""
+    from sklearn.preprocessing import MinMaxScaler
+    from forecast_engine import forecast_paths, make_predict_fn
+
+    closes = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0.0003, 0.015, 750)))
+    scaler = MinMaxScaler(feature_range=(0, 1)).fit(closes.reshape(-1, 1))
+
+    results = {}
+    for name, model in models.items():
+        predict = make_predict_fn(model)
+        timings = {}
+        for batch_size in batch_sizes:
+            x = windows[:batch_size]
+            predict(x)  # warm-up: tracing, tensor allocation
+            started = time.perf_counter()
+            for _ in range(repeats):
+                predict(x)
+            timings[f'batch_{batch_size}_ms'] = (time.perf_counter() - started) / repeats * 1000
+        started = time.perf_counter()
+        forecast_paths(model, closes, scaler, rollout_days, rng=np.random.default_rng(0))
+        timings[f'rollout_{rollout_days}d_s'] = time.perf_counter() - started
+        results[name] = timings
+    return results
+
+
+if __name__ == "__main__":
+    default_model = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Share_Prediction.h5')
+
+    parser = argparse.ArgumentParser(description="Export the share prediction model to quantized TFLite")
+    parser.add_argument('--model', default=default_model)
+    parser.add_argument('--output', help="Defaults to the model path with a .tflite extension")
+    parser.add_argument('--quantization', choices=QUANTIZATIONS, default=DEFAULT_QUANTIZATION)
+    parser.add_argument('--calibration-csv-dir', help="Calibrate/check on <SYMBOL>.csv histories instead of random walks")
+    parser.add_argument('--skip-benchmark', action='store_true')
+    args = parser.parse_args()
+
+    histories = None
+    if args.calibration_csv_dir:
+        from market_data import MarketDataStore, CSVProvider
+        from backtest import load_histories
+        store = MarketDataStore(os.path.join(args.calibration_csv_dir, '.store'), CSVProvider(args.calibration_csv_dir))
+        symbols = [name[:-4] for name in os.listdir(args.calibration_csv_dir) if name.endswith('.csv')]
+        histories = load_histories(store, symbols, '1900-01-01', time.strftime('%Y-%m-%d', time.gmtime(time.time() + 86400)))
+    windows = calibration_windows(histories=histories)
+
+    output_path = args.output or os.path.splitext(args.model)[0] + '.tflite'
+    metadata = export_tflite(args.model, output_path, args.quantization, calibration=windows)
+    print(f"Wrote {output_path}: {metadata['quantization']}, {metadata['size_bytes'] / 1024:.0f} KiB "
+          f"(source {os.path.getsize(args.model) / 1024:.0f} KiB)")
+
+    from tensorflow.keras.models import load_model as keras_load_model
+    from numpy_lstm import load_model as numpy_load_model
+
+    keras_model = keras_load_model(args.model)
+    tflite_model = TFLiteModel(output_path)
+    closes = next(iter(histories.values())) if histories else None
+    print("\nAccuracy drift vs Keras:")
+    for key, value in drift_report(keras_model, tflite_model, windows, closes=closes).items():
+        print(f"  {key:<24} {value:.3g}" if isinstance(value, float) else f"  {key:<24} {value}")
+
+    if not args.skip_benchmark:
+        print("\nLatency:")
+        results = benchmark({'keras': keras_model, 'numpy': numpy_load_model(args.model), 'tflite': tflite_model}, windows)
+        columns = list(next(iter(results.values())))
+        print(f"  {'backend':<8}" + "".join(f"{column:>18}" for column in columns))
+        for name, timings in results.items():
+            print(f"  {name:<8}" + "".join(f"{timings[column]:>18.3f}" for column in columns))
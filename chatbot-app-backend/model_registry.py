@@ -0,0 +1,150 @@
+"""
+Model registry module:
+- resolves the share model to use for a symbol: a per-symbol fine-tuned variant, else a
+  per-sector variant, else the global model loaded at startup
+- variants are loaded lazily on first use (concurrent first requests share one load) and
+  kept in an LRU that evicts least recently used variants once a memory budget is exceeded
+- every model comes with its content version, so forecast cache keys follow the variant
+- hit/miss/eviction counters and load times for sizing the budget
+
+Layout:  <directory>/symbols/<SYMBOL>.h5, <directory>/sectors/<sector>.h5,
+         <directory>/sectors.json  {"AAPL": "technology", ...}
+"""
+
+import json
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+
+from numpy_lstm import load_stock_model, model_file_version, stock_model_artifact
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGISTRY_DIR = os.getenv(
+    'MODEL_REGISTRY_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'variants')
+)
+DEFAULT_MEMORY_BUDGET_MB = float(os.getenv('MODEL_REGISTRY_MEMORY_MB', '256'))
+
+
+def model_memory_bytes(model, artifact_path):
+    """Resident size of a loaded model: float32 weights, or the artifact size for opaque backends"""
+    if hasattr(model, 'count_params'):
+        return int(model.count_params()) * 4
+    return os.path.getsize(artifact_path)
+
+
+class ModelRegistry:
+    """Thread-safe symbol -> (model, version) resolution with a memory-bounded LRU of variants"""
+
+    def __init__(self, default_model, default_version, directory=DEFAULT_REGISTRY_DIR,
+                 memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB, loader=load_stock_model):
+        self.default_model = default_model
+        self.default_version = default_version
+        self.directory = directory
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.loader = loader
+        self._entries = OrderedDict()   # variant path -> (model, version, bytes)
+        self._failed = {}               # variant path -> mtime of the file that failed to load
+        self._lock = threading.Lock()
+        self._loads = SingleFlight()
+        self.sectors = self._read_sectors()
+        self.hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+        self.evictions = 0
+        self.load_errors = 0
+        self.load_seconds = 0.0
+        self.max_load_seconds = 0.0
+
+    def _read_sectors(self):
+        try:
+            with open(os.path.join(self.directory, 'sectors.json')) as f:
+                return {symbol.upper(): sector for symbol, sector in json.load(f).items()}
+        except (OSError, ValueError):
+            return {}
+
+    def reload_sectors(self):
+        self.sectors = self._read_sectors()
+
+    def variant_path(self, symbol):
+        """Path of the most specific variant file for symbol, or None"""
+        candidates = [os.path.join(self.directory, 'symbols', f"{symbol}.h5")]
+        if symbol in self.sectors:
+            candidates.append(os.path.join(self.directory, 'sectors', f"{self.sectors[symbol]}.h5"))
+        for path in candidates:
+            if os.path.exists(path):
+                return path
+        return None
+
+    def get(self, symbol):
+        """(model, version) for symbol; the global model when it has no usable variant"""
+        path = self.variant_path(symbol.upper())
+        if path is None or self._failed.get(path) == os.path.getmtime(path):
+            with self._lock:
+                self.fallbacks += 1
+            return self.default_model, self.default_version
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[0], entry[1]
+            self.misses += 1
+
+        try:
+            model, version, _ = self._loads.do(path, self._load, path)
+        except Exception as e:
+            logger.warning(f"Falling back to the global model for {symbol}: could not load {path}: {e}")
+            return self.default_model, self.default_version
+        return model, version
+
+    def _load(self, path):
+        started = time.perf_counter()
+        try:
+            model = self.loader(path)
+            artifact = stock_model_artifact(path)
+            entry = (model, model_file_version(artifact), model_memory_bytes(model, artifact))
+        except Exception:
+            with self._lock:
+                self.load_errors += 1
+                self._failed[path] = os.path.getmtime(path)
+            raise
+        elapsed = time.perf_counter() - started
+        logger.info(f"Loaded model variant {path} in {elapsed:.2f}s")
+
+        with self._lock:
+            self.load_seconds += elapsed
+            self.max_load_seconds = max(self.max_load_seconds, elapsed)
+            self._failed.pop(path, None)
+            self._entries[path] = entry
+            # The newest entry always stays, even if it alone exceeds the budget
+            while len(self._entries) > 1 and self._resident_bytes() > self.memory_budget:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def _resident_bytes(self):
+        return sum(size for _, _, size in self._entries.values())
+
+    def stats(self):
+        with self._lock:
+            loads = self.misses
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'resident_mb': self._resident_bytes() / (1024 * 1024),
+                'memory_budget_mb': self.memory_budget / (1024 * 1024),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'fallbacks': self.fallbacks,
+                'evictions': self.evictions,
+                'load_errors': self.load_errors,
+                'avg_load_seconds': self.load_seconds / loads if loads else 0.0,
+                'max_load_seconds': self.max_load_seconds,
+                'variants': list(self._entries),
+            }
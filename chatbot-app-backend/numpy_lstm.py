@@ -0,0 +1,293 @@
+"""
+NumPy inference module for the share prediction model:
+- reads the Sequential LSTM/Dense weights straight from the Keras .h5 file
+- runs the forward pass with float32 matrix ops, no TensorFlow import
+- exposes predict()/__call__ so it can stand in for a loaded Keras model
+"""
+
+import hashlib
+import json
+import os
+import logging
+
+import numpy as np
+import h5py
+
+logger = logging.getLogger(__name__)
+
+_ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'sigmoid': lambda x: 0.5 * (1 + np.tanh(0.5 * x)),
+}
+
+
+def _activation(name):
+    if name not in _ACTIVATIONS:
+        raise ValueError(f"Unsupported activation '{name}'")
+    return _ACTIVATIONS[name]
+
+
+class LSTMLayer:
+    """Keras LSTM layer (gate order i, f, c, o)"""
+
+    def __init__(self, name, kernel, recurrent_kernel, bias, return_sequences=False,
+                 activation='tanh', recurrent_activation='sigmoid'):
+        self.name = name
+        self.kernel = np.ascontiguousarray(kernel, dtype=np.float32)
+        self.recurrent_kernel = np.ascontiguousarray(recurrent_kernel, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.units = self.recurrent_kernel.shape[0]
+        self.return_sequences = return_sequences
+        self.activation = _activation(activation)
+        self.recurrent_activation = _activation(recurrent_activation)
+
+    def cell(self, x_proj_t, h, c):
+        """One timestep given the already-projected input; returns (h, c)"""
+        u = self.units
+        z = x_proj_t + h @ self.recurrent_kernel
+        gates = self.recurrent_activation(z)
+        c = gates[:, u:2 * u] * c + gates[:, :u] * self.activation(z[:, 2 * u:3 * u])
+        h = gates[:, 3 * u:] * self.activation(c)
+        return h, c
+
+    def run(self, x, h=None, c=None):
+        """Run a (batch, timesteps, features) sequence; returns (output, h, c)"""
+        batch, timesteps, _ = x.shape
+        # Input projections for every timestep in one matmul
+        x_proj = x @ self.kernel + self.bias
+        if h is None:
+            h = np.zeros((batch, self.units), dtype=np.float32)
+        if c is None:
+            c = np.zeros((batch, self.units), dtype=np.float32)
+        outputs = np.empty((batch, timesteps, self.units), dtype=np.float32) if self.return_sequences else None
+
+        for t in range(timesteps):
+            h, c = self.cell(x_proj[:, t], h, c)
+            if outputs is not None:
+                outputs[:, t] = h
+
+        return (outputs if outputs is not None else h), h, c
+
+    def __call__(self, x):
+        return self.run(x)[0]
+
+    def count_params(self):
+        return self.kernel.size + self.recurrent_kernel.size + self.bias.size
+
+
+class DenseLayer:
+    """Keras Dense layer"""
+
+    def __init__(self, name, kernel, bias, activation='linear'):
+        self.name = name
+        self.kernel = np.ascontiguousarray(kernel, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.units = self.kernel.shape[1]
+        self.activation = _activation(activation)
+
+    def __call__(self, x):
+        return self.activation(x @ self.kernel + self.bias)
+
+    def count_params(self):
+        return self.kernel.size + self.bias.size
+
+
+class NumpyLSTMModel:
+    """Sequential stack of LSTM/Dense layers evaluated in NumPy"""
+
+    def __init__(self, layers, name='sequential'):
+        self.layers = layers
+        self.name = name
+
+    def __call__(self, x, training=False):
+        out = np.asarray(x, dtype=np.float32)
+        if out.ndim == 2:
+            out = out[..., np.newaxis]
+        for layer in self.layers:
+            out = layer(out)
+        return out
+
+    def initial_state(self, x):
+        """
+        Run a full (batch, timesteps, 1) window and return (output, states).
+        states holds one (h, c) pair per LSTM layer so step() can continue from here.
+        """
+        out = np.asarray(x, dtype=np.float32)
+        if out.ndim == 2:
+            out = out[..., np.newaxis]
+        states = []
+        for layer in self.layers:
+            if isinstance(layer, LSTMLayer):
+                out, h, c = layer.run(out)
+                states.append((h, c))
+            else:
+                out = layer(out)
+        return out, states
+
+    def step(self, x_t, states):
+        """
+        Feed one new (batch,) point through the stack, carrying the LSTM states forward.
+        Cost is independent of the lookback length. Returns (output, new_states).
+        """
+        out = np.asarray(x_t, dtype=np.float32).reshape(-1, 1)
+        new_states = []
+        lstm_index = 0
+        for layer in self.layers:
+            if isinstance(layer, LSTMLayer):
+                h, c = states[lstm_index]
+                out, c = layer.cell(out @ layer.kernel + layer.bias, h, c)
+                new_states.append((out, c))
+                lstm_index += 1
+            else:
+                out = layer(out)
+        return out, new_states
+
+    def predict(self, x, verbose=0, batch_size=None):
+        """Same contract as keras Model.predict for this model: (batch, timesteps, 1) -> (batch, 1)"""
+        x = np.asarray(x, dtype=np.float32)
+        if batch_size is None or len(x) <= batch_size:
+            return self(x)
+        return np.concatenate([self(x[i:i + batch_size]) for i in range(0, len(x), batch_size)])
+
+    def count_params(self):
+        return sum(layer.count_params() for layer in self.layers)
+
+    def summary(self):
+        print(f'Model: "{self.name}" (NumPy inference)')
+        for layer in self.layers:
+            print(f"  {layer.name:<12} {type(layer).__name__:<12} units={layer.units:<5} params={layer.count_params()}")
+        print(f"Total params: {self.count_params()}")
+
+
+def _layer_weights(weights_group, layer_name):
+    """Collect a layer's datasets keyed by short name (kernel, recurrent_kernel, bias)"""
+    found = {}
+
+    def visit(name, obj):
+        if isinstance(obj, h5py.Dataset):
+            found[name.split('/')[-1].split(':')[0]] = obj[()]
+
+    weights_group[layer_name].visititems(visit)
+    return found
+
+
+def load_model(path):
+    """Build a NumpyLSTMModel from a Keras Sequential .h5 file"""
+    with h5py.File(path, 'r') as f:
+        config = f.attrs['model_config']
+        if isinstance(config, bytes):
+            config = config.decode('utf-8')
+        config = json.loads(config)
+        if config.get('class_name') != 'Sequential':
+            raise ValueError(f"Expected a Sequential model, got {config.get('class_name')}")
+
+        weights_group = f['model_weights'] if 'model_weights' in f else f
+        layers = []
+        for layer_config in config['config']['layers']:
+            class_name = layer_config['class_name']
+            cfg = layer_config['config']
+            if class_name == 'InputLayer':
+                continue
+            weights = _layer_weights(weights_group, cfg['name'])
+            if class_name == 'LSTM':
+                layers.append(LSTMLayer(
+                    cfg['name'], weights['kernel'], weights['recurrent_kernel'], weights['bias'],
+                    return_sequences=cfg.get('return_sequences', False),
+                    activation=cfg.get('activation', 'tanh'),
+                    recurrent_activation=cfg.get('recurrent_activation', 'sigmoid'),
+                ))
+            elif class_name == 'Dense':
+                layers.append(DenseLayer(
+                    cfg['name'], weights['kernel'], weights['bias'],
+                    activation=cfg.get('activation', 'linear'),
+                ))
+            elif class_name == 'Dropout':
+                continue
+            else:
+                raise ValueError(f"Unsupported layer type '{class_name}'")
+
+    return NumpyLSTMModel(layers, name=config['config'].get('name', 'sequential'))
+
+
+def model_file_version(path):
+    """Short content hash of a model file, used to key cached forecasts"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def stock_model_artifact(path, backend=None):
+    """
+    File the given backend loads for the .h5 model at path: the .h5 itself, or for 'tflite'
+    STOCK_MODEL_TFLITE_PATH / the exported <model>.tflite next to it (see model_export.py)
+    """
+    backend = (backend or os.getenv('STOCK_MODEL_BACKEND', 'numpy')).lower()
+    if backend == 'tflite':
+        return os.getenv('STOCK_MODEL_TFLITE_PATH') or os.path.splitext(path)[0] + '.tflite'
+    return path
+
+
+def load_stock_model(path, backend=None):
+    """
+    Load the share prediction model with the configured backend.
+    backend: 'numpy' (default), 'keras' or 'tflite'; falls back to STOCK_MODEL_BACKEND env var
+    """
+    backend = (backend or os.getenv('STOCK_MODEL_BACKEND', 'numpy')).lower()
+    if backend == 'tflite':
+        from model_export import TFLiteModel
+        return TFLiteModel(stock_model_artifact(path, backend))
+    if backend == 'keras':
+        from tensorflow.keras.models import load_model as keras_load_model
+        return keras_load_model(path)
+    if backend == 'numpy':
+        return load_model(path)
+    raise ValueError(f"Unknown stock model backend '{backend}'")
+
+
+def check_keras_parity(path, n_samples=256, lookback=60, atol=1e-4, seed=0):
+    """
+    Compare NumPy and Keras outputs on random windows and on a smooth synthetic price path.
+    Returns a report dict; 'passed' is True when every output is within atol.
+    """
+    from tensorflow.keras.models import load_model as keras_load_model
+
+    numpy_model = load_model(path)
+    keras_model = keras_load_model(path)
+
+    rng = np.random.default_rng(seed)
+    random_windows = rng.uniform(0, 1, size=(n_samples, lookback, 1)).astype(np.float32)
+    walk = np.cumsum(rng.normal(0, 0.02, size=(n_samples, lookback)), axis=1)
+    walk = (walk - walk.min(axis=1, keepdims=True)) / np.ptp(walk, axis=1, keepdims=True)
+    walk_windows = walk[..., np.newaxis].astype(np.float32)
+
+    report = {}
+    for label, windows in [('random', random_windows), ('random_walk', walk_windows)]:
+        expected = keras_model.predict(windows, verbose=0)
+        actual = numpy_model.predict(windows)
+        error = np.abs(expected - actual)
+        report[label] = {
+            'max_abs_error': float(error.max()),
+            'mean_abs_error': float(error.mean()),
+        }
+    report['passed'] = all(v['max_abs_error'] <= atol for v in report.values())
+    return report
+
+
+if __name__ == "__main__":
+    model_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Share_Prediction.h5')
+    model = load_model(model_path)
+    model.summary()
+
+    try:
+        parity = check_keras_parity(model_path)
+    except ImportError:
+        print("TensorFlow not installed - skipping Keras parity check")
+    else:
+        for label, stats in parity.items():
+            print(f"{label}: {stats}")
+        if not parity['passed']:
+            raise SystemExit("NumPy outputs drifted from Keras beyond tolerance")
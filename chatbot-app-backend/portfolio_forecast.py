@@ -0,0 +1,182 @@
+"""
+Portfolio forecast module:
+- aligns the cached daily closes of a set of holdings and estimates the mean and covariance
+  of their daily log returns
+- simulates correlated log-return paths for every asset at once (standard normal draws times
+  the Cholesky factor), in chunks of paths so memory stays bounded for long horizons
+- reports the value of the buy-and-hold portfolio: percentile bands, the /predict-stock
+  summary stats (volatility, max drawdown, ...) at portfolio level, and VaR / CVaR
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from forecast_engine import TRADING_DAYS_PER_YEAR, percentile_bands, summarize_paths
+from forecast_payload import get_future_dates, get_historical_series
+
+# float32 elements per simulated chunk of (paths, days, assets); 4M is 16 MB
+SIMULATION_CHUNK_ELEMENTS = int(os.getenv('PORTFOLIO_CHUNK_ELEMENTS', str(4 * 1024 * 1024)))
+VAR_CONFIDENCE = 0.95
+
+
+def align_closes(histories):
+    """(dates, closes) for the trading days every history has; closes is (days, assets)"""
+    frame = pd.concat([data['Close'].rename(symbol) for symbol, data in histories.items()], axis=1, join='inner')
+    return frame.index, frame.values.astype(np.float64)
+
+
+def estimate_return_moments(closes, lookback_days=None):
+    """Mean vector and covariance matrix of daily log returns, from the last lookback_days returns"""
+    log_returns = np.diff(np.log(closes), axis=0)
+    if lookback_days:
+        log_returns = log_returns[-lookback_days:]
+    if len(log_returns) < 2:
+        raise ValueError("Not enough overlapping history to estimate a covariance matrix")
+    return log_returns.mean(axis=0), np.atleast_2d(np.cov(log_returns, rowvar=False))
+
+
+def cholesky_factor(covariance):
+    """
+    Lower-triangular L with L @ L.T == covariance. A matrix that is only positive semi-definite
+    (an asset that duplicates another, too few days for the number of assets) has its
+    eigenvalues clipped to a small positive floor first.
+    """
+    try:
+        return np.linalg.cholesky(covariance)
+    except np.linalg.LinAlgError:
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        floor = max(eigenvalues.max(), 1e-12) * 1e-10
+        repaired = (eigenvectors * np.maximum(eigenvalues, floor)) @ eigenvectors.T
+        return np.linalg.cholesky((repaired + repaired.T) / 2)
+
+
+def simulate_portfolio_values(weights, drift, cholesky, total_days, n_paths=1000, rng=None, antithetic=True):
+    """
+    (n_paths, total_days) buy-and-hold portfolio values, starting from 1.0.
+    Asset i's log price moves by drift[i] + (z @ cholesky.T)[i] each day; the portfolio holds
+    weights[i] of its starting value in asset i. With antithetic=True every draw z is used
+    twice (z and -z): the pair's log prices are drift * t +/- cumsum(z @ cholesky.T), so the
+    random numbers, the matmul, the cumsum and the exp are all done once per pair. The draw
+    buffer is reused across chunks and every step after the matmul works in place.
+    """
+    rng = rng or np.random.default_rng()
+    weights = np.asarray(weights, dtype=np.float32)
+    factor_t = np.asarray(cholesky, dtype=np.float32).T
+    n_assets = len(weights)
+    trend = np.exp(np.outer(np.arange(1, total_days + 1), drift)).astype(np.float32)
+
+    trend_squared = trend * trend
+    values = np.empty((n_paths, total_days), dtype=np.float32)
+    step = 2 if antithetic else 1
+    chunk = max(step, SIMULATION_CHUNK_ELEMENTS // (total_days * n_assets) * step)
+    draws = np.empty(((chunk + step - 1) // step, total_days, n_assets), dtype=np.float32)
+    for start in range(0, n_paths, chunk):
+        n = min(chunk, n_paths - start)
+        n_draws = (n + step - 1) // step
+        shocks = rng.standard_normal(dtype=np.float32, out=draws[:n_draws]) @ factor_t
+        np.cumsum(shocks, axis=1, out=shocks)
+        np.exp(shocks, out=shocks)
+        shocks *= trend
+        values[start:start + n_draws] = shocks @ weights
+        if antithetic:
+            # trend * exp(-c) == trend**2 / (trend * exp(c))
+            np.divide(trend_squared, shocks, out=shocks)
+            values[start + n_draws:start + n] = (shocks @ weights)[:n - n_draws]
+    return values
+
+
+def value_at_risk(returns, confidence=VAR_CONFIDENCE):
+    """(VaR, CVaR) of simulated returns as positive loss fractions at the given confidence"""
+    returns = np.sort(np.asarray(returns, dtype=np.float64))
+    tail = returns[:max(1, int(np.floor(len(returns) * (1 - confidence))))]
+    return float(-np.quantile(returns, 1 - confidence)), float(-tail.mean())
+
+
+def risk_report(values, initial_value, years, confidence=VAR_CONFIDENCE):
+    """VaR and CVaR of the portfolio over one day, one year and the whole horizon"""
+    horizons = {'1d': 1, '1y': TRADING_DAYS_PER_YEAR, f'{years}y': years * TRADING_DAYS_PER_YEAR}
+    report = {}
+    for label, days in horizons.items():
+        var, cvar = value_at_risk(values[:, days - 1] - 1.0, confidence)
+        report[label] = {
+            'var': var * 100, 'cvar': cvar * 100,
+            'var_amount': var * initial_value, 'cvar_amount': cvar * initial_value,
+        }
+    return {'confidence': confidence, **report}
+
+
+def portfolio_forecast(histories, weights, years=2, n_paths=1000, initial_value=10000.0, seed=None,
+                       confidence=VAR_CONFIDENCE):
+    """
+    Forecast payload for a portfolio, shaped like /predict-stock so the same formatting and
+    downsampling apply: the historical series is today's holdings valued over the past, the
+    future series are percentile bands of the simulated portfolio value.
+    histories maps symbol -> OHLCV frame, weights maps symbol -> weight (normalised here).
+    """
+    symbols = list(histories)
+    weight_vector = np.array([weights[symbol] for symbol in symbols], dtype=np.float64)
+    weight_vector /= weight_vector.sum()
+
+    dates, closes = align_closes(histories)
+    drift, covariance = estimate_return_moments(closes)
+    cholesky = cholesky_factor(covariance)
+
+    total_days = years * TRADING_DAYS_PER_YEAR
+    rng = np.random.default_rng(seed)
+    values = simulate_portfolio_values(weight_vector, drift, cholesky, total_days, n_paths, rng)
+
+    # Today's holdings valued over the past, ending at initial_value
+    history = pd.DataFrame({'Close': initial_value * (closes / closes[-1]) @ weight_vector}, index=dates)
+    historical_dates, historical_values = get_historical_series(history)
+
+    bands = {name: band * initial_value for name, band in percentile_bands(values).items()}
+    volatility = np.sqrt(np.diag(covariance) * TRADING_DAYS_PER_YEAR)
+    return {
+        "historical_dates": historical_dates,
+        "historical_prices": historical_values,
+        "future_dates": get_future_dates(history, years),
+        "future_predictions": bands["p50"],
+        "uncertainty_upper": bands["p95"],
+        "uncertainty_lower": bands["p5"],
+        "percentile_bands": bands,
+        "stats": summarize_paths(values * initial_value, initial_value, years),
+        "risk": risk_report(values, initial_value, years, confidence),
+        "assets": [
+            {"symbol": symbol, "weight": float(weight_vector[k]), "last_price": float(closes[-1, k]),
+             "annual_drift": float(drift[k] * TRADING_DAYS_PER_YEAR * 100), "volatility": float(volatility[k] * 100)}
+            for k, symbol in enumerate(symbols)
+        ],
+        "correlation": np.round(covariance / np.outer(volatility, volatility) * TRADING_DAYS_PER_YEAR, 4).tolist(),
+        "ensemble": {"n_paths": n_paths, "seed": seed, "observations": len(closes) - 1},
+        "error": False
+    }
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    n_assets, n_paths, years = 20, 1000, 10
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=800)
+    mixing = rng.normal(0, 0.01, (n_assets, n_assets)) / np.sqrt(n_assets) + np.eye(n_assets) * 0.01
+    log_returns = rng.normal(3e-4, 1, (len(dates), n_assets)) @ mixing.T
+    histories = {f"A{k:02d}": pd.DataFrame({'Close': 100 * np.exp(np.cumsum(log_returns[:, k]))}, index=dates)
+                 for k in range(n_assets)}
+    weights = {symbol: 1.0 for symbol in histories}
+
+    started = time.perf_counter()
+    payload = portfolio_forecast(histories, weights, years=years, n_paths=n_paths, seed=1)
+    elapsed = time.perf_counter() - started
+    print(f"{n_assets} assets x {n_paths} paths x {years} years: {elapsed * 1000:.0f} ms")
+    print("stats:", {k: round(v, 2) for k, v in payload['stats'].items()})
+    print("risk 1y:", {k: round(v, 2) for k, v in payload['risk']['1y'].items()})
+
+    # The simulated daily covariance should reproduce the estimate it was drawn from
+    _, closes = align_closes(histories)
+    drift, covariance = estimate_return_moments(closes)
+    factor = cholesky_factor(covariance)
+    draws = np.random.default_rng(2).standard_normal((200000, n_assets), dtype=np.float32) @ factor.T
+    print(f"max |simulated - estimated| covariance: {np.max(np.abs(np.cov(draws, rowvar=False) - covariance)):.1e} "
+          f"(entries up to {np.max(np.abs(covariance)):.1e})")
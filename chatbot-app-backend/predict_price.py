@@ -1,34 +1,33 @@
-from tensorflow.keras.models import load_model
 import pandas as pd
 import numpy as np
-import yfinance as yf
+from numpy.lib.stride_tricks import sliding_window_view
 from sklearn.preprocessing import MinMaxScaler
 from datetime import datetime, timedelta
 import pytz
 import plotly.graph_objs as go
 import plotly.io as pio
+from numpy_lstm import load_stock_model
+from market_data import MarketDataStore
+from forecast_engine import TRADING_DAYS_PER_YEAR, daily_noise, iter_rollout
+from downsample import DEFAULT_CHART_POINTS, lttb_indices
+from forecast_postprocess import add_market_cycles
 
-loaded_model = load_model('Share_Prediction.h5')
+loaded_model = load_stock_model('Share_Prediction.h5')
 loaded_model.summary()
+market_store = MarketDataStore()
 
 def prepare_data(stock_data, lookback_period=60):
     scaler = MinMaxScaler(feature_range=(0, 1))
     scaled_data = scaler.fit_transform(stock_data['Close'].values.reshape(-1, 1))
     
-    X_test = []
-    for i in range(lookback_period, len(scaled_data)):
-        X_test.append(scaled_data[i-lookback_period:i, 0])
-    
-    X_test = np.array(X_test)
-    X_test = np.reshape(X_test, (X_test.shape[0], X_test.shape[1], 1))
+    # Zero-copy view: window i is scaled_data[i:i+lookback_period], same windows as before
+    X_test = sliding_window_view(scaled_data[:-1, 0], lookback_period)[..., np.newaxis]
     
     return X_test, scaler
 
 def get_stock_data(symbol, start_date, end_date):
     try:
-        ticker = yf.Ticker(symbol)
-        data = ticker.history(start=start_date, end=end_date)
-        return data
+        return market_store.get_history(symbol, start_date, end_date)
     except Exception as e:
         print(f"Error fetching data: {e}")
         return None
@@ -38,104 +37,41 @@ def predict_stock_price(model, X_test, scaler):
     predictions = scaler.inverse_transform(predictions)
     return predictions
 
-def add_realistic_volatility(predictions, stock_data, volatility_factor=1.0):
-    """
-    Add realistic volatility to predictions based on historical data
-    """
-    historical_returns = np.diff(np.log(stock_data['Close'].values))
-    historical_volatility = np.std(historical_returns)
-    
-    np.random.seed(42)  
-    random_returns = np.random.normal(0, historical_volatility * volatility_factor, len(predictions))
-    
-
-    realistic_predictions = predictions.copy()
-    for i in range(1, len(predictions)):
-        noise = random_returns[i] * realistic_predictions[i-1]
-        realistic_predictions[i] = realistic_predictions[i] + noise
-        
-        realistic_predictions[i] = max(realistic_predictions[i], realistic_predictions[i-1] * 0.5)
-    
-    return realistic_predictions
-
-def add_market_cycles(predictions, years=10, cycle_strength=0.15):
-    """
-    Add market cycles to make predictions more realistic
-    """
-    trading_days_per_year = 252
-    total_days = len(predictions)
-    
-    cycle_length = np.random.randint(3*252, 7*252)  
-    cycle_phase = np.linspace(0, 2 * np.pi * (total_days / cycle_length), total_days)
-    
-    economic_cycle = np.sin(cycle_phase) * cycle_strength
-    
-  
-    short_cycle = np.sin(cycle_phase * 4) * (cycle_strength * 0.3)
-    
-    cyclic_predictions = predictions.copy()
-    for i in range(len(predictions)):
-        cycle_effect = 1 + economic_cycle[i] + short_cycle[i]
-        cyclic_predictions[i] = predictions[i] * cycle_effect
-    
-    return cyclic_predictions
-
-
-def predict_future_years_realistic(model, stock_data, scaler, years=10, lookback_period=60):
+def predict_future_years_realistic(model, stock_data, scaler, years=10, lookback_period=60, stateful=False):
     """
     Predict stock prices for the next X years with realistic volatility
     """
-    last_sequence = stock_data['Close'].values[-lookback_period:]
-    last_sequence_scaled = scaler.transform(last_sequence.reshape(-1, 1))
+    closes = stock_data['Close'].values
+    last_sequence_scaled = scaler.transform(closes[-lookback_period:].reshape(-1, 1))
     
-    trading_days_per_year = 252
-    total_days = years * trading_days_per_year
+    total_days = years * TRADING_DAYS_PER_YEAR
     
     last_date = stock_data.index[-1]
     future_dates = pd.bdate_range(start=last_date + timedelta(days=1), periods=total_days)
     
-    predictions = []
-    current_sequence = last_sequence_scaled.flatten()
-    
     print(f"Predicting {total_days} trading days ({years} years) into the future...")
     
-    historical_returns = np.diff(np.log(stock_data['Close'].values[-252:]))  # Last year's data
+    historical_returns = np.diff(np.log(closes[-252:]))  # Last year's data
     daily_volatility = np.std(historical_returns)
     
-    for i in range(total_days):
-        input_sequence = current_sequence[-lookback_period:].reshape(1, lookback_period, 1)
-        
-        next_pred_scaled = model.predict(input_sequence, verbose=0)
-        next_pred = scaler.inverse_transform(next_pred_scaled)[0][0]
-        
-        if i > 0:
-            random_return = np.random.normal(0, daily_volatility)
-            volatility_adjustment = next_pred * random_return
-            next_pred = next_pred + volatility_adjustment
-            
-            prev_price = predictions[-1] if predictions else stock_data['Close'].iloc[-1]
-            max_change = prev_price * 0.2  
-            next_pred = np.clip(next_pred, prev_price - max_change, prev_price + max_change)
-            next_pred = max(next_pred, prev_price * 0.5)  
-        
-        predictions.append(next_pred)
-        
-        
-        next_pred_scaled = scaler.transform([[next_pred]])[0][0]
-        current_sequence = np.append(current_sequence, next_pred_scaled)
-        
-        if (i + 1) % 252 == 0:
-            print(f"Completed year {(i + 1) // 252} prediction...")
-    
-    predictions = np.array(predictions)
+    noise = daily_noise(daily_volatility, total_days)
+    predictions = np.empty(total_days)
+    for start, chunk in iter_rollout(
+        model, last_sequence_scaled.reshape(1, -1),
+        scaler.scale_, scaler.min_, closes[-1:], noise, stateful=stateful
+    ):
+        predictions[start:start + chunk.shape[1]] = chunk[0]
+        if (start + chunk.shape[1]) % TRADING_DAYS_PER_YEAR == 0:
+            print(f"Completed year {(start + chunk.shape[1]) // TRADING_DAYS_PER_YEAR} prediction...")
     
     predictions = add_market_cycles(predictions, years)
     
     return future_dates, predictions
 
-def plot_historical_and_future_realistic(stock_data, future_dates, future_predictions, symbol, years=10):
+def plot_historical_and_future_realistic(stock_data, future_dates, future_predictions, symbol, years=10, max_points=None):
     """
-    Plot historical data along with realistic future predictions
+    Plot historical data along with realistic future predictions.
+    max_points thins each trace with LTTB; the summary stats always use every day.
     """
     historical_cutoff = datetime.now() - timedelta(days=730)
     if stock_data.index.tz is not None:
@@ -154,6 +90,14 @@ def plot_historical_and_future_realistic(stock_data, future_dates, future_predic
     annualized_return = (((final_predicted_price / current_price) ** (1/years)) - 1) * 100
     pred_volatility = np.std(np.diff(future_predictions) / future_predictions[:-1]) * np.sqrt(252) * 100
 
+    if max_points:
+        historical_rows = lttb_indices(historical_prices, max_points)
+        historical_dates, historical_prices = historical_dates[historical_rows], historical_prices[historical_rows]
+        future_rows = lttb_indices(future_predictions, max_points)
+        future_dates = pd.DatetimeIndex(future_dates)[future_rows]
+        future_predictions = np.asarray(future_predictions)[future_rows]
+        upper_band, lower_band = upper_band[future_rows], lower_band[future_rows]
+
     traces = []
     traces.append(go.Scatter(
         x=historical_dates,
@@ -264,12 +208,13 @@ def analyze_yearly_predictions(future_dates, future_predictions, current_price,
     
     return yearly_analysis
 
-def get_prediction_plot_json(stock_data, future_dates, future_predictions, symbol, years=10):
+def get_prediction_plot_json(stock_data, future_dates, future_predictions, symbol, years=10,
+                             max_points=DEFAULT_CHART_POINTS):
     """
-    Returns Plotly figure as JSON for frontend rendering
+    Returns Plotly figure as JSON for frontend rendering, with each trace downsampled to max_points
     """
     fig, current_price, final_predicted_price, total_return, annualized_return = plot_historical_and_future_realistic(
-        stock_data, future_dates, future_predictions, symbol, years
+        stock_data, future_dates, future_predictions, symbol, years, max_points
     )
     fig_json = pio.to_json(fig)
     return {
@@ -286,6 +231,8 @@ if __name__ == "__main__":
     START_DATE = (current_date - timedelta(days=3*365 + 120)).strftime("%Y-%m-%d")
     END_DATE = current_date.strftime("%Y-%m-%d")
     LOOKBACK_PERIOD = 60
+    # Long horizons step the LSTM state forward instead of re-running every 60-day window
+    STATEFUL_ROLLOUT = hasattr(loaded_model, 'step')
     
     print(f"Fetching historical data for {STOCK_SYMBOL} from {START_DATE} to {END_DATE}...")
     stock_data = get_stock_data(STOCK_SYMBOL, START_DATE, END_DATE)
@@ -303,7 +250,7 @@ if __name__ == "__main__":
         
         print(f"\nPredicting realistic stock prices for the next {PREDICTION_YEARS} years...")
         future_dates, future_predictions = predict_future_years_realistic(
-            loaded_model, stock_data, scaler, PREDICTION_YEARS, LOOKBACK_PERIOD
+            loaded_model, stock_data, scaler, PREDICTION_YEARS, LOOKBACK_PERIOD, STATEFUL_ROLLOUT
         )
         
         print("\nGenerating realistic prediction chart...")
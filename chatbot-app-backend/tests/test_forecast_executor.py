@@ -0,0 +1,30 @@
+"""Admission accounting of the forecast executor when callers stop waiting"""
+
+import asyncio
+import threading
+
+from forecast_executor import ForecastExecutor
+
+
+def test_cancelled_wait_keeps_running_job_counted():
+    release = threading.Event()
+
+    async def scenario():
+        executor = ForecastExecutor(max_workers=1, max_queue=1)
+        running = asyncio.ensure_future(executor.run(release.wait, 5))
+        queued = asyncio.ensure_future(executor.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        running.cancel()
+        queued.cancel()
+        await asyncio.sleep(0.05)
+        # The started job still occupies its worker; the queued one was cancelled before it ran
+        during = executor.stats()
+        release.set()
+        await asyncio.sleep(0.05)
+        after = executor.stats()
+        executor.shutdown(wait=True)
+        return during, after
+
+    during, after = asyncio.run(scenario())
+    assert (during['running'], during['queued']) == (1, 0)
+    assert (after['running'], after['queued']) == (0, 0)
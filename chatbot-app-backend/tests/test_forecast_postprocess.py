@@ -0,0 +1,63 @@
+"""Array-wide post-processing kernels against element-by-element references"""
+
+import numpy as np
+import pytest
+
+from forecast_engine import apply_daily_noise
+from forecast_postprocess import (
+    MAX_DAILY_CHANGE, MIN_DAILY_RATIO, TRADING_DAYS_PER_YEAR, add_market_cycles, apply_drawdown_floor,
+    clip_daily_returns
+)
+
+
+@pytest.fixture
+def paths():
+    rng = np.random.default_rng(0)
+    # Daily moves wide enough that the clip and the running-peak floor both bind
+    return 150 * np.exp(np.cumsum(rng.normal(0, 0.12, (8, 300)), axis=1))
+
+
+def test_market_cycles_match_loop():
+    path = np.linspace(100, 200, 2 * TRADING_DAYS_PER_YEAR)
+    np.random.seed(7)
+    cycle_length = np.random.randint(3 * TRADING_DAYS_PER_YEAR, 7 * TRADING_DAYS_PER_YEAR)
+    cycle_phase = np.linspace(0, 2 * np.pi * (len(path) / cycle_length), len(path))
+    expected = [p * (1 + np.sin(phase) * 0.15 + np.sin(phase * 4) * 0.045) for p, phase in zip(path, cycle_phase)]
+
+    np.random.seed(7)
+    np.testing.assert_allclose(add_market_cycles(path), expected, rtol=1e-15)
+
+
+def test_market_cycles_per_path_shape(paths):
+    cycled = add_market_cycles(paths, rng=np.random.default_rng(1))
+    assert cycled.shape == paths.shape
+    assert not np.allclose(cycled[0] / paths[0], cycled[1] / paths[1])
+
+
+def test_clip_daily_returns_matches_loop(paths):
+    proposed = paths[:, 1:] * np.exp(np.random.default_rng(2).normal(0, 0.3, paths[:, 1:].shape))
+    prev = paths[:, :-1]
+    expected = np.empty_like(proposed)
+    for index in np.ndindex(proposed.shape):
+        low, high = prev[index] - prev[index] * MAX_DAILY_CHANGE, prev[index] + prev[index] * MAX_DAILY_CHANGE
+        expected[index] = max(min(max(proposed[index], low), high), prev[index] * MIN_DAILY_RATIO)
+
+    clipped = clip_daily_returns(proposed, prev)
+    assert np.array_equal(clipped, expected)
+    assert np.any(clipped != proposed)
+    # The rollout's daily step is the same kernel, one day at a time
+    assert np.array_equal(apply_daily_noise(proposed[:, 5], prev[:, 5], 0.0), clipped[:, 5])
+
+
+def test_running_peak_floor_matches_loop(paths):
+    expected = paths.copy()
+    for k in range(paths.shape[0]):
+        peak = -np.inf
+        for i in range(paths.shape[1]):
+            peak = max(peak, paths[k, i])
+            expected[k, i] = max(paths[k, i], peak * MIN_DAILY_RATIO)
+
+    floored = apply_drawdown_floor(paths)
+    assert np.array_equal(floored, expected)
+    assert np.any(floored != paths)
+    assert np.array_equal(apply_drawdown_floor(paths[0]), floored[0])
@@ -0,0 +1,78 @@
+"""ForecastState.advance against a full re-roll from the extended history"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast_engine import daily_noise, iter_rollout
+from forecast_payload import prepare_data
+from forecast_state import REBASE_TOLERANCE, ForecastState
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                          'Share_Prediction.h5')
+LOOKBACK = 60
+
+pytestmark = pytest.mark.skipif(not os.path.exists(MODEL_PATH), reason="Share_Prediction.h5 not found")
+
+
+@pytest.fixture(scope="module")
+def model():
+    from numpy_lstm import load_model
+    return load_model(MODEL_PATH)
+
+
+@pytest.fixture(scope="module")
+def history():
+    # A steady last trading year gives a near-zero volatility, so the rolled path is essentially
+    # the model's own; the earlier decline keeps the scaler range fixed when a bar is added
+    closes = np.concatenate([np.linspace(300, 100, 400), 100 * 1.0005 ** np.arange(1, 301)])
+    return pd.DataFrame({'Close': closes}, index=pd.bdate_range('2023-01-02', periods=len(closes)))
+
+
+def advanced_and_rerolled(model, history, stateful, surprise):
+    """
+    The state advanced by one bar that closes at surprise x its forecast, and the rollout a full
+    re-roll from the extended history makes with the same noise draws for the same days
+    """
+    state = ForecastState.roll(model, history, 'TEST', 1, 'v1', stateful=stateful, rng=np.random.default_rng(0))
+    noise = daily_noise(state.daily_volatility, len(state.path), rng=np.random.default_rng(0))[0]
+    extension_rng = np.random.default_rng()
+    extension_rng.bit_generator.state = state.rng_state
+
+    new_bar = pd.DataFrame({'Close': [state.path[0] * surprise]}, index=[history.index[-1] + pd.offsets.BDay()])
+    extended = pd.concat([history, new_bar])
+    assert state.can_advance(extended, 'v1') is None
+    assert state.advance(model, extended) == 1
+
+    scaler = prepare_data(extended)
+    closes = extended['Close'].values
+    window = scaler.transform(closes[-LOOKBACK:].reshape(-1, 1)).reshape(1, -1)
+    # Day k after the new bar was day k + 1 of the original rollout; the last day is new
+    rerolled_noise = np.append(noise[1:], extension_rng.normal(0, state.daily_volatility))[np.newaxis]
+    rerolled = np.hstack([prices for _, prices in iter_rollout(model, window, scaler.scale_, scaler.min_,
+                                                               closes[-1:], rerolled_noise, stateful=stateful)])[0]
+    return state, rerolled
+
+
+def test_advance_matches_reroll_when_the_close_is_on_forecast(model, history):
+    state, rerolled = advanced_and_rerolled(model, history, stateful=False, surprise=1.0)
+    assert state.advances == 1
+    np.testing.assert_allclose(state.path, rerolled, rtol=1e-12)
+
+
+def test_stateful_advance_matches_reroll_when_the_close_is_on_forecast(model, history):
+    # The carried LSTM state saw the rolled path instead of a fresh 60-day warm-up
+    state, rerolled = advanced_and_rerolled(model, history, stateful=True, surprise=1.0)
+    np.testing.assert_allclose(state.path, rerolled, rtol=1e-5)
+
+
+@pytest.mark.parametrize("stateful", [False, True])
+@pytest.mark.parametrize("surprise", [1.01, 1.03, 1 - REBASE_TOLERANCE / 2])
+def test_rescaled_advance_stays_within_the_surprise(model, history, stateful, surprise):
+    # The rescaled suffix is an approximation of the re-roll: off by less than the close's surprise
+    state, rerolled = advanced_and_rerolled(model, history, stateful, surprise)
+    gap = np.abs(state.path / rerolled - 1)
+    assert gap.max() < abs(surprise - 1)
+    assert gap.max() > 0
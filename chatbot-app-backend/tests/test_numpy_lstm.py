@@ -0,0 +1,66 @@
+"""Parity of the NumPy LSTM engine with Keras on the shipped share prediction model"""
+
+import os
+
+import numpy as np
+import pytest
+
+from numpy_lstm import check_keras_parity, load_model
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                          'Share_Prediction.h5')
+LOOKBACK = 60
+# float32 LSTM arithmetic in a different order than Keras; observed max error is about 2.4e-7
+ATOL = 1e-5
+
+pytestmark = pytest.mark.skipif(not os.path.exists(MODEL_PATH), reason="Share_Prediction.h5 not found")
+
+
+@pytest.fixture(scope="module")
+def numpy_model():
+    return load_model(MODEL_PATH)
+
+
+@pytest.fixture(scope="module")
+def keras_model():
+    keras = pytest.importorskip("tensorflow.keras.models")
+    return keras.load_model(MODEL_PATH)
+
+
+def seeded_windows(seed, n_samples=64):
+    rng = np.random.default_rng(seed)
+    uniform = rng.uniform(0, 1, size=(n_samples, LOOKBACK, 1))
+    walk = np.cumsum(rng.normal(0, 0.02, size=(n_samples, LOOKBACK)), axis=1)
+    walk = (walk - walk.min(axis=1, keepdims=True)) / np.ptp(walk, axis=1, keepdims=True)
+    return np.concatenate([uniform, walk[..., np.newaxis]]).astype(np.float32)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_predict_matches_keras(numpy_model, keras_model, seed):
+    windows = seeded_windows(seed)
+    expected = keras_model.predict(windows, verbose=0)
+    actual = numpy_model.predict(windows)
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=ATOL)
+
+
+def test_batched_predict_matches_keras(numpy_model, keras_model):
+    windows = seeded_windows(3, n_samples=50)
+    np.testing.assert_allclose(numpy_model.predict(windows, batch_size=16),
+                               keras_model.predict(windows, verbose=0), rtol=0, atol=ATOL)
+
+
+def test_check_keras_parity_passes():
+    pytest.importorskip("tensorflow")
+    report = check_keras_parity(MODEL_PATH, n_samples=32, atol=ATOL)
+    assert report['passed'], report
+
+
+def test_step_continues_full_window(numpy_model):
+    # Stepping one point past a window equals running the longer window from scratch
+    windows = seeded_windows(4, n_samples=8)
+    extra = np.random.default_rng(5).uniform(0, 1, size=(len(windows), 1, 1)).astype(np.float32)
+    _, states = numpy_model.initial_state(windows)
+    stepped, _ = numpy_model.step(extra[:, 0, 0], states)
+    full = numpy_model.predict(np.concatenate([windows, extra], axis=1))
+    np.testing.assert_allclose(stepped, full, rtol=0, atol=1e-6)
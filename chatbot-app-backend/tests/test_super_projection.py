@@ -0,0 +1,78 @@
+"""Array projection formulas against the scalar ones they replaced in model.py"""
+
+import numpy as np
+import pytest
+
+from super_projection import (
+    EMPLOYER_CONTRIBUTION_RATE, REPLACEMENT_TARGETS, WITHDRAWAL_RATE, contribution_gaps, future_value, trajectories
+)
+
+RTOL = 1e-12
+RATES = [0.0, 0.03, 0.07, -0.02]
+YEARS = [1, 7, 30, 12.5, 0.4]
+
+
+def baseline_future_value(pv, pmt, rate, years):
+    """SuperannuationPredictor._future_value_with_payments before vectorization"""
+    if rate == 0:
+        return pv + (pmt * years)
+    fv_pv = pv * ((1 + rate) ** years)
+    fv_pmt = pmt * (((1 + rate) ** years - 1) / rate)
+    return fv_pv + fv_pmt
+
+
+def baseline_contribution_gap(balance, annual_income, rate, years, target_pct):
+    """One target of SuperannuationPredictor._analyze_contributions before vectorization"""
+    required_balance = annual_income * target_pct / WITHDRAWAL_RATE
+    employer_contribution = annual_income * EMPLOYER_CONTRIBUTION_RATE
+    fv_current = balance * ((1 + rate) ** years)
+    fv_employer = employer_contribution * (((1 + rate) ** years - 1) / rate) if rate > 0 else employer_contribution * years
+    shortfall = required_balance - fv_current - fv_employer
+    additional = shortfall * rate / ((1 + rate) ** years - 1) if shortfall > 0 and rate > 0 else 0
+    return fv_current + fv_employer, max(0, shortfall), max(0, additional)
+
+
+@pytest.mark.parametrize("rate", RATES)
+@pytest.mark.parametrize("years", YEARS)
+def test_future_value_matches_scalar(rate, years):
+    pv = np.array([0.0, 50000.0, 420000.0])
+    pmt = np.array([7700.0, 0.0, 15000.0])
+    expected = [baseline_future_value(p, m, rate, years) for p, m in zip(pv, pmt)]
+    np.testing.assert_allclose(future_value(pv, pmt, np.full(3, rate), np.full(3, years)), expected, rtol=RTOL)
+
+
+def test_contribution_gaps_match_scalar():
+    members = [(b, i, y) for b in (0.0, 80000.0, 900000.0) for i in (0.0, 45000.0, 160000.0) for y in YEARS]
+    balance, income, years = (np.array(column) for column in zip(*members))
+    rates = np.tile(RATES, (len(members), 1))
+
+    gaps = contribution_gaps(balance, income, rates, years)
+    for m, (b, i, y) in enumerate(members):
+        for s, rate in enumerate(RATES):
+            for t, target_pct in enumerate(REPLACEMENT_TARGETS):
+                projected, shortfall, additional = baseline_contribution_gap(b, i, rate, y, target_pct)
+                np.testing.assert_allclose(gaps['projected_balance_current_path'][m, s], projected, rtol=RTOL)
+                np.testing.assert_allclose(gaps['shortfall'][m, s, t], shortfall, rtol=RTOL, atol=1e-6)
+                np.testing.assert_allclose(gaps['additional_annual_contribution_needed'][m, s, t], additional,
+                                           rtol=RTOL, atol=1e-9)
+            np.testing.assert_allclose(gaps['required_balance'][m], i * np.array(REPLACEMENT_TARGETS) / WITHDRAWAL_RATE)
+
+
+def test_trajectories_match_scalar_with_fractional_years():
+    balance = np.array([50000.0, 120000.0, 0.0, 300000.0])
+    contribution = np.array([7700.0, 11000.0, 5000.0, 0.0])
+    years = np.array([3, 12.5, 0.4, 7.25])
+    rates = np.array([[0.042, 0.07, 0.098], [0.0, 0.05, 0.07], [0.03, 0.0, -0.02], [0.06, 0.06, 0.06]])
+
+    paths = trajectories(balance, contribution, rates, years)
+    horizon = int(np.ceil(years.max()))
+    assert paths.shape == (4, 3, horizon + 1)
+    for m in range(len(balance)):
+        for s in range(rates.shape[1]):
+            # Year by year up to the horizon; past a fractional horizon the exact final balance is held
+            expected = [baseline_future_value(balance[m], contribution[m], rates[m, s], min(t, years[m]))
+                        for t in range(horizon + 1)]
+            np.testing.assert_allclose(paths[m, s], expected, rtol=RTOL)
+            np.testing.assert_allclose(paths[m, s, int(np.ceil(years[m]))],
+                                       baseline_future_value(balance[m], contribution[m], rates[m, s], years[m]),
+                                       rtol=RTOL)
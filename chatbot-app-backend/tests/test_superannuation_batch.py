@@ -0,0 +1,188 @@
+"""SuperannuationPredictor.predict_many against one call per member and the original scalar formulas"""
+
+import os
+
+import numpy as np
+import pytest
+
+from model import COMPILED_TREE_MAX_ROWS, SuperannuationPredictor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RTOL = 1e-9
+
+# The scaler was fitted on a DataFrame; predictions pass plain arrays, as the API does
+pytestmark = pytest.mark.filterwarnings("ignore:X does not have valid feature names")
+
+ALLOCATIONS = [
+    {'Australian Shares': 40, 'International Shares': 30, 'Australian Bonds': 20, 'Cash': 10},
+    {'Australian Bonds': 50, 'International Bonds': 30, 'Cash': 20},
+    {'Property/REITs': 60, 'International Shares': 40},
+    {},
+]
+
+
+def member_profiles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    profiles = []
+    for i in range(n):
+        age = int(rng.integers(20, 64))
+        profiles.append({
+            'age': age,
+            'retirement_age_goal': int(rng.integers(age - 2, 71)),   # a few are already past it
+            'annual_income': float(rng.integers(0, 250000)),
+            'current_savings': float(rng.integers(0, 900000)),
+            'dependents': int(rng.integers(0, 4)),
+            'gender': ['Male', 'Female', 'Other', 'Unknown'][i % 4],
+            'risk_tolerance': ['Low', 'Medium', 'High'][i % 3],
+        })
+    # Missing fields take the defaults
+    profiles[0] = {}
+    return profiles, [ALLOCATIONS[i % len(ALLOCATIONS)] for i in range(n)]
+
+
+# The per-member formulas predict_future_value / _fallback_predictions used before batching
+
+def baseline_future_value(pv, pmt, rate, years):
+    if rate == 0:
+        return pv + (pmt * years)
+    return pv * ((1 + rate) ** years) + pmt * (((1 + rate) ** years - 1) / rate)
+
+
+def baseline_scenarios(current_balance, annual_income, expected_return, years):
+    scenarios = {}
+    for scenario, multiplier in [('pessimistic', 0.6), ('expected', 1.0), ('optimistic', 1.4)]:
+        fv = baseline_future_value(current_balance, annual_income * 0.11, expected_return * multiplier, years)
+        scenarios[scenario] = {'final_balance': fv, 'annual_retirement_income': fv * 0.04,
+                               'return_assumption': expected_return * multiplier}
+    return scenarios
+
+
+def baseline_contributions(current_balance, annual_income, expected_return, years):
+    analysis = {}
+    for target_pct in [0.6, 0.7, 0.8]:
+        target_income = annual_income * target_pct
+        required_balance = target_income / 0.04
+        employer_contribution = annual_income * 0.11
+        fv_current = current_balance * ((1 + expected_return) ** years)
+        if expected_return > 0:
+            fv_employer = employer_contribution * (((1 + expected_return) ** years - 1) / expected_return)
+        else:
+            fv_employer = employer_contribution * years
+        shortfall = required_balance - fv_current - fv_employer
+        if shortfall > 0 and expected_return > 0:
+            additional = shortfall * expected_return / ((1 + expected_return) ** years - 1)
+        else:
+            additional = 0
+        analysis[f"{int(target_pct * 100)}%_replacement"] = {
+            'target_retirement_income': target_income,
+            'required_balance': required_balance,
+            'projected_balance_current_path': fv_current + fv_employer,
+            'shortfall': max(0, shortfall),
+            'additional_annual_contribution_needed': max(0, additional),
+            'additional_monthly_contribution_needed': max(0, additional / 12),
+        }
+    return analysis
+
+
+def member_inputs(profile):
+    age = profile.get('age', 35)
+    return (profile.get('current_savings', 50000), profile.get('annual_income', 70000),
+            max(1, profile.get('retirement_age_goal', 65) - age))
+
+
+def assert_close(actual, expected, path='result'):
+    """actual matches expected on every key expected has; batch results may carry extra keys"""
+    if isinstance(expected, dict):
+        for key, value in expected.items():
+            assert key in actual, f"{path}.{key} missing"
+            assert_close(actual[key], value, f"{path}.{key}")
+    elif isinstance(expected, str):
+        assert actual == expected, path
+    else:
+        np.testing.assert_allclose(actual, expected, rtol=RTOL, atol=1e-6, err_msg=path)
+
+
+def without_timestamp(result):
+    return {key: value for key, value in result.items() if key != 'generated_at'}
+
+
+@pytest.fixture(scope="module")
+def trained():
+    if not os.path.exists(os.path.join(BACKEND_DIR, 'models', 'pension_model.joblib')):
+        pytest.skip("trained superannuation models not found")
+    cwd = os.getcwd()
+    os.chdir(BACKEND_DIR)   # load_models reads models/ relative to the working directory
+    try:
+        predictor = SuperannuationPredictor()
+        assert predictor.load_models() and predictor.is_trained
+    finally:
+        os.chdir(cwd)
+    return predictor
+
+
+@pytest.mark.parametrize("n", [40, COMPILED_TREE_MAX_ROWS + 60])
+def test_batch_matches_single_calls(trained, n):
+    # Above COMPILED_TREE_MAX_ROWS the batch goes through sklearn, single rows through the compiled trees
+    profiles, allocations = member_profiles(n)
+    batch = trained.predict_many(profiles, allocations)
+    singles = [trained.predict_future_value(p, a) for p, a in zip(profiles, allocations)]
+    assert len(batch) == n
+    for i, (actual, expected) in enumerate(zip(batch, singles)):
+        assert_close(without_timestamp(actual), without_timestamp(expected), f"member {i}")
+
+
+def test_batch_matches_scalar_formulas(trained):
+    profiles, allocations = member_profiles(40, seed=1)
+    features = trained.scaler.transform(trained._features_matrix(profiles, allocations))
+    pensions = trained.pension_model.predict(features)
+    returns = trained.return_model.predict(features)
+
+    for i, (result, profile) in enumerate(zip(trained.predict_many(profiles, allocations), profiles)):
+        current_balance, annual_income, years = member_inputs(profile)
+        assert_close(result['predictions'], {
+            'projected_final_balance': max(0, pensions[i]),
+            'expected_annual_return': max(0, min(0.15, returns[i])),
+            'years_to_retirement': years,
+        }, f"member {i} predictions")
+        assert_close(result['scenarios'], baseline_scenarios(current_balance, annual_income, returns[i], years),
+                     f"member {i} scenarios")
+        assert_close(result['contribution_analysis'],
+                     baseline_contributions(current_balance, annual_income, returns[i], years),
+                     f"member {i} contribution_analysis")
+
+
+def test_fallback_batch_matches_scalar_formulas():
+    profiles, allocations = member_profiles(30, seed=2)
+    predictor = SuperannuationPredictor()   # untrained: every member takes the fallback
+    batch = predictor.predict_many(profiles, allocations)
+    singles = [predictor._fallback_predictions(p, a) for p, a in zip(profiles, allocations)]
+
+    for i, (actual, single, profile) in enumerate(zip(batch, singles, profiles)):
+        current_balance, annual_income, years = member_inputs(profile)
+        final_balance = baseline_future_value(current_balance, annual_income * 0.11, 0.07, years)
+        expected = {
+            'predictions': {'projected_final_balance': final_balance, 'expected_annual_return': 0.07,
+                            'years_to_retirement': years},
+            'scenarios': {
+                name: {'final_balance': final_balance * factor,
+                       'annual_retirement_income': final_balance * factor * 0.04,
+                       'return_assumption': 0.07 * factor}
+                for name, factor in [('pessimistic', 0.7), ('expected', 1.0), ('optimistic', 1.3)]
+            },
+            'contribution_analysis': baseline_contributions(current_balance, annual_income, 0.07, years),
+            'model_confidence': {'confidence_level': 'Medium (Fallback)'},
+        }
+        assert_close(actual, expected, f"member {i}")
+        assert_close(without_timestamp(single), expected, f"single {i}")
+
+
+def test_bad_profile_falls_back_alone(trained):
+    profiles, allocations = member_profiles(6, seed=3)
+    profiles[2] = dict(profiles[2], dependents='two')   # cannot be turned into features
+    batch = trained.predict_many(profiles, allocations)
+
+    assert batch[2]['model_confidence']['confidence_level'] == 'Medium (Fallback)'
+    assert_close(without_timestamp(batch[2]), without_timestamp(trained.predict_future_value(profiles[2], allocations[2])))
+    for i in (0, 1, 3, 4, 5):
+        assert batch[i]['model_confidence']['confidence_level'] != 'Medium (Fallback)'
+        assert_close(without_timestamp(batch[i]), without_timestamp(trained.predict_future_value(profiles[i], allocations[i])))
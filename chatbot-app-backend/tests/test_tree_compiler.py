@@ -0,0 +1,56 @@
+"""Parity of the compiled tree ensemble evaluator with sklearn's predict()"""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+
+from tree_compiler import compile_ensemble
+
+
+@pytest.fixture(scope="module")
+def training_data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 5))
+    y = 3 * X[:, 0] - 2 * X[:, 1] ** 2 + np.sin(X[:, 2]) + rng.normal(0, 0.1, 400) + 10
+    return X, y
+
+
+@pytest.fixture(scope="module")
+def models(training_data):
+    X, y = training_data
+    return {
+        'gbr_constant_init': GradientBoostingRegressor(n_estimators=40, max_depth=3, random_state=0).fit(X, y),
+        'gbr_zero_init': GradientBoostingRegressor(n_estimators=40, max_depth=3, init='zero', random_state=0).fit(X, y),
+        'forest': RandomForestRegressor(n_estimators=20, max_depth=6, random_state=0).fit(X, y),
+    }
+
+
+def evaluation_rows(compiled, n_features):
+    """Random rows, then one row per split that sits exactly on that split's threshold"""
+    rng = np.random.default_rng(1)
+    X = rng.normal(0, 1.5, (300, n_features))
+    splits = np.flatnonzero(np.isfinite(compiled.threshold))
+    on_split = rng.normal(0, 1.5, (len(splits), n_features))
+    on_split[np.arange(len(splits)), compiled.feature[splits]] = compiled.threshold[splits]
+    return np.vstack([X, on_split])
+
+
+@pytest.mark.parametrize("name", ['gbr_constant_init', 'gbr_zero_init', 'forest'])
+def test_compiled_matches_sklearn(training_data, models, name):
+    model = models[name]
+    compiled = compile_ensemble(model)
+    X = evaluation_rows(compiled, training_data[0].shape[1])
+
+    np.testing.assert_allclose(compiled.predict(X), model.predict(X), rtol=1e-12, atol=1e-12)
+    # A single (features,) row gives a scalar
+    single = compiled.predict(X[-1])
+    assert np.ndim(single) == 0
+    np.testing.assert_allclose(single, model.predict(X[-1:])[0], rtol=1e-12, atol=1e-12)
+
+
+def test_rejects_unsupported_models(training_data):
+    X, y = training_data
+    with pytest.raises(TypeError):
+        compile_ensemble(object())
+    with pytest.raises(ValueError):
+        compile_ensemble(RandomForestRegressor(n_estimators=2, random_state=0).fit(X, np.column_stack([y, y])))
@@ -0,0 +1,255 @@
+"""
+Share model training module:
+- builds (60-day window -> next close) samples for many symbols from the local market data
+  store, each symbol min-max scaled on its own training range like prepare_data() does at inference
+- feeds them through tf.data: one flat series, window start indices batched and gathered by a
+  parallel map, the validation set cached, everything prefetched
+- trains the Share_Prediction architecture on CPU with configurable intra/inter-op threads,
+  warm-starting from the current model by default so a weekly run needs only a few epochs
+- saves each run as <model dir>/<version>/Share_Prediction.h5 plus metrics.json, and only
+  promotes it to the serving path when it beats the current model on the same validation windows
+
+Run weekly, e.g.:  python train_stock_model.py --intra-op-threads 8 --promote
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+import logging
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from forecast_job import DEFAULT_WATCHLIST, MODEL_PATH, load_watchlist
+from market_data import MarketDataStore, CSVProvider, DEFAULT_STORE_DIR
+from numpy_lstm import load_model, model_file_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_DIR = os.getenv(
+    'STOCK_MODEL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'stock')
+)
+TRAINING_HISTORY_YEARS = int(os.getenv('TRAIN_HISTORY_YEARS', '10'))
+MODEL_FILENAME = 'Share_Prediction.h5'
+
+
+def configure_threads(intra_op_threads=None, inter_op_threads=None):
+    """Import TensorFlow with its CPU thread pools sized; must run before any TF op"""
+    import tensorflow as tf
+    if intra_op_threads:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    if inter_op_threads:
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    return tf
+
+
+def load_closes(symbols, store, years=TRAINING_HISTORY_YEARS):
+    """symbol -> float64 closes for the last `years` years; symbols that fail are logged and skipped"""
+    end = datetime.now()
+    start = (end - timedelta(days=365 * years)).strftime("%Y-%m-%d")
+    closes = {}
+    for symbol in symbols:
+        try:
+            data = store.get_history(symbol, start, end.strftime("%Y-%m-%d"))
+        except Exception as e:
+            logger.warning(f"Skipping {symbol}: {e}")
+            continue
+        if not data.empty:
+            closes[symbol] = data['Close'].values.astype(np.float64)
+    return closes
+
+
+def build_windows(closes, lookback_period=60, val_fraction=0.1, stride=1):
+    """
+    Lay every symbol's scaled closes end to end and list where its windows start.
+    The last val_fraction of each symbol's windows (by time) is held out; the scaler only sees
+    the closes the training windows cover. Returns (series, train_starts, val_starts, val_ranges)
+    with val_ranges[i] = (data_min, data_max) of the symbol validation window i belongs to.
+    """
+    series, train_starts, val_starts, val_ranges = [], [], [], []
+    offset = 0
+    for symbol, values in closes.items():
+        n_windows = len(values) - lookback_period
+        n_train = int(n_windows * (1 - val_fraction))
+        if n_train < 1 or n_windows - n_train < 1:
+            logger.warning(f"Skipping {symbol}: {len(values)} closes is too short")
+            continue
+        data_min = values[:n_train + lookback_period].min()
+        data_max = values[:n_train + lookback_period].max()
+        span = data_max - data_min if data_max > data_min else 1.0
+
+        series.append(((values - data_min) / span).astype(np.float32))
+        train_starts.append(offset + np.arange(0, n_train, stride))
+        val_starts.append(offset + np.arange(n_train, n_windows))
+        val_ranges.append(np.tile([data_min, data_min + span], (n_windows - n_train, 1)))
+        offset += len(values)
+
+    if not series:
+        raise ValueError("No symbol has enough history to train on")
+    return (np.concatenate(series), np.concatenate(train_starts).astype(np.int64),
+            np.concatenate(val_starts).astype(np.int64), np.concatenate(val_ranges))
+
+
+def make_window_dataset(tf, series, starts, lookback_period=60, batch_size=256, shuffle=False, seed=None):
+    """
+    Batches of (windows [batch, lookback, 1], next values [batch, 1]). Only start indices flow
+    through the pipeline; each batch is gathered from the series in one vectorized map.
+    Shuffled (training) datasets are reshuffled every epoch; the others are cached.
+    """
+    series = tf.constant(series)
+    offsets = tf.range(lookback_period + 1, dtype=tf.int64)
+
+    def gather(batch_starts):
+        windows = tf.gather(series, batch_starts[:, tf.newaxis] + offsets)
+        return windows[:, :lookback_period, tf.newaxis], windows[:, lookback_period:]
+
+    dataset = tf.data.Dataset.from_tensor_slices(starts)
+    if shuffle:
+        dataset = dataset.shuffle(len(starts), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size).map(gather, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not shuffle)
+    if not shuffle:
+        dataset = dataset.cache()
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def build_model(tf, lookback_period=60, learning_rate=1e-3):
+    """Same layers as the shipped Share_Prediction.h5"""
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(lookback_period, 1)),
+        tf.keras.layers.LSTM(128, return_sequences=True),
+        tf.keras.layers.LSTM(64, return_sequences=False),
+        tf.keras.layers.Dense(25),
+        tf.keras.layers.Dense(1),
+    ])
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate), loss='mean_squared_error')
+    return model
+
+
+def validation_metrics(predict, dataset, val_ranges):
+    """Scaled MSE plus price-space MAE/MAPE, next to the naive 'tomorrow = today' forecast"""
+    predicted, actual, last = [], [], []
+    for windows, targets in dataset:
+        predicted.append(np.asarray(predict(windows.numpy())).reshape(-1))
+        actual.append(targets.numpy().reshape(-1))
+        last.append(windows.numpy()[:, -1, 0])
+    predicted, actual, last = (np.concatenate(v).astype(np.float64) for v in (predicted, actual, last))
+
+    data_min, data_max = val_ranges[:, 0], val_ranges[:, 1]
+    to_price = lambda scaled: scaled * (data_max - data_min) + data_min
+    price_error = to_price(predicted) - to_price(actual)
+    return {
+        'mse_scaled': float(np.mean((predicted - actual) ** 2)),
+        'mae': float(np.mean(np.abs(price_error))),
+        'mape': float(np.mean(np.abs(price_error) / to_price(actual)) * 100),
+        'naive_mae': float(np.mean(np.abs(to_price(last) - to_price(actual)))),
+        'windows': int(len(actual)),
+    }
+
+
+def promote(model_path, target_path):
+    """Copy a trained model over the serving model without a half-written file in between"""
+    tmp_path = target_path + '.tmp'
+    shutil.copyfile(model_path, tmp_path)
+    os.replace(tmp_path, target_path)
+
+
+def train(symbols, store, model_dir=DEFAULT_MODEL_DIR, init_from=MODEL_PATH, epochs=8, batch_size=256,
+          learning_rate=None, lookback_period=60, val_fraction=0.1, stride=1, patience=2,
+          intra_op_threads=None, inter_op_threads=None, seed=0):
+    """Train one model version; returns (version directory, metrics)"""
+    started = time.perf_counter()
+    tf = configure_threads(intra_op_threads, inter_op_threads)
+    tf.keras.utils.set_random_seed(seed)
+
+    closes = load_closes(symbols, store)
+    series, train_starts, val_starts, val_ranges = build_windows(closes, lookback_period, val_fraction, stride)
+    train_data = make_window_dataset(tf, series, train_starts, lookback_period, batch_size, shuffle=True, seed=seed)
+    val_data = make_window_dataset(tf, series, val_starts, lookback_period, batch_size)
+    logger.info(f"{len(closes)} symbols, {len(train_starts)} training / {len(val_starts)} validation windows")
+
+    warm_start = bool(init_from) and os.path.exists(init_from)
+    if learning_rate is None:
+        learning_rate = 2e-4 if warm_start else 1e-3
+    model = build_model(tf, lookback_period, learning_rate)
+    baseline = None
+    if warm_start:
+        model.load_weights(init_from)
+        baseline = validation_metrics(load_model(init_from).predict, val_data, val_ranges)
+        baseline['model_version'] = model_file_version(init_from)
+
+    history = model.fit(
+        train_data, validation_data=val_data, epochs=epochs, verbose=2,
+        callbacks=[tf.keras.callbacks.EarlyStopping(patience=patience, restore_best_weights=True)]
+    )
+
+    version = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+    version_dir = os.path.join(model_dir, version)
+    os.makedirs(version_dir, exist_ok=True)
+    model_path = os.path.join(version_dir, MODEL_FILENAME)
+    model.save(model_path)
+
+    metrics = {
+        'version': version,
+        'model_version': model_file_version(model_path),
+        'symbols': sorted(closes),
+        'train_windows': int(len(train_starts)),
+        'epochs': len(history.history['loss']),
+        'history': {name: [float(v) for v in values] for name, values in history.history.items()},
+        'validation': validation_metrics(load_model(model_path).predict, val_data, val_ranges),
+        'baseline': baseline,
+        'warm_start': init_from if warm_start else None,
+        'config': {
+            'batch_size': batch_size, 'learning_rate': learning_rate, 'lookback_period': lookback_period,
+            'val_fraction': val_fraction, 'stride': stride, 'seed': seed,
+            'intra_op_threads': tf.config.threading.get_intra_op_parallelism_threads(),
+            'inter_op_threads': tf.config.threading.get_inter_op_parallelism_threads(),
+        },
+        'seconds': time.perf_counter() - started,
+    }
+    with open(os.path.join(version_dir, 'metrics.json'), 'w') as f:
+        json.dump(metrics, f, indent=2)
+    return version_dir, metrics
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    parser = argparse.ArgumentParser(description="Train a new version of the share prediction model")
+    parser.add_argument('symbols', nargs='*', help="Defaults to the watchlist file")
+    parser.add_argument('--watchlist', default=DEFAULT_WATCHLIST)
+    parser.add_argument('--csv-dir', help="Read histories from <SYMBOL>.csv fixtures instead of yfinance")
+    parser.add_argument('--market-dir', default=DEFAULT_STORE_DIR)
+    parser.add_argument('--model-dir', default=DEFAULT_MODEL_DIR)
+    parser.add_argument('--init-from', default=MODEL_PATH, help="Model to warm-start from and compare against")
+    parser.add_argument('--from-scratch', action='store_true', help="Start from random weights")
+    parser.add_argument('--epochs', type=int, default=8)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--learning-rate', type=float)
+    parser.add_argument('--stride', type=int, default=1, help="Use every n-th training window")
+    parser.add_argument('--intra-op-threads', type=int, default=int(os.getenv('TRAIN_INTRA_OP_THREADS', '0')))
+    parser.add_argument('--inter-op-threads', type=int, default=int(os.getenv('TRAIN_INTER_OP_THREADS', '0')))
+    parser.add_argument('--promote', action='store_true', help="Copy the new model to --promote-to if it validates better")
+    parser.add_argument('--promote-to', default=MODEL_PATH)
+    parser.add_argument('--force', action='store_true', help="Promote even if it does not beat the current model")
+    args = parser.parse_args()
+
+    symbols = [s.upper() for s in args.symbols] or load_watchlist(args.watchlist)
+    store = MarketDataStore(args.market_dir, CSVProvider(args.csv_dir) if args.csv_dir else None)
+    version_dir, metrics = train(
+        symbols, store, args.model_dir, None if args.from_scratch else args.init_from, args.epochs,
+        args.batch_size, args.learning_rate, stride=args.stride,
+        intra_op_threads=args.intra_op_threads, inter_op_threads=args.inter_op_threads
+    )
+
+    validation, baseline = metrics['validation'], metrics['baseline']
+    print(f"Saved {version_dir} after {metrics['epochs']} epochs in {metrics['seconds']:.0f}s: "
+          f"val MAE {validation['mae']:.3f} ({validation['mape']:.2f}%), naive {validation['naive_mae']:.3f}"
+          + (f", current model {baseline['mae']:.3f}" if baseline else ""))
+    if args.promote:
+        if baseline and validation['mae'] >= baseline['mae'] and not args.force:
+            print(f"Not promoted: no improvement over {args.init_from}")
+        else:
+            promote(os.path.join(version_dir, MODEL_FILENAME), args.promote_to)
+            print(f"Promoted to {args.promote_to}; restart the API to serve it")
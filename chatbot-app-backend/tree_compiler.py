@@ -0,0 +1,130 @@
+"""
+Tree ensemble compiler module:
+- flattens a fitted GradientBoostingRegressor or RandomForestRegressor into contiguous node
+  arrays (feature, threshold, children, value) shared by every tree, with each tree's root offset
+- evaluates all trees for all rows together, one gather per tree level instead of one sklearn
+  predict() (with its input validation) per estimator
+- leaves point to themselves, so every row descends exactly max_depth levels with no branching
+- predictions match sklearn's: inputs are compared as float32, as sklearn's trees do
+"""
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+
+
+class CompiledTreeEnsemble:
+    """bias + scale * (sum of every tree's leaf value) for each row, from flat node arrays"""
+
+    def __init__(self, feature, threshold, children, value, roots, depth, bias=0.0, scale=1.0):
+        self.feature = feature        # (nodes,) split feature; 0 at leaves
+        self.threshold = threshold    # (nodes,) go left when x <= threshold; +inf at leaves
+        self.children = children      # (nodes * 2,) left, right child of node i at 2i, 2i + 1
+        self.value = value            # (nodes,) leaf value (internal nodes' are unused)
+        self.roots = roots            # (trees,) index of each tree's root node
+        self.depth = depth
+        self.bias = bias
+        self.scale = scale
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def predict(self, X):
+        """(rows,) predictions for a (rows, features) array, or a single (features,) row"""
+        X = np.asarray(X, dtype=np.float32)
+        single = X.ndim == 1
+        X = np.atleast_2d(X)
+
+        node = np.broadcast_to(self.roots, (len(X), self.n_trees))
+        for _ in range(self.depth):
+            x = np.take_along_axis(X, self.feature[node], axis=1)
+            node = self.children[2 * node + (x > self.threshold[node])]
+        prediction = self.bias + self.scale * self.value[node].sum(axis=1)
+        return prediction[0] if single else prediction
+
+
+def flatten_trees(trees):
+    """Concatenate sklearn Tree objects into one set of node arrays, with leaves as self-loops"""
+    offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+    n_nodes = offsets[-1]
+    feature = np.zeros(n_nodes, dtype=np.intp)
+    threshold = np.full(n_nodes, np.inf)
+    children = np.empty(n_nodes * 2, dtype=np.intp)
+    value = np.empty(n_nodes)
+
+    for tree, offset in zip(trees, offsets[:-1]):
+        nodes = np.arange(tree.node_count) + offset
+        leaf = tree.children_left == -1
+        feature[nodes[~leaf]] = tree.feature[~leaf]
+        threshold[nodes[~leaf]] = tree.threshold[~leaf]
+        children[2 * nodes] = np.where(leaf, nodes, tree.children_left + offset)
+        children[2 * nodes + 1] = np.where(leaf, nodes, tree.children_right + offset)
+        value[nodes] = tree.value[:, 0, 0]
+
+    depth = max(tree.max_depth for tree in trees)
+    return feature, threshold, children, value, offsets[:-1].astype(np.intp), depth
+
+
+def compile_ensemble(model):
+    """CompiledTreeEnsemble equivalent to model.predict for a fitted single-output regressor"""
+    if isinstance(model, GradientBoostingRegressor):
+        if isinstance(model.init_, str) and model.init_ == 'zero':
+            bias = 0.0
+        elif hasattr(model.init_, 'constant_'):
+            bias = float(np.ravel(model.init_.constant_)[0])
+        else:
+            raise ValueError("Only a constant (DummyRegressor) or zero init estimator can be compiled")
+        trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+        return CompiledTreeEnsemble(*flatten_trees(trees), bias=bias, scale=model.learning_rate)
+    if isinstance(model, RandomForestRegressor):
+        if model.n_outputs_ != 1:
+            raise ValueError("Only single-output forests can be compiled")
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        return CompiledTreeEnsemble(*flatten_trees(trees), scale=1.0 / len(trees))
+    raise TypeError(f"Cannot compile {type(model).__name__}")
+
+
+if __name__ == "__main__":
+    import os
+    import time
+    import warnings
+
+    import joblib
+
+    warnings.filterwarnings('ignore', category=UserWarning)
+    models_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+    scaler = joblib.load(os.path.join(models_dir, 'scaler.joblib'))
+    rng = np.random.default_rng(0)
+
+    def best_of(fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+        return min(timings) * 1000
+
+    for name in ('pension_model', 'return_model'):
+        model = joblib.load(os.path.join(models_dir, f'{name}.joblib'))
+        started = time.perf_counter()
+        compiled = compile_ensemble(model)
+        compile_ms = (time.perf_counter() - started) * 1000
+
+        # Scaled feature rows around the training distribution; the first rows sit exactly on split thresholds
+        X = rng.normal(0, 1.5, (10000, scaler.n_features_in_))
+        splits = np.flatnonzero(np.isfinite(compiled.threshold))[:5000]
+        X[np.arange(len(splits)), compiled.feature[splits]] = compiled.threshold[splits]
+        diff = np.max(np.abs(compiled.predict(X) - model.predict(X)) / np.maximum(1, np.abs(model.predict(X))))
+
+        row = X[:1]
+        print(f"{name}: {type(model).__name__}, {compiled.n_trees} trees, {compiled.n_nodes} nodes, "
+              f"depth {compiled.depth}, compiled in {compile_ms:.0f} ms; max rel diff {diff:.1e}")
+        print(f"  1 row: sklearn {best_of(lambda: model.predict(row), 20):.2f} ms, "
+              f"compiled {best_of(lambda: compiled.predict(row), 200):.3f} ms")
+        for n in (100, 10000):
+            print(f"  {n} rows: sklearn {best_of(lambda: model.predict(X[:n]), 3):.1f} ms, "
+                  f"compiled {best_of(lambda: compiled.predict(X[:n]), 3):.1f} ms")
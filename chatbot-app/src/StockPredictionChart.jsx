@@ -41,7 +41,8 @@ const StockPredictionChart = () => {
         },
         body: JSON.stringify({
           symbol: stockSymbol,
-          years: predictionYears
+          years: predictionYears,
+          max_points: 300
         })
       });
 
@@ -1,33 +1,35 @@
-from tensorflow.keras.models import load_model
 import pandas as pd
 import numpy as np
-import yfinance as yf
+from numpy.lib.stride_tricks import sliding_window_view
 from sklearn.preprocessing import MinMaxScaler
 import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
 import pytz
+import os
+import sys
 
-loaded_model = load_model('Share_Prediction.h5')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chatbot-app-backend'))
+from numpy_lstm import load_stock_model
+from market_data import MarketDataStore
+from forecast_engine import TRADING_DAYS_PER_YEAR, daily_noise, iter_rollout
+from forecast_postprocess import add_market_cycles
+
+loaded_model = load_stock_model('Share_Prediction.h5')
 loaded_model.summary()
+market_store = MarketDataStore()
 
 def prepare_data(stock_data, lookback_period=60):
     scaler = MinMaxScaler(feature_range=(0, 1))
     scaled_data = scaler.fit_transform(stock_data['Close'].values.reshape(-1, 1))
     
-    X_test = []
-    for i in range(lookback_period, len(scaled_data)):
-        X_test.append(scaled_data[i-lookback_period:i, 0])
-    
-    X_test = np.array(X_test)
-    X_test = np.reshape(X_test, (X_test.shape[0], X_test.shape[1], 1))
+    # Zero-copy view: window i is scaled_data[i:i+lookback_period], same windows as before
+    X_test = sliding_window_view(scaled_data[:-1, 0], lookback_period)[..., np.newaxis]
     
     return X_test, scaler
 
 def get_stock_data(symbol, start_date, end_date):
     try:
-        ticker = yf.Ticker(symbol)
-        data = ticker.history(start=start_date, end=end_date)
-        return data
+        return market_store.get_history(symbol, start_date, end_date)
     except Exception as e:
         print(f"Error fetching data: {e}")
         return None
@@ -37,92 +39,32 @@ def predict_stock_price(model, X_test, scaler):
     predictions = scaler.inverse_transform(predictions)
     return predictions
 
-def add_realistic_volatility(predictions, stock_data, volatility_factor=1.0):
-    """
-    Add realistic volatility to predictions based on historical data
-    """
-    historical_returns = np.diff(np.log(stock_data['Close'].values))
-    historical_volatility = np.std(historical_returns)
-    
-    np.random.seed(42) 
-    random_returns = np.random.normal(0, historical_volatility * volatility_factor, len(predictions))
-    
-    realistic_predictions = predictions.copy()
-    for i in range(1, len(predictions)):
-        noise = random_returns[i] * realistic_predictions[i-1]
-        realistic_predictions[i] = realistic_predictions[i] + noise
-        
-        realistic_predictions[i] = max(realistic_predictions[i], realistic_predictions[i-1] * 0.5)
-    
-    return realistic_predictions
-
-def add_market_cycles(predictions, years=10, cycle_strength=0.15):
-    """
-    Add market cycles to make predictions more realistic
-    """
-    trading_days_per_year = 252
-    total_days = len(predictions)
-    
-    cycle_length = np.random.randint(3*252, 7*252)  # 3-7 year cycles
-    cycle_phase = np.linspace(0, 2 * np.pi * (total_days / cycle_length), total_days)
-    
-    economic_cycle = np.sin(cycle_phase) * cycle_strength
-    short_cycle = np.sin(cycle_phase * 4) * (cycle_strength * 0.3)
-    
-    cyclic_predictions = predictions.copy()
-    for i in range(len(predictions)):
-        cycle_effect = 1 + economic_cycle[i] + short_cycle[i]
-        cyclic_predictions[i] = predictions[i] * cycle_effect
-    
-    return cyclic_predictions
-
-def predict_future_years_realistic(model, stock_data, scaler, years=10, lookback_period=60):
+def predict_future_years_realistic(model, stock_data, scaler, years=10, lookback_period=60, stateful=False):
     """
     Predict stock prices for the next X years with realistic volatility
     """
-    last_sequence = stock_data['Close'].values[-lookback_period:]
-    last_sequence_scaled = scaler.transform(last_sequence.reshape(-1, 1))
+    closes = stock_data['Close'].values
+    last_sequence_scaled = scaler.transform(closes[-lookback_period:].reshape(-1, 1))
     
-    trading_days_per_year = 252
-    total_days = years * trading_days_per_year
+    total_days = years * TRADING_DAYS_PER_YEAR
     
     last_date = stock_data.index[-1]
     future_dates = pd.bdate_range(start=last_date + timedelta(days=1), periods=total_days)
     
-    predictions = []
-    current_sequence = last_sequence_scaled.flatten()
-    
     print(f"Predicting {total_days} trading days ({years} years) into the future...")
     
-    historical_returns = np.diff(np.log(stock_data['Close'].values[-252:]))  # Last year's data
+    historical_returns = np.diff(np.log(closes[-252:]))  # Last year's data
     daily_volatility = np.std(historical_returns)
     
-    for i in range(total_days):
-        input_sequence = current_sequence[-lookback_period:].reshape(1, lookback_period, 1)
-        
-        next_pred_scaled = model.predict(input_sequence, verbose=0)
-        next_pred = scaler.inverse_transform(next_pred_scaled)[0][0]
-        
-        if i > 0:
-            random_return = np.random.normal(0, daily_volatility)
-            volatility_adjustment = next_pred * random_return
-            next_pred = next_pred + volatility_adjustment
-            
-           
-            prev_price = predictions[-1] if predictions else stock_data['Close'].iloc[-1]
-            max_change = prev_price * 0.2 
-            next_pred = np.clip(next_pred, prev_price - max_change, prev_price + max_change)
-            next_pred = max(next_pred, prev_price * 0.5)  
-        
-        predictions.append(next_pred)
-        
-        next_pred_scaled = scaler.transform([[next_pred]])[0][0]
-        current_sequence = np.append(current_sequence, next_pred_scaled)
-        
-        if (i + 1) % 252 == 0:
-            print(f"Completed year {(i + 1) // 252} prediction...")
-    
-    predictions = np.array(predictions)
+    noise = daily_noise(daily_volatility, total_days)
+    predictions = np.empty(total_days)
+    for start, chunk in iter_rollout(
+        model, last_sequence_scaled.reshape(1, -1),
+        scaler.scale_, scaler.min_, closes[-1:], noise, stateful=stateful
+    ):
+        predictions[start:start + chunk.shape[1]] = chunk[0]
+        if (start + chunk.shape[1]) % TRADING_DAYS_PER_YEAR == 0:
+            print(f"Completed year {(start + chunk.shape[1]) // TRADING_DAYS_PER_YEAR} prediction...")
     
     predictions = add_market_cycles(predictions, years)
     
@@ -228,6 +170,8 @@ if __name__ == "__main__":
     START_DATE = (current_date - timedelta(days=3*365 + 120)).strftime("%Y-%m-%d")
     END_DATE = current_date.strftime("%Y-%m-%d")
     LOOKBACK_PERIOD = 60
+    # Long horizons step the LSTM state forward instead of re-running every 60-day window
+    STATEFUL_ROLLOUT = hasattr(loaded_model, 'step')
     
     print(f"Fetching historical data for {STOCK_SYMBOL} from {START_DATE} to {END_DATE}...")
     stock_data = get_stock_data(STOCK_SYMBOL, START_DATE, END_DATE)
@@ -245,7 +189,7 @@ if __name__ == "__main__":
         
         print(f"\nPredicting realistic stock prices for the next {PREDICTION_YEARS} years...")
         future_dates, future_predictions = predict_future_years_realistic(
-            loaded_model, stock_data, scaler, PREDICTION_YEARS, LOOKBACK_PERIOD
+            loaded_model, stock_data, scaler, PREDICTION_YEARS, LOOKBACK_PERIOD, STATEFUL_ROLLOUT
         )
         
         print("\nGenerating realistic prediction chart...")